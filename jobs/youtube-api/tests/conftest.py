@@ -0,0 +1,91 @@
+"""
+Shared fixtures: youtubeapi.py loaded fresh for each test (its ledger,
+caches, journal and outputs land in the test's tmp_path) and the fake
+YouTube API server from youtubeapi_fakeserver.py.
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+import youtubeapi_fakeserver  # noqa: E402
+from youtubeapi_fakeserver import ApiError, FakeYouTubeWorld, start_server  # noqa: E402
+
+@pytest.fixture
+def load_scraper(monkeypatch, tmp_path):
+    """Factory: a fresh youtubeapi module for the API at url (None = no API) with quick retries"""
+    monkeypatch.chdir(tmp_path)
+    modules = []
+
+    def load(url=None, keys=2):
+        monkeypatch.setenv("YOUTUBE_API_KEYS", ",".join(f"test-key-{i + 1}" for i in range(keys)))
+        if url:
+            monkeypatch.setenv("YOUTUBE_API_ROOT_URL", url)
+        else:
+            monkeypatch.delenv("YOUTUBE_API_ROOT_URL", raising=False)
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        monkeypatch.delenv("YOUTUBE_SHARD", raising=False)
+
+        spec = importlib.util.spec_from_file_location("youtubeapi", os.path.join(HERE, "youtubeapi.py"))
+        yt = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(yt)
+        yt.RETRY_BASE_DELAY = 0.01
+        yt.RETRY_MAX_DELAY = 0.05
+        yt.REQUESTS_PER_SECOND_PER_KEY = None
+        yt.BREAKER_COOLDOWN = 0.05
+        modules.append(yt)
+        return yt
+
+    yield load
+
+    for yt in modules:
+        if yt.KEY_POOL is not None:
+            yt.KEY_POOL.close()
+        for store in (yt.RESPONSE_CACHE, yt.CHANNEL_STATE, yt.HANDLE_INDEX):
+            if store is not None:
+                store.close()
+
+@pytest.fixture
+def world():
+    """A small deterministic world: 40 channels with up to 60 uploads each"""
+    return FakeYouTubeWorld(channels=40, max_videos=60, seed=7)
+
+@pytest.fixture
+def input_csv(world, tmp_path):
+    """The world's channels as a scraper input CSV (some rows as @handles)"""
+    return world.write_input_csv(str(tmp_path / "channels.csv"))
+
+@pytest.fixture
+def fake_api(world):
+    """Factory: start a fake API server for world (FakeYouTubeServer options as keywords); stopped after the test"""
+    servers = []
+
+    def start(**options):
+        server = start_server(world, **{"latency": 0, **options})
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def failing_endpoint(monkeypatch):
+    """Factory: make the fake API answer 503 to the calls of endpoint that failing(params) picks (all by default)"""
+    def fail(endpoint, failing=lambda params: True):
+        handler = youtubeapi_fakeserver.ENDPOINTS[endpoint]
+
+        def flaky(server, params):
+            if failing(params):
+                raise ApiError(503, "backendError", "Backend Error", "global")
+            return handler(server, params)
+
+        monkeypatch.setitem(youtubeapi_fakeserver.ENDPOINTS, endpoint, flaky)
+
+    return fail
@@ -0,0 +1,23 @@
+"""Helpers for the tests that run the scraper end to end"""
+import contextlib
+import io
+
+import pandas as pd
+
+def configure(yt, input_csv, cache=False, incremental=False, snapshots=False):
+    """Point a load_scraper() module at input_csv with the stores the test does not need turned off"""
+    yt.CSV_INPUT_FILE = input_csv
+    yt.CACHE_ENABLED = cache
+    yt.INCREMENTAL_FETCH = incremental
+    if not snapshots:
+        yt.SNAPSHOT_DIR = None
+    return yt
+
+def run(yt, workers=4, **options):
+    """main() with its output captured; returns its summary"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return yt.main(workers=workers, **options)
+
+def read_results(path):
+    """A results file in a stable row order, for comparing runs"""
+    return pd.read_csv(path).sort_values(["Channel_ID", "Search_Term", "Query_Name"]).reset_index(drop=True)
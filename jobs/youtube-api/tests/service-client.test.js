@@ -0,0 +1,75 @@
+// ============================================================
+// 🧪 runOnService - parsing the scraper service's event stream
+// ============================================================
+//
+// Run with: node --test tests/
+// A stub server writes each response in the given chunks, so events
+// can be split mid-line the way a real socket delivers them.
+//
+// ============================================================
+
+const test = require('node:test');
+const assert = require('node:assert');
+const http = require('http');
+const { runOnService } = require('../youtubeapi-service');
+
+async function respond(status, chunks, job = {}) {
+  const server = http.createServer((req, res) => {
+    res.writeHead(status);
+    const next = (i) => (i < chunks.length ? (res.write(chunks[i]), setTimeout(next, 10, i + 1)) : res.end());
+    next(0);
+  });
+  await new Promise((resolve) => server.listen(0, '127.0.0.1', resolve));
+  try {
+    return await runOnService(`127.0.0.1:${server.address().port}`, job);
+  } finally {
+    server.close();
+  }
+}
+
+test('events split across chunks are reassembled', async () => {
+  const summary = await respond(200, [
+    '{"event":"started"}\n{"event":"log","line":"hello"}\n{"ev',
+    'ent":"done","summary":{"channels_seen":1}}\n'
+  ]);
+  assert.deepStrictEqual(summary, { channels_seen: 1 });
+});
+
+test('a final event without a trailing newline still counts', async () => {
+  assert.deepStrictEqual(await respond(200, ['{"event":"done","summary":{"a":1}}']), { a: 1 });
+});
+
+test('a malformed event line rejects instead of throwing', async () => {
+  await assert.rejects(
+    respond(200, ['{"event":"log","line":"x"}\nnot json\n', '{"event":"done","summary":{}}\n']),
+    /unreadable response \(HTTP 200\): not json/
+  );
+});
+
+test('a job error rejects with its message', async () => {
+  await assert.rejects(respond(200, ['{"event":"error","error":"RuntimeError: boom"}\n']), /Scraper service: RuntimeError: boom/);
+});
+
+test('an error body split across chunks is parsed once complete', async () => {
+  await assert.rejects(respond(409, ['{"error":', '"A job is already running"}']), /A job is already running \(HTTP 409\)/);
+});
+
+test('a non-JSON error body rejects', async () => {
+  await assert.rejects(respond(500, ['<html>oops']), /unreadable response \(HTTP 500\): <html>oops/);
+});
+
+test('a stream cut off mid-event rejects', async () => {
+  await assert.rejects(respond(200, ['{"event":"started"}\n{"event":"log","line":"partial']), /unreadable response/);
+});
+
+test('a stream that ends without done or error rejects', async () => {
+  await assert.rejects(respond(200, ['{"event":"started"}\n{"event":"log","line":"x"}\n']), /ended without a result/);
+});
+
+test('a service that is not listening rejects', async () => {
+  const server = http.createServer();
+  await new Promise((resolve) => server.listen(0, '127.0.0.1', resolve));
+  const { port } = server.address();
+  await new Promise((resolve) => server.close(resolve));
+  await assert.rejects(runOnService(`127.0.0.1:${port}`), { code: 'ECONNREFUSED' });
+});
@@ -0,0 +1,120 @@
+"""Database mode against the SQLite stand-in (DATABASE_URL sqlite:///...)"""
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def yt(load_scraper, tmp_path):
+    yt = load_scraper()
+    yt.INPUT_SOURCE = "db"
+    yt.DATABASE_URL = f"sqlite:///{tmp_path / 'channels.db'}"
+    yt.DB_FETCH_ROWS = 2  # Several round trips per stream
+    return yt
+
+def create_channels(yt, rows):
+    """The input table (jobs/db/schema.sql + channel_id) with rows of (channel_id, name, subscribers, search term)"""
+    conn = sqlite3.connect(yt.DATABASE_URL[len("sqlite:///"):])
+    conn.execute(f"""CREATE TABLE {yt.DB_CHANNELS_TABLE} (id INTEGER PRIMARY KEY, channel_name TEXT UNIQUE,
+                     subscribers INTEGER, search_term TEXT, query_name TEXT, last_updated TEXT, channel_id TEXT)""")
+    conn.executemany(f"INSERT INTO {yt.DB_CHANNELS_TABLE} (channel_id, channel_name, subscribers, search_term, "
+                     f"query_name) VALUES (?, ?, ?, ?, 'q')", rows)
+    conn.commit()
+    conn.close()
+
+def result_row(channel_id, search_term="term", status="Analyzed", **values):
+    return {"Channel_Name": f"Channel {channel_id}", "Channel_ID": channel_id, "CSV_Subs": 50000,
+            "Actual_Subs": 60000, "Videos_Fetched": 20, "Qualifying_Videos_60d": 9, "Status": status,
+            "Search_Term": search_term, "Query_Name": "q", **values}
+
+def stored_results(yt):
+    conn = sqlite3.connect(yt.DATABASE_URL[len("sqlite:///"):])
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {yt.DB_RESULTS_TABLE} ORDER BY channel_id, search_term", conn)
+    finally:
+        conn.close()
+
+def write_results(yt, rows, scores=None):
+    sink = yt.DatabaseResultSink(batch_rows=2)
+    for row in rows:
+        sink.write(row)
+    sink.flush()
+    if scores is not None:
+        sink.write_scores(scores)
+    sink.close()
+
+def test_channels_stream_biggest_first_with_the_filters_in_sql(yt):
+    create_channels(yt, [
+        ("UC_small", "Small", 500, "t"),
+        ("UC_b", "B", 300000, "t"),
+        (None, "No ID", 900000, "t"),
+        ("", "Empty ID", 800000, "t"),
+        ("UC_a", "A", 700000, None),
+        ("UC_c", "C", 20000, "t"),
+        ("UC_d", "D", 150000, "t"),
+    ])
+
+    channels = list(yt.get_channels_from_db())
+
+    assert [c["channel_id"] for c in channels] == ["UC_a", "UC_b", "UC_d", "UC_c"]
+    assert channels[0] == {"channel_id": "UC_a", "channel_name": "A", "subscribers": 700000,
+                           "search_term": "", "query_name": "q"}
+
+def test_recently_analyzed_channels_are_not_selected_again(yt):
+    create_channels(yt, [("UC_a", "A", 700000, "t"), ("UC_b", "B", 300000, "t"), ("UC_c", "C", 200000, "t")])
+    write_results(yt, [result_row("UC_a", "t"), result_row("UC_b", "other term")])
+
+    assert [c["channel_id"] for c in yt.get_channels_from_db()] == ["UC_b", "UC_c"]
+
+    # Once the results are older than DB_REANALYZE_AFTER, the channel is due again
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=yt.DB_REANALYZE_AFTER + 60)).isoformat(sep=" ")
+    conn = sqlite3.connect(yt.DATABASE_URL[len("sqlite:///"):])
+    conn.execute(f"UPDATE {yt.DB_RESULTS_TABLE} SET analyzed_at = ?", (stale,))
+    conn.commit()
+    conn.close()
+    assert [c["channel_id"] for c in yt.get_channels_from_db()] == ["UC_a", "UC_b", "UC_c"]
+
+def test_max_channels_becomes_a_limit(yt):
+    create_channels(yt, [(f"UC_{i}", f"C{i}", 100000 + i, "t") for i in range(5)])
+    yt.MAX_CHANNELS_TO_PROCESS = 2
+
+    assert [c["channel_id"] for c in yt.get_channels_from_db()] == ["UC_4", "UC_3"]
+
+def test_rerunning_the_upserts_is_idempotent(yt):
+    rows = [result_row(f"UC_{i}", Actual_Subs=1000 * i) for i in range(5)]
+    write_results(yt, rows)
+    first = stored_results(yt)
+
+    write_results(yt, rows)
+    second = stored_results(yt)
+
+    assert len(first) == len(second) == 5
+    pd.testing.assert_frame_equal(first.drop(columns="analyzed_at"), second.drop(columns="analyzed_at"))
+    assert (second["analyzed_at"] >= first["analyzed_at"]).all()
+
+def test_a_conflicting_row_updates_the_stored_one(yt):
+    write_results(yt, [result_row("UC_a", Actual_Subs=100), result_row("UC_a", "other term", Actual_Subs=100)])
+
+    # Same key twice in one batch (the last row wins) and again in a later run
+    write_results(yt, [result_row("UC_a", Actual_Subs=200), result_row("UC_a", Actual_Subs=300, Status="Fetch failed")])
+
+    stored = stored_results(yt).set_index("search_term")
+    assert len(stored) == 2
+    assert stored.loc["term", "actual_subs"] == 300
+    assert stored.loc["term", "status"] == "Fetch failed"
+    assert stored.loc["other term", "actual_subs"] == 100
+
+def test_scores_fill_in_and_the_next_results_clear_them(yt):
+    rows = [result_row("UC_a"), result_row("UC_b")]
+    scores = pd.DataFrame({"Channel_ID": ["UC_a"], "Search_Term": ["term"], "Query_Name": ["q"],
+                           "Engagement_Rate": [0.05], "Merch_Score": [0.61]})
+    write_results(yt, rows, scores)
+
+    stored = stored_results(yt).set_index("channel_id")
+    assert stored.loc["UC_a", "merch_score"] == pytest.approx(0.61)
+    assert stored.loc["UC_a", "status"] == "Analyzed"  # Scores leave the other columns alone
+    assert pd.isna(stored.loc["UC_b", "merch_score"])
+
+    write_results(yt, rows[:1])
+    assert pd.isna(stored_results(yt).set_index("channel_id").loc["UC_a", "merch_score"])
@@ -0,0 +1,67 @@
+"""Input rows that list the same channel (by UC... ID and/or @handle) are fetched once per run"""
+import csv
+
+import pandas as pd
+
+from helpers import configure, run
+
+# (channel_id, subscribers, search_term): rows are processed biggest first, so the @handle of
+# channel 3 resolves before its UC... rows come up, and channel 8's UC... row comes after its handle
+ROWS = [
+    ("@benchchannel3", 90000, "handle3"),
+    ("UC0000000000000000000003", 80000, "id3-a"),
+    ("UC0000000000000000000003", 70000, "id3-b"),
+    ("@BenchChannel8", 60000, "handle8"),
+    ("UC0000000000000000000008", 50000, "id8"),
+    ("UC0000000000000000000012", 40000, "id12"),
+]
+
+def write_input(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["channel_id", "channel_name", "subscribers", "search_term", "query_name"])
+        for channel_id, subscribers, search_term in rows:
+            writer.writerow([channel_id, channel_id, subscribers, search_term, "dedup"])
+    return str(path)
+
+def fetches(server):
+    """Requests other than the channel lookups, which differ with how each row lists its channel"""
+    return {endpoint: count for endpoint, count in server.stats["requests"].items() if endpoint != "channels"}
+
+def test_handle_and_id_rows_share_one_fetch(load_scraper, fake_api, failing_endpoint, tmp_path):
+    unique = write_input(tmp_path / "unique.csv", [row for row in ROWS if row[2] in ("id3-a", "id8", "id12")])
+    reference_server = fake_api()
+    yt = configure(load_scraper(reference_server.url), unique)
+    yt.PIPELINE_WAVE_SIZE = 1  # One row per wave: videos.list calls are not shared between channels
+    run(yt, run_id="reference")
+
+    listed = write_input(tmp_path / "listed.csv", ROWS)
+    server = fake_api()
+    yt = configure(load_scraper(server.url), listed)
+    yt.PIPELINE_WAVE_SIZE = 1  # And the handles resolve between waves
+    first = run(yt, run_id="first")
+
+    assert fetches(server) == fetches(reference_server)  # Each channel's videos fetched once
+    assert yt.HANDLE_INDEX.get_many(["@benchchannel3", "@BenchChannel8"]) == {
+        "@benchchannel3": "UC0000000000000000000003", "@BenchChannel8": "UC0000000000000000000008"}
+
+    results = pd.read_csv(first["all_channels_file"])
+    assert sorted(results["Search_Term"]) == sorted(row[2] for row in ROWS)
+    assert results["Actual_Subs"].notna().all()
+    metrics = ["Actual_Subs", "Videos_Fetched", "Qualifying_Videos_60d", "Avg_Views_All", "Status"]
+    for search_terms in (["handle3", "id3-a", "id3-b"], ["handle8", "id8"]):
+        rows = results[results["Search_Term"].isin(search_terms)][metrics]
+        assert len(rows.drop_duplicates()) == 1, rows
+
+    # Next run: the index knows both handles, so nothing is looked up with forHandle
+    failing_endpoint("channels", lambda params: "forHandle" in params)
+    before = dict(server.stats["requests"])
+    yt = configure(load_scraper(server.url), listed)
+    yt.PIPELINE_WAVE_SIZE = 1
+    second = run(yt, run_id="second")
+
+    # The same requests as a run listing each channel once, by ID
+    assert {endpoint: count - before[endpoint] for endpoint, count in server.stats["requests"].items()} == \
+        reference_server.stats["requests"]
+    pd.testing.assert_frame_equal(pd.read_csv(second["all_channels_file"]).sort_values("Search_Term").reset_index(drop=True),
+                                  results.sort_values("Search_Term").reset_index(drop=True))
@@ -0,0 +1,121 @@
+"""End-to-end runs against the fake YouTube API server (youtubeapi_fakeserver.py)"""
+import contextlib
+import glob
+import io
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from helpers import configure, read_results, run
+
+def test_resume_fetches_only_the_channels_not_journaled(load_scraper, fake_api, input_csv):
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv)
+    full = run(yt, run_id="full")
+    assert full["fetched"] == full["seen"] > 11
+
+    # An interrupted run: the journal holds 10 channels and a torn last line
+    with open(yt.CHECKPOINT_FILE, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(yt.CHECKPOINT_FILE, "w", encoding="utf-8") as f:
+        f.writelines(lines[:11])
+        f.write(lines[11][:25])
+
+    resumed = run(configure(load_scraper(server.url), input_csv), resume=True, run_id="resumed")
+
+    assert resumed["seen"] == full["seen"]
+    assert resumed["fetched"] == full["seen"] - 10
+    pd.testing.assert_frame_equal(read_results(resumed["all_channels_file"]), read_results(full["all_channels_file"]))
+    pd.testing.assert_frame_equal(read_results(resumed["qualified_file"]), read_results(full["qualified_file"]))
+
+def test_stale_cache_entries_are_revalidated_with_etags(load_scraper, fake_api, input_csv):
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv, cache=True)
+    yt.CACHE_TTL_SECONDS = dict.fromkeys(yt.CACHE_TTL_SECONDS, 0)  # Every entry is stale at once
+    first = run(yt, run_id="first")
+    requests_before = sum(server.stats["requests"].values())
+
+    yt = configure(load_scraper(server.url), input_csv, cache=True)
+    yt.CACHE_TTL_SECONDS = dict.fromkeys(yt.CACHE_TTL_SECONDS, 0)
+    second = run(yt, run_id="second")
+
+    assert server.stats["not_modified"] > 0
+    assert yt.CACHE_STATS["revalidated"] == server.stats["not_modified"]
+    assert sum(server.stats["requests"].values()) - requests_before <= requests_before
+    pd.testing.assert_frame_equal(read_results(second["all_channels_file"]), read_results(first["all_channels_file"]))
+
+def test_transient_errors_are_retried_to_the_same_results(load_scraper, fake_api, input_csv):
+    clean = run(configure(load_scraper(fake_api().url), input_csv), run_id="clean")
+
+    flaky = fake_api(error_rate=0.25, seed=3)
+    yt = configure(load_scraper(flaky.url), input_csv)
+    result = run(yt, run_id="flaky")
+
+    assert sum(flaky.stats["errors"].values()) > 0
+    assert yt.RETRY_STATS["retried"] > 0
+    pd.testing.assert_frame_equal(read_results(result["all_channels_file"]), read_results(clean["all_channels_file"]))
+
+def list_channel(yt):
+    return yt.execute_request("channels", 1, lambda client: client.channels().list(
+        part="statistics", id="UC0000000000000000000001"))
+
+def test_circuit_breaker_opens_and_a_probe_closes_it(load_scraper, fake_api):
+    server = fake_api(error_rate=1.0)
+    yt = load_scraper(server.url)
+    yt.BREAKER_FAILURE_THRESHOLD = 3
+    yt.BREAKER_COOLDOWN = 0.2
+    yt.RETRY_MAX_ATTEMPTS = 4
+
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(yt.HttpError):
+        list_channel(yt)
+    breaker = yt.get_circuit_breaker("channels")
+    assert breaker.state == "open"
+    assert yt.RETRY_STATS["breaker_trips"] == 2  # Opened after 3 failures, reopened by the failed probe
+
+    server.error_rate = 0
+    started = time.monotonic()
+    assert list_channel(yt)["items"][0]["id"] == "UC0000000000000000000001"
+    assert time.monotonic() - started >= 0.1  # Held until the cooldown ended, then sent as the probe
+    assert breaker.state == "closed"
+
+def test_a_probe_that_never_reaches_the_endpoint_hands_over(load_scraper, fake_api):
+    yt = load_scraper(fake_api().url)
+    breaker = yt.get_circuit_breaker("channels")
+    breaker.state, breaker.opened_until = "open", time.monotonic()  # Cooldown over: the next request probes
+
+    def broken_request(client):
+        raise ValueError("request could not be built")
+
+    with pytest.raises(ValueError):
+        yt.execute_request("channels", 1, broken_request)
+    assert breaker.state == "open"
+
+    # The next request probes instead of waiting on a probe that will never settle
+    answered = []
+    worker = threading.Thread(target=lambda: answered.append(list_channel(yt)), daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert answered and breaker.state == "closed"
+
+def test_shard_outputs_merge_into_the_unsharded_result(load_scraper, fake_api, input_csv):
+    server = fake_api()
+    full = run(configure(load_scraper(server.url), input_csv), run_id="full")
+
+    shard_files = []
+    for shard in ("1/2", "2/2"):
+        yt = configure(load_scraper(server.url), input_csv)
+        yt.configure_shard(shard)
+        summary = run(yt, run_id="sharded")
+        assert 0 < summary["written"] < full["written"]
+        shard_files.append(summary["all_channels_file"])
+    assert sum(len(pd.read_csv(path)) for path in shard_files) == full["written"]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged_all, merged_qualified = yt.merge_shards(shard_files, timestamp="merged")
+
+    pd.testing.assert_frame_equal(read_results(merged_all), read_results(full["all_channels_file"]))
+    pd.testing.assert_frame_equal(pd.read_csv(merged_qualified), pd.read_csv(full["qualified_file"]))
+    assert sorted(glob.glob("youtube_scraper_checkpoint.shard*of2.jsonl")) == [
+        "youtube_scraper_checkpoint.shard1of2.jsonl", "youtube_scraper_checkpoint.shard2of2.jsonl"]
@@ -0,0 +1,71 @@
+"""Incremental per-channel delta fetching (INCREMENTAL_FETCH) against full fetches"""
+import pandas as pd
+import pytest
+
+import youtubeapi_fakeserver
+from helpers import configure, read_results, run
+
+@pytest.fixture
+def requested_videos(monkeypatch):
+    """The video IDs of every videos.list call"""
+    calls = []
+    list_videos = youtubeapi_fakeserver.ENDPOINTS["videos"]
+
+    def recording(server, params):
+        calls.append([video_id for video_id in params.get("id", "").split(",") if video_id])
+        return list_videos(server, params)
+
+    monkeypatch.setitem(youtubeapi_fakeserver.ENDPOINTS, "videos", recording)
+    return calls
+
+def test_repeat_runs_fetch_only_new_uploads_and_stale_stats(load_scraper, fake_api, world, input_csv,
+                                                            requested_videos, monkeypatch):
+    # A frequent uploader whose two newest videos only appear after the first run
+    channel = next(index for index in range(world.channels) if world.subscribers(index) >= 10000
+                   and world.video_count(index) >= 20 and world.upload_interval_days(index) <= 2)
+    new_ids = [world.video_id(channel, 0), world.video_id(channel, 1)]
+    list_playlist_items = youtubeapi_fakeserver.ENDPOINTS["playlistItems"]
+
+    def before_the_new_uploads(server, params):
+        response = list_playlist_items(server, params)
+        response["items"] = [item for item in response["items"] if item["contentDetails"]["videoId"] not in new_ids]
+        return response
+
+    server = fake_api()
+    monkeypatch.setitem(youtubeapi_fakeserver.ENDPOINTS, "playlistItems", before_the_new_uploads)
+    yt = configure(load_scraper(server.url), input_csv, incremental=True)
+    yt.VIDEOS_PER_CHANNEL = 100  # Channels with over 50 uploads take two pages
+    run(yt, run_id="first")
+    monkeypatch.setitem(youtubeapi_fakeserver.ENDPOINTS, "playlistItems", list_playlist_items)
+
+    # The same run without the state store fetches every upload again
+    full_server = fake_api()
+    yt = configure(load_scraper(full_server.url), input_csv)
+    yt.VIDEOS_PER_CHANNEL = 100
+    full = run(yt, run_id="full")
+
+    before = dict(server.stats["requests"])
+    del requested_videos[:]
+    yt = configure(load_scraper(server.url), input_csv, incremental=True)
+    yt.VIDEOS_PER_CHANNEL = 100
+    delta = run(yt, run_id="delta")
+
+    assert requested_videos == [new_ids]  # Only the new uploads, in one videos.list call
+    assert server.stats["requests"]["playlistItems"] - before["playlistItems"] < full_server.stats["requests"]["playlistItems"]
+    pd.testing.assert_frame_equal(read_results(delta["all_channels_file"]), read_results(full["all_channels_file"]))
+    pd.testing.assert_frame_equal(read_results(delta["qualified_file"]), read_results(full["qualified_file"]))
+
+    # Once the stored stats are stale, each channel refreshes its newest few
+    del requested_videos[:]
+    yt = configure(load_scraper(server.url), input_csv, incremental=True)
+    yt.VIDEOS_PER_CHANNEL = 100
+    yt.VIDEO_STATS_MAX_AGE = 0
+    yt.VIDEO_STATS_REFRESH_PER_CHANNEL = 3
+    stale = run(yt, run_id="stale")
+
+    refreshed = {}
+    for video_id in (video_id for call in requested_videos for video_id in call):
+        channel_index, video_index = world.video_index(video_id)
+        refreshed.setdefault(channel_index, []).append(video_index)
+    assert refreshed and all(sorted(indexes) == [0, 1, 2] for indexes in refreshed.values())  # Batches run concurrently
+    pd.testing.assert_frame_equal(read_results(stale["all_channels_file"]), read_results(full["all_channels_file"]))
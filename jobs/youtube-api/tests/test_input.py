@@ -0,0 +1,68 @@
+"""Streaming the input CSV (get_channels_from_csv) against the whole-file loader it replaced"""
+import random
+
+import pandas as pd
+import pytest
+
+def baseline_channels(path, min_subs, limit=None):
+    """The original loader: read everything, filter, sort by subscribers (stable), then limit"""
+    df = pd.read_csv(path, dtype=str)
+    df["subscribers"] = pd.to_numeric(df["subscribers"], errors="coerce")
+    df = df[df["subscribers"] >= min_subs]
+    df = df[df["channel_id"].notna() & (df["channel_id"].str.strip() != "")]
+    df = df.sort_values("subscribers", ascending=False, kind="stable")
+    if limit:
+        df = df.head(limit)
+    return [(row.channel_id, int(row.subscribers)) for row in df.itertuples()]
+
+@pytest.fixture
+def messy_csv(tmp_path):
+    """250 rows with tied subscriber counts, missing IDs and subscriber cells that are not plain integers"""
+    rng = random.Random(11)
+    cells = ["", "n/a", "1.5e4", "20000.0", " 30000 ", "9999", "-5"]
+    rows = []
+    for i in range(250):
+        subscribers = rng.choice(cells) if i % 9 == 0 else str(rng.choice([5000, 10000, 50000, 120000, rng.randrange(10**7)]))
+        channel_id = "" if i % 31 == 0 else (None if i % 37 == 0 else f"UC{i:022d}")
+        rows.append({"channel_id": channel_id, "channel_name": f"Channel {i}", "subscribers": subscribers,
+                     "search_term": "merch", "query_name": f"q{i % 4}"})
+    path = tmp_path / "messy.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+def load(yt):
+    return [(channel["channel_id"], channel["subscribers"]) for channel in yt.get_channels_from_csv()]
+
+def test_chunks_are_spilled_and_merged_in_the_baseline_order(load_scraper, monkeypatch, messy_csv):
+    yt = load_scraper()
+    yt.CSV_INPUT_FILE = messy_csv
+    monkeypatch.setattr(yt, "INPUT_CHUNK_SIZE", 40)
+    spilled = []
+    spill_run = yt._spill_run
+    monkeypatch.setattr(yt, "_spill_run", lambda run, directory: spilled.append(run) or spill_run(run, directory))
+
+    channels = load(yt)
+
+    assert channels == baseline_channels(messy_csv, yt.MIN_SUBS_FILTER)
+    assert len(spilled) == 7  # Every 40-row chunk became a run on disk
+    assert all(type(subs) is int for _, subs in channels)
+
+def test_the_limit_keeps_the_biggest_channels_with_a_heap(load_scraper, monkeypatch, messy_csv):
+    yt = load_scraper()
+    yt.CSV_INPUT_FILE = messy_csv
+    monkeypatch.setattr(yt, "INPUT_CHUNK_SIZE", 40)
+    monkeypatch.setattr(yt, "MAX_CHANNELS_TO_PROCESS", 25)
+    monkeypatch.setattr(yt, "_spill_run", lambda run, directory: pytest.fail("a limited load must not spill"))
+
+    assert load(yt) == baseline_channels(messy_csv, yt.MIN_SUBS_FILTER, limit=25)
+
+def test_subscriber_cells_are_coerced_or_drop_only_their_row(load_scraper, tmp_path, capsys):
+    yt = load_scraper()
+    path = tmp_path / "cells.csv"
+    path.write_text("channel_id,channel_name,subscribers\n"
+                    "UCa,A,15000\nUCb,B,1.5e4\nUCc,C,20000.0\nUCd,D, 30000 \n"
+                    "UCe,E,n/a\nUCf,F,\nUCg,G,9999\n,H,50000\n", encoding="utf-8")
+    yt.CSV_INPUT_FILE = str(path)
+
+    assert load(yt) == [("UCd", 30000), ("UCc", 20000), ("UCa", 15000), ("UCb", 15000)]
+    assert "Read 8 rows: 4 channels passed filters (removed 3 < 10,000 subs, 1 NULL IDs)" in capsys.readouterr().out
@@ -0,0 +1,43 @@
+"""The uploads-playlist prefilter (PLAYLIST_PREFILTER) against runs that send every upload to videos.list"""
+import pandas as pd
+
+from helpers import configure, read_results, run
+
+QUALIFIED_COLUMNS = ["Actual_Subs", "Qualifying_Videos_60d", "Avg_Views_Qualified", "Avg_Likes_Qualified",
+                     "Avg_Comments_Qualified", "Total_Views_Qualified", "First_Qualifying_Upload", "Last_Qualifying_Upload"]
+
+def test_prefilter_skips_channels_and_old_uploads_with_the_same_qualifiers(load_scraper, fake_api, input_csv):
+    unfiltered_server = fake_api()
+    yt = configure(load_scraper(unfiltered_server.url), input_csv)
+    yt.PLAYLIST_PREFILTER = False
+    unfiltered = run(yt, run_id="unfiltered")
+
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv)
+    prefiltered = run(yt, run_id="prefiltered")
+
+    before = pd.read_csv(unfiltered["all_channels_file"]).set_index(["Channel_ID", "Search_Term"])
+    after = pd.read_csv(prefiltered["all_channels_file"]).set_index(["Channel_ID", "Search_Term"])
+    assert sorted(before.index) == sorted(after.index)
+    after = after.loc[before.index]
+
+    skipped = after["Status"].str.startswith("Too few recent uploads")
+    assert skipped.any()
+    assert not before.loc[skipped, "Status"].eq("Analyzed").any()  # Only channels that could not qualify
+    assert (after.loc[skipped, "Videos_Fetched"] == 0).all()
+    assert after.loc[skipped, "Avg_Views_All"].isna().all()
+    assert (after.loc[skipped, "Old_Videos_Skipped"] == before.loc[skipped, "Old_Videos_Skipped"]).all()
+
+    # Analyzed channels: only in-window uploads are fetched, so the *_All columns describe those
+    # uploads; old uploads are still counted, and the qualifying videos are the same
+    analyzed = ~skipped & before["Videos_Fetched"].gt(0)
+    pd.testing.assert_series_equal(after.loc[analyzed, "Videos_Fetched"] + after.loc[analyzed, "Old_Videos_Skipped"],
+                                   before.loc[analyzed, "Videos_Fetched"], check_names=False, check_dtype=False)
+    pd.testing.assert_frame_equal(after.loc[analyzed, QUALIFIED_COLUMNS + ["Status"]],
+                                  before.loc[analyzed, QUALIFIED_COLUMNS + ["Status"]])
+    old = analyzed & after["Old_Videos_Skipped"].gt(0)
+    assert old.any() and (after.loc[old, "Avg_Views_All"] != before.loc[old, "Avg_Views_All"]).any()
+
+    assert server.stats["requests"]["videos"] < unfiltered_server.stats["requests"]["videos"]
+    assert server.stats["requests"]["playlistItems"] == unfiltered_server.stats["requests"]["playlistItems"]
+    pd.testing.assert_frame_equal(read_results(prefiltered["qualified_file"]), read_results(unfiltered["qualified_file"]))
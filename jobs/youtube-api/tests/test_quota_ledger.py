@@ -0,0 +1,60 @@
+"""The on-disk quota ledger behind KeyPool"""
+import json
+import multiprocessing
+import time
+
+from helpers import configure, run
+
+def ledger_spent(path):
+    with open(path, encoding="utf-8") as f:
+        return {fingerprint: entry["spent"] for fingerprint, entry in json.load(f)["keys"].items()}
+
+def test_retried_and_quota_exceeded_attempts_are_charged_once(load_scraper, fake_api, input_csv):
+    server = fake_api(error_rate=0.25, seed=3, quota_per_key=60)
+    server.stats["quota_by_key"]["test-key-1"] = 55  # Spent elsewhere: the ledger does not know
+    yt = configure(load_scraper(server.url), input_csv)
+    run(yt, run_id="flaky")
+
+    assert yt.RETRY_STATS["retried"] > 0
+    assert yt.KEY_POOL.exhausted == {0}  # quotaExceeded, then the other key finished the run
+    yt.KEY_POOL.close()
+
+    # Every endpoint the scraper calls costs 1 unit, as the fake server bills them
+    billed = {yt.key_fingerprint(key): spent for key, spent in server.stats["quota_by_key"].items()}
+    billed[yt.key_fingerprint("test-key-1")] -= 55
+    assert ledger_spent(yt.QUOTA_LEDGER_FILE) == billed
+    assert sum(yt.KEY_POOL.run_spent) == yt.QUOTA_USED == sum(billed.values())
+
+def spend(pool_class, path, keys, requests, sync_seconds):
+    """One process's run: charge `requests` units, syncing with the others as it goes"""
+    pool = pool_class(keys, 10**6, path)
+    for i in range(requests):
+        pool.acquire(1)
+        if i % 50 == 0:
+            pool.synced_at = time.monotonic() - sync_seconds - 1  # Due for a sync on the next acquire()
+    pool.close()
+
+def test_concurrent_runs_merge_their_spending(load_scraper, tmp_path):
+    yt = load_scraper()
+    path = str(tmp_path / "ledger.json")
+    keys = ["key-one", "key-two"]
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=spend, args=(yt.KeyPool, path, keys, 300, yt.QUOTA_LEDGER_SYNC_SECONDS))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert sum(ledger_spent(path).values()) == 4 * 300
+
+    # A refund after the spending was synced comes off the ledger
+    pool = yt.KeyPool(keys, 10**6, path)
+    assert sum(pool.spent) == 4 * 300
+    key_index = pool.acquire(5)
+    pool.close()
+    pool.refund(key_index, 5)
+    pool.close()
+    assert sum(ledger_spent(path).values()) == 4 * 300
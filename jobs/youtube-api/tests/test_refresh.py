@@ -0,0 +1,42 @@
+"""Refresh prioritization (REFRESH_PRIORITY) scored a chunk at a time against scoring the whole input at once"""
+import time
+
+from helpers import configure, run
+
+def test_chunked_prioritization_matches_the_whole_input_order(load_scraper, fake_api, input_csv, monkeypatch):
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv, incremental=True)  # The channel state store
+    yt.REFRESH_PRIORITY = True
+    first = run(yt, run_id="first")  # Every channel is new, so every one is due
+    assert first["fetched"] == first["seen"]
+    channels = list(yt.load_channels())
+    never_analyzed = sum(1 for priority, interval in yt.refresh_priorities(channels) if interval is None)
+    assert never_analyzed < len(channels)  # A channel without videos has no state to go by
+    assert run(yt, run_id="too-soon")["seen"] == never_analyzed  # Nothing else is due right after
+
+    # Ten minutes later, with intervals from a minute (top scorers) to an hour: only some are due
+    now = time.time() + 600
+    monkeypatch.setattr(yt.time, "time", lambda: now)
+    yt.REFRESH_MIN_INTERVAL, yt.REFRESH_MAX_INTERVAL = 60, 3600
+    priorities = [priority for priority, interval in yt.refresh_priorities(channels, now)]
+    expected = [channels[i]["channel_id"] for i in sorted(range(len(channels)), key=lambda i: -priorities[i])
+                if priorities[i] >= 1]
+    assert 0 < len(expected) < len(channels)
+    assert len(set(priorities)) > 2  # Overdue by different amounts, so the order is tested too
+
+    chunks, spilled = [], []
+    refresh_priorities, spill_run = yt.refresh_priorities, yt._spill_run
+    monkeypatch.setattr(yt, "INPUT_CHUNK_SIZE", 4)
+    monkeypatch.setattr(yt, "refresh_priorities", lambda chunk, now=None: chunks.append(len(chunk)) or refresh_priorities(chunk, now))
+    monkeypatch.setattr(yt, "_spill_run", lambda run, directory: spilled.append(len(run)) or spill_run(run, directory))
+
+    prioritized = yt.prioritize_refreshes(iter(channels))
+    assert not chunks  # Streamed: nothing is read before the first channel is asked for
+    assert [channel["channel_id"] for channel in prioritized] == expected
+    assert max(chunks) == 4 and sum(chunks) == len(channels)
+    assert len(spilled) > 1 and sum(spilled) == len(expected)
+
+    requests = sum(server.stats["requests"].values())
+    second = run(yt, run_id="second")
+    assert second["seen"] == second["fetched"] == len(expected)
+    assert sum(server.stats["requests"].values()) > requests
@@ -0,0 +1,162 @@
+"""Vectorized scoring (compute_scores / score_channels) against the per-channel formulas it replaced"""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+DAYS_LOOKBACK = 60
+MIN_VIDEOS_IN_TIMEFRAME = 7
+
+def safe_divide(numerator, denominator, default=0):
+    try:
+        return numerator / denominator if denominator != 0 else default
+    except (ZeroDivisionError, TypeError):
+        return default
+
+def normalize_metric(value, min_val=0, max_val=1):
+    if max_val == min_val:
+        return 0
+    return max(0, min(1, (value - min_val) / (max_val - min_val)))
+
+def baseline_merchandise_score(channel_data, video_data):
+    """The original scalar calculate_merchandise_score() (default weights)"""
+    engagement_raw = safe_divide(video_data["avg_likes"] + video_data["avg_comments"], video_data["avg_views"])
+    comment_rate_raw = safe_divide(video_data["avg_comments"], video_data["avg_views"])
+    consistent_reach_raw = safe_divide(video_data["avg_views"], channel_data["subs"])
+    if len(video_data["dates"]) > 1:
+        span_days = max(7, (max(video_data["dates"]) - min(video_data["dates"])).days)
+        upload_consistency_raw = len(video_data["dates"]) / span_days * 30
+    else:
+        upload_consistency_raw = len(video_data["dates"]) / DAYS_LOOKBACK * 30
+    view_velocity_raw = safe_divide(video_data["total_views"], channel_data["views_total"])
+    like_rate_raw = safe_divide(video_data["avg_likes"], video_data["avg_views"])
+
+    norms = {
+        "engagement_norm": normalize_metric(engagement_raw, 0, 0.10),
+        "comment_rate_norm": normalize_metric(comment_rate_raw, 0, 0.02),
+        "consistent_reach_norm": normalize_metric(consistent_reach_raw, 0, 0.50),
+        "upload_consistency_norm": normalize_metric(upload_consistency_raw, 0, 15),
+        "view_velocity_norm": normalize_metric(view_velocity_raw, 0, 0.10),
+        "like_rate_norm": normalize_metric(like_rate_raw, 0, 0.06),
+    }
+    score = (0.30 * norms["engagement_norm"] + 0.20 * norms["consistent_reach_norm"]
+             + 0.20 * norms["comment_rate_norm"] + 0.10 * norms["upload_consistency_norm"]
+             + 0.10 * norms["view_velocity_norm"] + 0.10 * norms["like_rate_norm"])
+    return {"score": score, **norms, "engagement_raw": engagement_raw, "comment_rate_raw": comment_rate_raw,
+            "like_rate_raw": like_rate_raw, "view_velocity_raw": view_velocity_raw,
+            "upload_consistency_raw": upload_consistency_raw}
+
+def make_channel(rng, index, now, count=None, subs=None, views_total=None, span_days=None):
+    """A channel's data and its qualifying videos' totals and upload times"""
+    count = rng.randint(0, 25) if count is None else count
+    span_days = rng.choice([0.2, 3, 6.9, 7, 20, 59]) if span_days is None else span_days
+    dates = sorted(pd.Timestamp(now - timedelta(days=rng.uniform(0, span_days))).floor("s")
+                   for _ in range(count))
+    views = [rng.randint(0, 3_000_000) for _ in range(count)]
+    likes = [rng.randint(0, v // 8 + 1) for v in views]
+    comments = [rng.randint(0, v // 40 + 1) for v in views]
+    video_data = {
+        "dates": dates,
+        "total_views": sum(views),
+        "avg_views": safe_divide(sum(views), count),
+        "avg_likes": safe_divide(sum(likes), count),
+        "avg_comments": safe_divide(sum(comments), count),
+        "qualifying_likes": sum(likes),
+        "qualifying_comments": sum(comments),
+    }
+    channel_data = {
+        "subs": rng.randint(10_000, 5_000_000) if subs is None else subs,
+        "views_total": rng.randint(1_000_000, 900_000_000) if views_total is None else views_total,
+    }
+    return f"UC{index:022d}", channel_data, video_data
+
+@pytest.fixture
+def channels():
+    """Fixed channels, with the edge cases (no views, zero subscribers, short spans, too few videos)"""
+    rng = random.Random(5)
+    now = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+    fixed = [
+        make_channel(rng, 0, now, count=7, span_days=0.2),
+        make_channel(rng, 1, now, count=12, subs=0),
+        make_channel(rng, 2, now, count=9, views_total=0),
+        make_channel(rng, 3, now, count=6),
+        make_channel(rng, 4, now, count=1),
+    ]
+    return fixed + [make_channel(rng, index, now) for index in range(5, 80)]
+
+def all_channels_frame(channels):
+    """The ALL_CHANNELS columns score_channels() reads, as main() writes them"""
+    rows = []
+    for channel_id, channel_data, video_data in channels:
+        count = len(video_data["dates"])
+        rows.append({
+            "Channel_Name": f"Channel {channel_id[-3:]}",
+            "Channel_ID": channel_id,
+            "CSV_Subs": channel_data["subs"],
+            "Actual_Subs": channel_data["subs"],
+            "Total_Channel_Views": channel_data["views_total"],
+            "Qualifying_Videos_60d": count,
+            "Avg_Views_Qualified": round(video_data["avg_views"]) if count else 0,
+            "Avg_Likes_Qualified": round(video_data["avg_likes"]) if count else 0,
+            "Avg_Comments_Qualified": round(video_data["avg_comments"]) if count else 0,
+            "Total_Views_Qualified": video_data["total_views"],
+            "Total_Likes_Qualified": video_data["qualifying_likes"],
+            "Total_Comments_Qualified": video_data["qualifying_comments"],
+            "First_Qualifying_Upload": video_data["dates"][0].isoformat() if count else "",
+            "Last_Qualifying_Upload": video_data["dates"][-1].isoformat() if count else "",
+            "Search_Term": "term",
+            "Query_Name": "q",
+        })
+    return pd.DataFrame(rows)
+
+def summary_of(yt, video_data):
+    count = len(video_data["dates"])
+    return yt.VideoSummary(
+        total_videos_fetched=count, total_likes_all=0, total_comments_all=0, total_views_all=0,
+        qualifying_video_count=count, qualifying_likes=video_data["qualifying_likes"],
+        qualifying_comments=video_data["qualifying_comments"], qualifying_views=video_data["total_views"],
+        first_upload=video_data["dates"][0].value if count else None,
+        last_upload=video_data["dates"][-1].value if count else None,
+        shorts_skipped=0, old_videos_skipped=0, too_short_skipped=0, duration_missing=0,
+    )
+
+def test_channel_scores_match_the_scalar_formulas(load_scraper, channels):
+    yt = load_scraper()
+    for channel_id, channel_data, video_data in channels:
+        if not video_data["dates"]:
+            continue
+        expected = baseline_merchandise_score(channel_data, video_data)
+        scored = yt.calculate_merchandise_score(channel_data, summary_of(yt, video_data))
+        assert scored.keys() == expected.keys()
+        for name, value in expected.items():
+            assert scored[name] == pytest.approx(value, rel=1e-12, abs=1e-15), (channel_id, name)
+
+def test_qualified_table_matches_the_per_channel_loop(load_scraper, channels):
+    yt = load_scraper()
+
+    qualified = yt.score_channels(all_channels_frame(channels))
+
+    expected = []
+    for channel_id, channel_data, video_data in channels:
+        if len(video_data["dates"]) < MIN_VIDEOS_IN_TIMEFRAME or video_data["avg_views"] == 0:
+            continue
+        score = baseline_merchandise_score(channel_data, video_data)
+        expected.append({
+            "Channel_ID": channel_id,
+            "Engagement_Rate": round(score["engagement_raw"] * 100, 3),
+            "Comment_Rate": round(score["comment_rate_raw"] * 100, 3),
+            "Consistent_Reach": round(score["consistent_reach_norm"], 2),
+            "Upload_Per_Month": round(score["upload_consistency_raw"], 1),
+            "View_Velocity": round(score["view_velocity_norm"], 2),
+            "Like_Rate": round(score["like_rate_raw"] * 100, 3),
+            "Merch_Score": round(score["score"], 4),
+            "_score": score["score"],
+        })
+    expected.sort(key=lambda row: -row["_score"])
+
+    assert len(expected) > 40
+    assert qualified["Channel_ID"].tolist() == [row["Channel_ID"] for row in expected]
+    for column in ("Engagement_Rate", "Comment_Rate", "Consistent_Reach", "Upload_Per_Month", "View_Velocity",
+                   "Like_Rate", "Merch_Score"):
+        assert qualified[column].tolist() == pytest.approx([row[column] for row in expected], abs=1e-9), column
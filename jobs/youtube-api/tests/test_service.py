@@ -0,0 +1,109 @@
+"""The resident scraper service (--serve) driven over HTTP against the fake YouTube API server"""
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from helpers import configure
+
+JOB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def service(load_scraper, fake_api, input_csv):
+    """A ThreadingHTTPServer running ServiceRequestHandler on a free port, with the fake API behind it"""
+    api = fake_api()
+    yt = configure(load_scraper(api.url), input_csv, cache=True, incremental=True)
+    server = yt.ThreadingHTTPServer(("127.0.0.1", 0), yt.ServiceRequestHandler)
+    server.service = yt.ScraperService(workers=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield yt, api, server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def request(server, method, path, body=b""):
+    """Returns (status, events) for a streamed job, (status, body) otherwise"""
+    connection = http.client.HTTPConnection(*server.server_address, timeout=60)
+    try:
+        connection.request(method, path, body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        data = response.read().decode("utf-8")
+        if response.getheader("Content-Type") == "application/x-ndjson":
+            return response.status, [json.loads(line) for line in data.splitlines()]
+        return response.status, json.loads(data)
+    finally:
+        connection.close()
+
+def run_job(server, job=None):
+    status, events = request(server, "POST", "/run", json.dumps(job or {}).encode("utf-8"))
+    assert status == 200
+    assert events[0]["event"] == "started"
+    assert events[-1]["event"] == "done", events[-1]
+    return events
+
+def log_lines(events):
+    return [event["line"] for event in events if event["event"] == "log"]
+
+def test_a_second_run_reuses_the_warm_state(service):
+    yt, api, server = service
+
+    first = run_job(server, {"run_id": "first"})
+    first_requests = sum(api.stats["requests"].values())
+    key_pool, cache = yt.KEY_POOL, yt.RESPONSE_CACHE
+    second = run_job(server, {"run_id": "second"})
+    second_requests = sum(api.stats["requests"].values()) - first_requests
+
+    assert first[-1]["summary"]["seen"] == second[-1]["summary"]["seen"] > 0
+    assert any("kept in memory" in line for line in log_lines(second))
+    assert not any("kept in memory" in line for line in log_lines(first))
+    assert yt.KEY_POOL is key_pool and yt.RESPONSE_CACHE is cache
+    assert second_requests < first_requests / 2  # Served from the warm cache
+
+    status, health = request(server, "GET", "/health")
+    assert status == 200
+    assert health["jobs_run"] == 2 and health["status"] == "idle"
+    assert health["input_channels"] == first[-1]["summary"]["seen"]
+
+def test_bad_job_requests_do_not_stop_the_service(service):
+    yt, api, server = service
+
+    assert request(server, "POST", "/run", b'{"max_chann')[0] == 400
+    assert request(server, "POST", "/run", b'["not", "an", "object"]')[0] == 400
+    status, body = request(server, "POST", "/run", b'{"bogus": 1}')
+    assert status == 400 and "bogus" in body["error"]
+    assert request(server, "POST", "/refresh", b"{}")[0] == 400
+    assert request(server, "POST", "/nope")[0] == 404
+
+    events = run_job(server, {"max_channels": 5})
+    assert events[-1]["summary"]["seen"] == 5
+    assert all(isinstance(event, dict) and "event" in event for event in events)
+
+def test_a_client_that_goes_away_does_not_stop_the_job(service):
+    yt, api, server = service
+
+    connection = http.client.HTTPConnection(*server.server_address, timeout=60)
+    connection.request("POST", "/run", b'{"run_id": "abandoned"}', {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    assert json.loads(response.readline())["event"] == "started"
+    connection.close()
+
+    # The job runs to its end with nobody reading its events
+    while True:
+        status, body = request(server, "GET", "/health")
+        if body["status"] == "idle":
+            break
+        time.sleep(0.05)
+    assert body["jobs_run"] == 1 and body["last"]["error"] is None
+    run_job(server, {"run_id": "next"})
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_service_client_parses_the_event_stream():
+    """The scheduler's runOnService() (youtubeapi-service.js), run against stub servers by node --test"""
+    result = subprocess.run(["node", "--test", "tests/"], cwd=JOB_DIR, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout[-4000:]
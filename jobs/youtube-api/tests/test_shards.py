@@ -0,0 +1,35 @@
+"""Sorting a shard's results file for merge_shards()"""
+import random
+
+import pytest
+
+def write_rows(yt, path, count, seed=5):
+    """A results file of `count` rows in shuffled order, with ties and missing subscriber counts"""
+    rng = random.Random(seed)
+    rows = [{"Channel_ID": f"UC{i % 23:022d}", "Channel_Name": f"Channel {i % 23}",
+             "CSV_Subs": None if i % 23 == 4 else (i % 23 // 3) * 1000,
+             "Search_Term": rng.choice(["merch", "shop", None]), "Query_Name": f"query_{i}",
+             "Status": "ok"} for i in range(count)]
+    rng.shuffle(rows)
+    sink = yt._sink_for(path)
+    for row in rows:
+        sink.write(row)
+    sink.close()
+
+@pytest.mark.parametrize("ext", ["csv", "parquet"])
+def test_sort_result_file_spills_batches_and_merges_them(load_scraper, monkeypatch, tmp_path, ext):
+    yt = load_scraper()
+    path = str(tmp_path / f"ALL_CHANNELS_shard1of2.{ext}")
+    write_rows(yt, path, 200)
+    expected = sorted(yt.iter_result_rows(path), key=yt.result_sort_key)
+
+    spilled = []
+    spill_run = yt._spill_run
+    monkeypatch.setattr(yt, "_spill_run", lambda run, directory: spilled.append(len(run)) or spill_run(run, directory))
+    monkeypatch.setattr(yt, "INPUT_CHUNK_SIZE", 32)
+    yt.sort_result_file(path)
+
+    assert spilled == [32] * 6 + [8]  # Every batch became a run on disk
+    rows = list(yt.iter_result_rows(path))
+    assert [row["Query_Name"] for row in rows] == [row["Query_Name"] for row in expected]
+    assert not list(tmp_path.glob("*.sorting.*"))
@@ -0,0 +1,102 @@
+"""Snapshot history (SnapshotStore) and growth columns, and channels whose lookup fails"""
+import glob
+import json
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from helpers import configure, run
+
+MIN_SUBS = 10000
+
+def input_rows(input_csv):
+    """The input rows that pass the subscriber filter"""
+    rows = pd.read_csv(input_csv, dtype={"channel_id": str})
+    return rows[rows["subscribers"] >= MIN_SUBS]
+
+def journaled_ids(yt):
+    with open(yt.CHECKPOINT_FILE, encoding="utf-8") as f:
+        return {record["channel_id"] for record in map(json.loads, f) if "channel_id" in record}
+
+def test_failed_channel_lookups_are_not_journaled_and_resume_retries_them(load_scraper, fake_api, input_csv,
+                                                                          failing_endpoint):
+    lookups_fail = {"id": True}
+    failing_endpoint("channels", lambda params: lookups_fail["id"] and "id" in params)  # Batches fail, forHandle works
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv)
+    yt.REQUEUE_ROUNDS = 1
+
+    first = run(yt, run_id="first")
+
+    rows = input_rows(input_csv)
+    handles = set(rows["channel_id"][rows["channel_id"].str.startswith("@")])
+    results = pd.read_csv(first["all_channels_file"]).set_index("Channel_ID")
+    assert handles and len(handles) < len(rows)
+    assert (results.loc[sorted(handles), "Status"] != "Fetch failed").all()
+    assert (results.drop(index=sorted(handles))["Status"] == "Fetch failed").all()
+    assert journaled_ids(yt) == handles
+
+    lookups_fail["id"] = False
+    yt = configure(load_scraper(server.url), input_csv)
+    resumed = run(yt, resume=True, run_id="resumed")
+
+    assert resumed["fetched"] == len(rows) - len(handles)
+    assert (pd.read_csv(resumed["all_channels_file"])["Status"] != "Fetch failed").all()
+    assert journaled_ids(yt) == set(rows["channel_id"])
+
+def test_growth_per_day_since_the_last_snapshot(load_scraper, fake_api, world, input_csv, failing_endpoint):
+    server = fake_api()
+    yt = configure(load_scraper(server.url), input_csv, snapshots=True)
+    yt.SNAPSHOT_FORMAT = "csv"
+    yt.HANDLE_INDEX_FILE = None  # Handles are looked up with forHandle every run
+    first = run(yt, run_id="first")
+
+    rows = input_rows(input_csv)
+    results = pd.read_csv(first["all_channels_file"])
+    assert results["Subs_Growth_Per_Day"].isna().all()  # No baseline yet
+    assert results["Views_Growth_Per_Day"].isna().all()
+
+    # Two days later every channel has 1,000 more subscribers (its views scale with them); one handle fails
+    index_path = os.path.join(yt.SNAPSHOT_DIR, "index.sqlite")
+    conn = sqlite3.connect(index_path)
+    conn.execute("UPDATE channel_latest SET observed_at = observed_at - 2 * 86400")
+    conn.commit()
+    conn.close()
+    subscribers = world.subscribers
+    world.subscribers = lambda index: subscribers(index) + 1000
+    failed_handle = sorted(rows["channel_id"][rows["channel_id"].str.startswith("@")])[0]
+    failing_endpoint("channels", lambda params: params.get("forHandle", "").lstrip("@") == failed_handle[1:])
+
+    yt = configure(load_scraper(server.url), input_csv, snapshots=True)
+    yt.SNAPSHOT_FORMAT = "csv"
+    yt.HANDLE_INDEX_FILE = None
+    yt.REQUEUE_ROUNDS = 0
+    second = run(yt, run_id="second")
+
+    results = pd.read_csv(second["all_channels_file"]).set_index("Channel_ID")
+    failed = results.loc[failed_handle]
+    assert failed["Status"] == "Fetch failed"
+    assert pd.isna(failed["Subs_Growth_Per_Day"]) and pd.isna(failed["Views_Growth_Per_Day"])
+
+    analyzed = results.drop(index=failed_handle)
+    assert len(analyzed) == len(rows) - 1
+    for channel_id, row in analyzed.iterrows():
+        index = world.channel_index(channel_id)
+        views_ratio = int(world.channel_item(index)["statistics"]["viewCount"]) // world.subscribers(index)
+        assert row["Subs_Growth_Per_Day"] == pytest.approx(500, abs=0.1)
+        assert row["Views_Growth_Per_Day"] == pytest.approx(1000 * views_ratio / 2, rel=1e-4)
+
+    # One snapshot file per run; the failed channel is only in the first, and its baseline did not move
+    channel_files = sorted(glob.glob(os.path.join(yt.SNAPSHOT_DIR, "channels", "date=*", "*.csv")))
+    assert len(channel_files) == 2
+    snapshots = [pd.read_csv(path) for path in channel_files]
+    assert len(snapshots[0]) == len(rows) and len(snapshots[1]) == len(rows) - 1
+    assert snapshots[1]["Subs_Per_Day"].round(1).eq(500).all()
+    assert len(glob.glob(os.path.join(yt.SNAPSHOT_DIR, "videos", "date=*", "*.csv"))) == 2
+
+    conn = sqlite3.connect(index_path)
+    stale = conn.execute("SELECT COUNT(*) FROM channel_latest WHERE subs_per_day IS NULL").fetchone()[0]
+    conn.close()
+    assert stale == 1  # Only the failed channel still has its first-run baseline
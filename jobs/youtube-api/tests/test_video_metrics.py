@@ -0,0 +1,143 @@
+"""The columnar video pipeline (build_video_frame / summarize_video_frame) against the per-video loop it replaced"""
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+DAYS_LOOKBACK = 60
+MAX_SHORT_DURATION = 60
+MIN_VIDEO_DURATION = 240
+
+def baseline_parse_duration(duration_str):
+    if not duration_str:
+        return None
+    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration_str)
+    if not match:
+        return None
+    return int(match.group(1) or 0) * 3600 + int(match.group(2) or 0) * 60 + int(match.group(3) or 0)
+
+def baseline_video_metrics(videos):
+    """The original per-video loop of get_video_metrics(), on already fetched items"""
+    if not videos:
+        return None
+    totals = dict.fromkeys(("likes_all", "comments_all", "views_all", "likes", "comments", "views",
+                            "shorts", "old", "too_short", "missing"), 0)
+    dates = []
+    cutoff_date = datetime.now() - timedelta(days=DAYS_LOOKBACK)
+
+    for video in videos:
+        stats = video.get("statistics", {})
+        snippet = video.get("snippet", {})
+        totals["likes_all"] += int(stats.get("likeCount", 0))
+        totals["comments_all"] += int(stats.get("commentCount", 0))
+        totals["views_all"] += int(stats.get("viewCount", 0))
+
+        try:
+            published_date = pd.to_datetime(snippet.get("publishedAt"))
+            published_date_naive = published_date.tz_localize(None) if published_date.tzinfo else published_date
+            if published_date_naive < cutoff_date:
+                totals["old"] += 1
+                continue
+        except Exception:
+            totals["old"] += 1
+            continue
+
+        duration_seconds = baseline_parse_duration(video.get("contentDetails", {}).get("duration"))
+        if duration_seconds is None:
+            totals["missing"] += 1
+            continue
+        if duration_seconds < MAX_SHORT_DURATION:
+            totals["shorts"] += 1
+            continue
+        if duration_seconds < MIN_VIDEO_DURATION:
+            totals["too_short"] += 1
+            continue
+
+        totals["likes"] += int(stats.get("likeCount", 0))
+        totals["comments"] += int(stats.get("commentCount", 0))
+        totals["views"] += int(stats.get("viewCount", 0))
+        dates.append(published_date)
+
+    return {"fetched": len(videos), "dates": dates, **totals}
+
+def video_item(vid, published_at, duration, views=None, likes=None, comments=None):
+    statistics = {name: str(value) for name, value in
+                  (("viewCount", views), ("likeCount", likes), ("commentCount", comments)) if value is not None}
+    item = {"id": vid, "snippet": {"publishedAt": published_at, "title": f"Video {vid}"}, "statistics": statistics,
+            "contentDetails": {}}
+    if duration is not None:
+        item["contentDetails"]["duration"] = duration
+    return item
+
+@pytest.fixture
+def channel_videos():
+    """Three channels of fixed items (with the filter edge cases) and a channel without any item"""
+    now = datetime.now(timezone.utc)
+    rng = random.Random(11)
+    durations = ["PT59S", "PT1M", "PT3M59S", "PT4M", "PT12M3S", "PT1H2M", "P0D", "PT", "", None, "garbage"]
+    items, channels = {}, []
+    for channel in range(3):
+        ids = []
+        for index in range(40):
+            vid = f"v{channel}_{index:02d}"
+            days_ago = rng.choice([0.5, 3, 12, 30, 45, 58, 75, 120, 400])
+            published_at = (now - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if index % 13 == 5:
+                published_at = "not a date"
+            views = rng.randint(0, 2_000_000)
+            items[vid] = video_item(vid, published_at, rng.choice(durations), views,
+                                    None if index % 7 == 3 else rng.randint(0, views // 20 + 1),  # Hidden likes
+                                    None if index % 11 == 4 else rng.randint(0, views // 200 + 1))
+            ids.append(vid)
+        channels.append(ids + [f"missing_{channel}"])  # Unavailable videos have no item
+    channels.append(["missing_3"])
+    return channels, items
+
+def test_summaries_match_the_per_video_loop(load_scraper, channel_videos):
+    yt = load_scraper()
+    channel_video_ids, items = channel_videos
+
+    summaries = yt.get_channel_video_metrics(channel_video_ids, items)
+
+    assert len(summaries) == len(channel_video_ids)
+    for video_ids, summary in zip(channel_video_ids, summaries):
+        expected = baseline_video_metrics([items[vid] for vid in video_ids if vid in items])
+        if expected is None:
+            assert summary is None
+            continue
+
+        assert summary.total_videos_fetched == expected["fetched"]
+        assert (summary.total_views_all, summary.total_likes_all, summary.total_comments_all) == \
+            (expected["views_all"], expected["likes_all"], expected["comments_all"])
+        assert summary.qualifying_video_count == len(expected["dates"])
+        assert (summary.qualifying_views, summary.qualifying_likes, summary.qualifying_comments) == \
+            (expected["views"], expected["likes"], expected["comments"])
+        assert (summary.old_videos_skipped, summary.duration_missing, summary.shorts_skipped,
+                summary.too_short_skipped) == (expected["old"], expected["missing"], expected["shorts"],
+                                               expected["too_short"])
+        assert summary.avg_views == pytest.approx(expected["views"] / len(expected["dates"]))
+        assert pd.Timestamp(summary.first_upload, tz="UTC") == min(expected["dates"])
+        assert pd.Timestamp(summary.last_upload, tz="UTC") == max(expected["dates"])
+
+def test_kept_titles_follow_the_qualifying_videos(load_scraper, channel_videos):
+    yt = load_scraper()
+    yt.KEEP_VIDEO_TITLES = True
+    channel_video_ids, items = channel_videos
+
+    summary = yt.get_channel_video_metrics(channel_video_ids[:1], items)[0]
+
+    expected = baseline_video_metrics([items[vid] for vid in channel_video_ids[0] if vid in items])
+    assert len(summary.titles) == len(summary.upload_epochs) == len(expected["dates"])
+    assert sorted(summary.upload_epochs) == sorted(date.value for date in expected["dates"])
+
+def test_get_video_metrics_summarizes_one_channel(load_scraper, channel_videos):
+    yt = load_scraper()
+    channel_video_ids, items = channel_videos
+
+    summary = yt.get_video_metrics(channel_video_ids[1], items)
+
+    expected = baseline_video_metrics([items[vid] for vid in channel_video_ids[1] if vid in items])
+    assert summary.qualifying_video_count == len(expected["dates"])
+    assert summary.qualifying_views == expected["views"]
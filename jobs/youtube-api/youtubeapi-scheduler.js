@@ -12,13 +12,19 @@
 // - Skips channels already analyzed today
 // - Continues until all API keys are exhausted
 // - Quota resets daily automatically
+// - With YOUTUBE_SERVICE_ADDRESS set, hands each run to a resident
+//   `youtubeapi.py --serve` process (warm caches and state) and logs its progress;
+//   those runs refresh only the channels that are due (by last score and volatility)
+//   and their metrics are served on /metrics (Prometheus) and /metrics.json
 //
 // ============================================================
 
 require('dotenv').config();
+const fs = require('fs');
 const http = require('http');
 const cron = require('node-cron');
 const { main } = require('./youtubeapi');
+const { runOnService } = require('./youtubeapi-service');
 const { initializeDatabase, closePool } = require('./db/connection');
 
 // Healthcheck server configuration
@@ -26,6 +32,17 @@ const HEALTHCHECK_PORT = process.env.PORT || 3000; // Railway sets PORT automati
 let healthcheckServer = null;
 const startTime = Date.now();
 
+// Resident Python scraper (youtubeapi.py --serve): host:port or unix:/path/to.sock
+const SERVICE_ADDRESS = process.env.YOUTUBE_SERVICE_ADDRESS;
+
+// Metrics files written by youtubeapi.py at the end of each run (only the Python
+// scraper records metrics). Each service run reports where it wrote them; the
+// env vars point at them before the first run (e.g. a service started earlier).
+const metricsFiles = {
+  prometheus: process.env.YOUTUBE_METRICS_FILE || null,
+  json: process.env.YOUTUBE_METRICS_JSON_FILE || null
+};
+
 // Calculate next run time (every 4 hours: 0, 4, 8, 12, 16, 20 UTC)
 function getNextRunTime() {
   const now = new Date();
@@ -64,6 +81,24 @@ function startHealthcheckServer() {
         nextRun: getNextRunTime().toISOString(),
         timestamp: new Date().toISOString()
       }));
+    } else if (SERVICE_ADDRESS && (req.url === '/metrics' || req.url === '/metrics.json')) {
+      // Metrics from the last scraper service run (Prometheus text or JSON)
+      const isJson = req.url === '/metrics.json';
+      const metricsFile = isJson ? metricsFiles.json : metricsFiles.prometheus;
+      if (!metricsFile) {
+        res.writeHead(404, { 'Content-Type': 'text/plain' });
+        res.end('No metrics yet - the scraper has not completed a run');
+        return;
+      }
+      fs.readFile(metricsFile, 'utf8', (error, content) => {
+        if (error) {
+          res.writeHead(404, { 'Content-Type': 'text/plain' });
+          res.end('No metrics yet - the scraper has not completed a run');
+          return;
+        }
+        res.writeHead(200, { 'Content-Type': isJson ? 'application/json' : 'text/plain; version=0.0.4' });
+        res.end(content);
+      });
     } else {
       res.writeHead(404, { 'Content-Type': 'text/plain' });
       res.end('Not Found');
@@ -73,6 +108,9 @@ function startHealthcheckServer() {
   server.listen(HEALTHCHECK_PORT, () => {
     console.log(`✓ Healthcheck server listening on port ${HEALTHCHECK_PORT}`);
     console.log(`  Healthcheck URL: http://localhost:${HEALTHCHECK_PORT}/health`);
+    if (SERVICE_ADDRESS) {
+      console.log(`  Metrics URL: http://localhost:${HEALTHCHECK_PORT}/metrics`);
+    }
   });
 
   return server;
@@ -112,7 +150,13 @@ cron.schedule('0 */4 * * *', async () => {
     
     // Run the scraper (will continue until all API keys are exhausted)
     // The main() function handles API key switching automatically
-    await main(null); // null = process all channels (no limit)
+    if (SERVICE_ADDRESS) {
+      // Resident Python scraper: only the incremental work is paid for, and only channels due for a refresh
+      const summary = await runOnService(SERVICE_ADDRESS, { prioritize: true });
+      Object.assign(metricsFiles, summary && summary.metrics_files);
+    } else {
+      await main(null); // null = process all channels (no limit)
+    }
     
     const duration = ((Date.now() - startTime) / 1000 / 60).toFixed(2);
     
@@ -156,6 +200,9 @@ if (process.env.NODE_ENV === 'development' && process.env.RUN_ON_STARTUP === 'tr
 const nextRun = getNextRunTime();
 console.log('\n✓ YouTube API scraper scheduled - runs every 4 hours starting at 12 AM UTC');
 console.log(`  Schedule: 12 AM, 4 AM, 8 AM, 12 PM, 4 PM, 8 PM UTC`);
+if (SERVICE_ADDRESS) {
+  console.log(`  Runs handed to the scraper service at ${SERVICE_ADDRESS}`);
+}
 console.log(`  Next run: ${nextRun.toISOString()} (${nextRun.getUTCHours()}:00 UTC)`);
 console.log(`  Current time: ${new Date().toISOString()}`);
 console.log('\n📡 Scheduler is running. Press Ctrl+C to stop.\n');
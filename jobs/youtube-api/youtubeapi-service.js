@@ -0,0 +1,86 @@
+// ============================================================
+// 🛰️ YouTube API Scraper Service Client
+// ============================================================
+//
+// Hands a run to a resident `youtubeapi.py --serve` process and
+// follows its newline-delimited JSON progress events.
+//
+// ============================================================
+
+const http = require('http');
+
+/**
+ * Run a job on the resident Python scraper service at address (host:port or
+ * unix:/path/to.sock), logging its streamed progress events. Resolves with
+ * the run summary.
+ */
+function runOnService(address, job = {}) {
+  const target = address.startsWith('unix:')
+    ? { socketPath: address.slice('unix:'.length) }
+    : { host: address.split(':').slice(0, -1).join(':') || '127.0.0.1', port: Number(address.split(':').pop()) };
+  const body = JSON.stringify(job);
+
+  return new Promise((resolve, reject) => {
+    const req = http.request({
+      ...target,
+      method: 'POST',
+      path: '/run',
+      headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+    }, (res) => {
+      let buffer = '';
+      let result;
+      let finished = false;
+      // A failed event or a body that is not JSON rejects; nothing throws inside the stream handlers
+      const handleEvent = (line) => {
+        if (result instanceof Error) {
+          return;
+        }
+        let event;
+        try {
+          event = JSON.parse(line);
+        } catch (error) {
+          result = new Error(`Scraper service: unreadable response (HTTP ${res.statusCode}): ${line.slice(0, 200)}`);
+          finished = true;
+          return;
+        }
+        if (res.statusCode !== 200) {
+          result = new Error(`Scraper service: ${event.error} (HTTP ${res.statusCode})`);
+          finished = true;
+        } else if (event.event === 'log') {
+          console.log(event.line);
+        } else if (event.event === 'error') {
+          result = new Error(`Scraper service: ${event.error}`);
+          finished = true;
+        } else if (event.event === 'done') {
+          result = event.summary;
+          finished = true;
+        }
+      };
+      res.setEncoding('utf8');
+      res.on('data', (chunk) => {
+        buffer += chunk;
+        if (res.statusCode !== 200) {
+          return; // An error body is one JSON object, parsed once it has all arrived
+        }
+        // Progress events are newline-delimited: log each complete line as it arrives
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach(handleEvent);
+      });
+      res.on('end', () => {
+        if (buffer.trim()) {
+          handleEvent(buffer);
+        }
+        if (!finished) {
+          result = new Error(`Scraper service: the run ended without a result (HTTP ${res.statusCode})`);
+        }
+        result instanceof Error ? reject(result) : resolve(result);
+      });
+      res.on('error', reject);
+    });
+    req.on('error', reject);
+    req.end(body);
+  });
+}
+
+module.exports = { runOnService };
@@ -14,8 +14,33 @@
 #    1. ALL_CHANNELS.csv - Raw data for every channel analyzed
 #    2. QUALIFIED_CHANNELS.csv - Only channels with >=7 qualifying videos + scores
 # ✅ Filters videos by: Date (60 days), Shorts (<60s), Short videos (<4min)
-# ✅ Multiple API key support with automatic failover
-# ✅ API quota tracking
+# ✅ Playlist prefilter: channels with too few uploads in the window skip videos.list entirely
+# ✅ Multiple API key support: requests spread over every key with quota left
+# ✅ Persistent per-key quota ledger (resets at midnight Pacific), stops before a 403
+# ✅ API quota tracking, per operation and per key
+# ✅ Run metrics (latency histograms, requests, quota) exported as JSON + Prometheus text
+# ✅ Retries with jittered backoff, per-endpoint circuit breakers and re-queued batches
+# ✅ Concurrent channel processing with per-key token-bucket rate limiting
+# ✅ UC... IDs resolved 50 per channels.list call (1 unit per batch)
+# ✅ videos.list calls packed to 50 IDs across channels
+# ✅ On-disk SQLite response cache with per-resource TTL and ETag revalidation
+# ✅ Crash-safe checkpoint journal with --resume
+# ✅ Incremental per-channel fetching: only new uploads + bounded stats refresh
+# ✅ Persistent @handle -> UC... index; duplicate input rows fetched once and fanned out
+# ✅ Date-partitioned snapshot history of channel/video stats; subscriber/view growth per day
+# ✅ Vectorized video metrics: dates, durations and filters parsed in bulk
+# ✅ Compact per-channel video records (__slots__, int64 epoch upload times, titles only on request)
+# ✅ Vectorized scoring with named weight profiles (--profile, --rescore)
+# ✅ Streaming, chunked CSV input with flat memory (top-N by subscribers via heap)
+# ✅ Results streamed to disk in batches as channels finish (CSV or Parquet)
+# ✅ Database mode (--db): channels streamed from Postgres/SQLite, results bulk-upserted back
+# ✅ Sharding (--shard i/N, --shards N): disjoint channels and API keys per process/node, --merge
+# ✅ Offline quota planner: --dry-run projects cost/completions, --plan orders the queue
+# ✅ Refresh prioritization (--prioritize): intervals from last Merch_Score, volatility and staleness
+# ✅ Fast, offline startup: lazy imports, API clients built once per key from the bundled discovery doc
+# ✅ Offline benchmarks: YOUTUBE_API_ROOT_URL points the client at youtubeapi_fakeserver.py
+# ✅ Minimal `part` + `fields` masks per endpoint; response bytes and JSON decode time metered
+# ✅ Resident service mode (--serve): warm clients/caches/input index, run + refresh jobs with streamed progress
 #
 # ============================================================
 
@@ -23,37 +48,145 @@
 # !pip install google-api-python-client pandas numpy --quiet
 
 import os
-from googleapiclient.discovery import build
+import sys
+import importlib.util
 from googleapiclient.errors import HttpError
-import pandas as pd
-import numpy as np
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import re
+import argparse
+import signal
+import socketserver
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import pickle
+from array import array
+import random
+import sqlite3
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+try:
+    import fcntl                      # POSIX file locks for the files concurrent runs share
+except ImportError:
+    fcntl = None
+
+def _lazy_import(name):
+    """Import a module on first attribute access
+
+    pandas and numpy take ~0.5s to import; the scheduler's repeated runs and
+    the offline helpers should not pay for that until data is processed.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+pd = _lazy_import("pandas")
+np = _lazy_import("numpy")
+pa = pq = None                        # Optional pyarrow, imported on first Parquet use
+psycopg2 = None                       # Optional PostgreSQL driver, imported when a postgres:// database is opened
 
 # -------------------- CONFIG --------------------
-# MULTIPLE API KEYS - Will automatically switch when quota exceeded!
+# MULTIPLE API KEYS - Requests are spread over every key with quota left!
 API_KEYS = [
     # hardcode keys here
 ]
 
-# Current API key index
-CURRENT_KEY_INDEX = 0
-API_KEY = API_KEYS[CURRENT_KEY_INDEX]
-os.environ['YOUTUBE_API_KEY'] = API_KEY
+# ...or provide them in the environment: YOUTUBE_API_KEYS="key1,key2" (or a single YOUTUBE_API_KEY)
+if not API_KEYS:
+    API_KEYS = [key.strip() for key in os.environ.get('YOUTUBE_API_KEYS', os.environ.get('YOUTUBE_API_KEY', '')).split(',')
+                if key.strip()]
+
+# API client configuration
+DISCOVERY_DOC_FILE = 'youtube_v3_discovery.json'  # Local copy, used when the client library has no bundled one
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+API_ROOT_URL = os.environ.get('YOUTUBE_API_ROOT_URL')  # e.g. http://127.0.0.1:8085/ for the fake API server (None = Google)
+FIELD_MASKS = True                # Ask only for the fields the scraper reads (`fields=`), see REQUEST_PROFILES
+
+# Minimal `part` set and `fields` mask per endpoint (items keep their etag for the response cache)
+REQUEST_PROFILES = {
+    "channels": {
+        "part": "statistics,contentDetails",
+        "fields": "etag,items(id,etag,statistics(subscriberCount,viewCount,videoCount),"
+                  "contentDetails/relatedPlaylists/uploads)",
+    },
+    "playlistItems": {
+        "part": "contentDetails",
+        "fields": "etag,nextPageToken,items/contentDetails(videoId,videoPublishedAt)",
+    },
+    "videos": {
+        "part": "snippet,statistics,contentDetails",
+        "fields": "etag,items(id,etag,snippet(publishedAt,title),statistics(viewCount,likeCount,commentCount),"
+                  "contentDetails/duration)",
+    },
+}
+
+# Quota ledger configuration
+QUOTA_LEDGER_FILE = 'youtube_quota_ledger.json'  # Units spent per key today, shared by every run
+QUOTA_SAFETY_MARGIN = 50          # Units per key left unspent so the pool stops before a 403
+QUOTA_LEDGER_SYNC_SECONDS = 5     # How often spending is merged into the ledger file
+try:
+    QUOTA_RESET_TZ = ZoneInfo("America/Los_Angeles")  # Daily quota resets at midnight Pacific
+except ZoneInfoNotFoundError:
+    QUOTA_RESET_TZ = timezone(timedelta(hours=-8))
+
+# Retry configuration (429 / 5xx / connection errors)
+RETRY_MAX_ATTEMPTS = 5            # Tries per request before it is given up
+RETRY_BASE_DELAY = 1.0            # Backoff base in seconds, doubled per attempt (full jitter)
+RETRY_MAX_DELAY = 32.0            # Backoff cap in seconds (a Retry-After header can raise it)
+REQUEUE_ROUNDS = 2                # Extra passes over batches that still failed, at the end of a stage
+BREAKER_FAILURE_THRESHOLD = 5     # Consecutive transient failures that open an endpoint's circuit
+BREAKER_COOLDOWN = 30.0           # Seconds an open circuit holds requests before one probe
 
 # CSV Input configuration
 CSV_INPUT_FILE = 'youtube_channels_with_ids.csv'  # Your input CSV with channel IDs
 # For testing with channels that will qualify, use:
 # CSV_INPUT_FILE = 'youtube_test_longform_channels.csv'
 
+# Database configuration (--db: read channels from the database and upsert results into it)
+INPUT_SOURCE = 'csv'              # 'csv' or 'db'
+DATABASE_URL = os.environ.get('DATABASE_URL')  # postgresql://... (needs psycopg2) or sqlite:///path/to/file.db
+DB_CHANNELS_TABLE = 'youtube_channels'         # Input table (jobs/db/schema.sql + channel_id column)
+DB_RESULTS_TABLE = 'youtube_channel_results'   # Latest analysis per channel and search term, upserted
+DB_REANALYZE_AFTER = 20 * 3600    # Channels analyzed more recently than this (seconds) are not selected
+DB_FETCH_ROWS = 5000              # Rows per round trip from the server-side cursor
+
 # Filter configuration
 MIN_SUBS_FILTER = 10000           # Filter out channels below this
 
+# Input streaming configuration
+INPUT_CHUNK_SIZE = 100000         # CSV rows read (and filtered) at a time
+INPUT_DTYPES = {                  # dtype hints so chunks parse consistently
+    "channel_id": str,
+    "channel_name": str,
+    "subscribers": str,           # Coerced with pd.to_numeric: a non-numeric cell only drops its row
+    "search_term": str,
+    "query_name": str,
+}
+
 # Analysis configuration
 VIDEOS_PER_CHANNEL = 50           # Fetch up to 50 videos (still only 1 unit cost!)
 MIN_VIDEOS_IN_TIMEFRAME = 7       # Require at least 7 qualifying videos FOR SCORING
 DAYS_LOOKBACK = 60                # Look back 60 days (2 months)
+PLAYLIST_PREFILTER = True         # Skip videos.list for channels whose uploads playlist shows < MIN_VIDEOS_IN_TIMEFRAME
+                                  # uploads in the DAYS_LOOKBACK window; only in-window uploads are fetched
+KEEP_VIDEO_TITLES = False         # Keep each channel's qualifying titles + upload times in memory (not needed for scoring)
 
 # Duration filters
 MIN_VIDEO_DURATION = 240          # Minimum 240 seconds (4 minutes)
@@ -61,51 +194,391 @@ MAX_SHORT_DURATION = 60           # Maximum 60 seconds for Shorts detection
 
 # Optional: Limit number of channels to process (set to None for all)
 MAX_CHANNELS_TO_PROCESS = None    # Set to a number like 100 for testing, None for all
-# ------------------------------------------------
 
-youtube = build("youtube", "v3", developerKey=API_KEY)
+# Concurrency configuration
+MAX_WORKERS = 8                   # Channels processed in parallel (1 = sequential)
+REQUESTS_PER_SECOND_PER_KEY = 5   # Token-bucket refill rate per API key (None = unlimited)
+REQUEST_BURST_PER_KEY = 10        # Token-bucket capacity per API key
+
+# Batching configuration
+IDS_PER_REQUEST = 50              # Max IDs per channels.list / videos.list call
+PIPELINE_WAVE_SIZE = 200          # Channels resolved and processed per pipeline wave
+
+# Response cache configuration
+CACHE_ENABLED = True
+CACHE_DB_FILE = 'youtube_api_cache.sqlite'
+CACHE_TTL_SECONDS = {             # How long a cached response is served without asking the API
+    "channels": 24 * 3600,        # Channel stats and uploads playlist
+    "playlistItems": 6 * 3600,    # Upload lists (revalidated with ETag once stale)
+    "videos": 12 * 3600,          # Video stats and details
+}
+CACHE_MAX_BYTES = 256 * 1024**2   # Least recently used entries are evicted beyond this
+
+# Checkpoint configuration
+CHECKPOINT_FILE = 'youtube_scraper_checkpoint.jsonl'  # Append-only journal of finished channels
+
+# Incremental fetch configuration
+INCREMENTAL_FETCH = True          # Reuse per-channel state from previous runs
+CHANNEL_STATE_FILE = 'youtube_channel_state.sqlite'
+VIDEO_STATS_MAX_AGE = 24 * 3600   # Stored video stats older than this are stale
+VIDEO_STATS_REFRESH_PER_CHANNEL = 10  # Max stale videos re-fetched per channel per run
+
+# Handle index configuration
+HANDLE_INDEX_FILE = 'youtube_handle_index.sqlite'  # @handle -> UC... ID, learned from forHandle lookups (None = disabled)
+HANDLE_INDEX_MAX_AGE = 30 * 24 * 3600  # Entries older than this are resolved with forHandle again
+
+# Snapshot store configuration (channel and video stats of every run, for growth rates)
+SNAPSHOT_DIR = 'youtube_snapshots'  # Date-partitioned snapshot files + index.sqlite (None = disabled)
+SNAPSHOT_FORMAT = 'parquet'       # 'parquet' (falls back to 'csv' without pyarrow) or 'csv'
+SNAPSHOT_GROWTH_MIN_INTERVAL = 20 * 3600  # Snapshots closer than this to the baseline reuse its growth rates
+
+# Scoring configuration
+SCORING_PROFILE = 'default'       # Weight profile used for Merch_Score
+SCORING_PROFILES_FILE = 'scoring_profiles.json'  # Optional extra profiles: {"name": {"weights": {...}, "caps": {...}}}
+
+# Refresh prioritization (--prioritize: only channels due for a refresh, most overdue first)
+REFRESH_PRIORITY = False          # Channels get refresh intervals from their last score and volatility
+REFRESH_MIN_INTERVAL = 3 * 3600   # Interval of top scorers / fast movers (under the scheduler's 4h tick: every run)
+REFRESH_MAX_INTERVAL = 7 * 24 * 3600  # Interval of dormant low scorers
+REFRESH_TOP_SCORE = 0.70          # Merch_Score that earns the shortest interval ("Excellent")
+REFRESH_GROWTH_SCALE = 0.01       # Subscriber or view growth per day (fraction of the total) that counts as fully volatile
+REFRESH_SCORE_CHANGE_SCALE = 0.10 # Merch_Score change between the last two analyses that counts as fully volatile
+REFRESH_NEW_PRIORITY = 2.0        # Priority of never-analyzed channels (known ones: time since analysis / interval)
+
+# Planner configuration (--dry-run / --plan)
+PLAN_PRIOR_QUALIFY_RATE = 0.3     # Qualify chance assumed for new channels when no channel has history yet
+PLAN_HISTORY_WEIGHT = 0.8         # Weight of a channel's last outcome vs the qualify rate of known channels
+
+# Metrics configuration (written at the end of each run)
+METRICS_JSON_FILE = 'youtube_metrics.json'        # Latency histograms, request counts, quota per operation/key
+METRICS_PROMETHEUS_FILE = 'youtube_metrics.prom'  # Same metrics in Prometheus text format (served on /metrics)
+
+# Output configuration
+OUTPUT_FORMAT = 'csv'             # 'csv' or 'parquet' (Parquet needs pyarrow)
+OUTPUT_BATCH_ROWS = 5000          # Result rows buffered per write (one Parquet row group)
+
+# Sharding configuration (--shard i/N on each node, or --shards N for local processes; --merge combines them)
+SHARD = None                      # (index, count) once configure_shard() has run; None = unsharded
+SHARD_SPEC = os.environ.get('YOUTUBE_SHARD')  # "i/N" (1-based), e.g. one shard per Railway replica
+
+# Service configuration (--serve: resident process that takes run / refresh jobs over HTTP)
+SERVICE_ADDRESS = os.environ.get('YOUTUBE_SERVICE_ADDRESS', '127.0.0.1:8765')  # host:port or unix:/path/to.sock
+# ------------------------------------------------
 
-# Global quota tracker
+# Global quota tracker (units spent by this run, all keys)
 QUOTA_USED = 0
 QUOTA_LIMIT = 10000
 
+# Shared state for concurrent workers
+KEY_LOCK = threading.RLock()      # Guards the shared caches, pools and quota counters
+KEYS_EXHAUSTED = False            # Set once no API key has quota left
+KEY_POOL = None                   # KeyPool, opened on first use
+RATE_LIMITERS = {}                # API key index -> TokenBucket
+YOUTUBE_CLIENTS = {}              # API key index -> YouTube client, built on first use
+DISCOVERY_DOC = None              # YouTube Data API discovery document (JSON text), loaded once
+_thread_local = threading.local() # Per-thread HTTP connections (httplib2 is not thread-safe)
+
+class AllKeysExhaustedError(Exception):
+    """Raised when no configured API key has daily quota left"""
+
+# Retry counters, reported at the end of main()
+RETRY_STATS = {"retried": 0, "abandoned": 0, "requeued": 0, "breaker_trips": 0}
+CIRCUIT_BREAKERS = {}             # API endpoint -> CircuitBreaker
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket used to rate limit requests on one API key"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
 # ------------------------------------------------
 # 🔑 API KEY MANAGEMENT
 # ------------------------------------------------
 
-def switch_api_key():
-    """Switch to the next available API key when quota is exceeded"""
-    global CURRENT_KEY_INDEX, API_KEY, youtube, QUOTA_USED
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on path (created if missing) across processes; a no-op without fcntl"""
+    if fcntl is None:
+        yield
+        return
+    try:
+        f = open(path, "a")
+    except OSError:
+        yield  # Unwritable directory: the ledger write reports the problem
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
 
-    CURRENT_KEY_INDEX += 1
+def quota_day():
+    """The current quota day - YouTube resets daily quotas at midnight Pacific time"""
+    return datetime.now(QUOTA_RESET_TZ).date().isoformat()
 
-    if CURRENT_KEY_INDEX >= len(API_KEYS):
-        print("\n" + "="*70)
-        print("❌ ALL API KEYS EXHAUSTED!")
-        print("="*70)
-        print(f"Used all {len(API_KEYS)} API keys.")
-        print("Please wait until tomorrow for quota reset or add more API keys.")
-        print("="*70)
-        return False
+def key_fingerprint(api_key):
+    """Short, non-reversible ID for an API key (the ledger never stores keys)"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
 
-    # Switch to new key
-    API_KEY = API_KEYS[CURRENT_KEY_INDEX]
-    os.environ['YOUTUBE_API_KEY'] = API_KEY
+class KeyPool:
+    """
+    Spreads requests over every API key with quota left, backed by an
+    on-disk quota ledger.
+
+    The ledger (JSON) holds the units each key spent on the current quota
+    day, so the scheduler's repeated runs start from what earlier runs
+    already spent; it starts over when the day rolls past midnight Pacific.
+    Spending is merged into the file (not overwritten) under an exclusive
+    lock on <ledger>.lock, so concurrent runs and shards add up. Each
+    request is charged to the key with the most quota left before it is
+    sent, and refunded if the attempt turns out not to be billed (a
+    transient failure or quotaExceeded). A key is skipped once a request
+    would take it past limit - margin - the pool stops before the API
+    answers 403. A 403 quotaExceeded (quota spent elsewhere) still takes
+    a key out for the day.
+    """
 
-    # Rebuild YouTube client with new key
-    youtube = build("youtube", "v3", developerKey=API_KEY)
+    def __init__(self, keys, limit, path, margin=0):
+        self.keys = list(keys)
+        self.fingerprints = [key_fingerprint(key) for key in self.keys]
+        self.limit = limit
+        self.margin = margin
+        self.path = path
+        self.lock = threading.Lock()
+        self.day = None
+        self.spent = [0] * len(self.keys)       # Units spent today (all runs)
+        self.run_spent = [0] * len(self.keys)   # Units spent by this process
+        self.pending = [0] * len(self.keys)     # Spent but not yet written to the ledger
+        self.exhausted = set()
+        self.synced_at = 0
+        with self.lock:
+            self._sync()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                ledger = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            print(f"⚠️ Quota ledger {self.path} is unreadable - starting it over")
+            return {}
+        return ledger.get("keys", {}) if ledger.get("day") == self.day else {}
+
+    def _sync(self):
+        """Merge unsaved spending into the ledger file and reload every key's total"""
+        day = quota_day()
+        if day != self.day:
+            self.day = day
+            self.pending = [0] * len(self.keys)
+            self.exhausted = set()
+
+        # Other processes merge into the same file: read-modify-write under their shared lock
+        with file_lock(self.path + ".lock"):
+            self._merge()
+
+    def _merge(self):
+        """_sync() body; the caller holds the ledger's file lock"""
+        stored = self._load()
+        entries = {}
+        for i, fingerprint in enumerate(self.fingerprints):
+            entry = stored.get(fingerprint, {})
+            self.spent[i] = entry.get("spent", 0) + self.pending[i]
+            if entry.get("exhausted"):
+                self.exhausted.add(i)
+            entries[fingerprint] = {"spent": self.spent[i], "exhausted": i in self.exhausted}
+
+        # Keys not configured in this run keep their entries
+        for fingerprint, entry in stored.items():
+            entries.setdefault(fingerprint, entry)
+
+        ledger = {"day": self.day, "updated_at": datetime.now().isoformat(), "keys": entries}
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(ledger, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.pending = [0] * len(self.keys)
+        except OSError as e:
+            print(f"⚠️ Could not write quota ledger {self.path}: {e}")
+        self.synced_at = time.monotonic()
+
+    def acquire(self, cost):
+        """Charge `cost` units to the key with the most quota left; returns its index (None if none fits)"""
+        with self.lock:
+            if time.monotonic() - self.synced_at > QUOTA_LEDGER_SYNC_SECONDS or quota_day() != self.day:
+                self._sync()
+
+            usable = [i for i in range(len(self.keys))
+                      if i not in self.exhausted and self.spent[i] + cost <= self.limit - self.margin]
+            if not usable:
+                return None
 
-    # Reset quota counter for new key
-    QUOTA_USED = 0
+            key_index = min(usable, key=lambda i: self.spent[i])
+            self.spent[key_index] += cost
+            self.run_spent[key_index] += cost
+            self.pending[key_index] += cost
+            return key_index
+
+    def refund(self, key_index, cost):
+        """Give back what acquire() charged for an attempt the API did not bill"""
+        with self.lock:
+            self.spent[key_index] -= cost
+            self.run_spent[key_index] -= cost
+            self.pending[key_index] -= cost  # Negative once synced: the merge takes it off the ledger
+
+    def mark_exhausted(self, key_index):
+        """Take a key out of the pool for the rest of the quota day"""
+        with self.lock:
+            self.exhausted.add(key_index)
+            self._sync()
+
+    def remaining(self):
+        """Units each key can still be charged today (0 for exhausted keys)"""
+        with self.lock:
+            return [0 if i in self.exhausted else max(0, self.limit - self.margin - spent)
+                    for i, spent in enumerate(self.spent)]
+
+    def close(self):
+        with self.lock:
+            self._sync()
+
+def get_key_pool():
+    """Return the shared KeyPool, loading the quota ledger on first use"""
+    global KEY_POOL
+    with KEY_LOCK:
+        if KEY_POOL is None:
+            KEY_POOL = KeyPool(API_KEYS, QUOTA_LIMIT, QUOTA_LEDGER_FILE, QUOTA_SAFETY_MARGIN)
+        return KEY_POOL
+
+def report_keys_exhausted():
+    """Flag that no key has quota left (printed once)"""
+    global KEYS_EXHAUSTED
+    with KEY_LOCK:
+        if KEYS_EXHAUSTED:
+            return
+        KEYS_EXHAUSTED = True
 
     print("\n" + "="*70)
-    print(f"🔄 SWITCHING TO API KEY #{CURRENT_KEY_INDEX + 1}")
+    print("❌ ALL API KEYS EXHAUSTED!")
+    print("="*70)
+    print(f"Used today's quota on all {len(API_KEYS)} API keys (ledger: {QUOTA_LEDGER_FILE}).")
+    print("Please wait until midnight Pacific for the quota reset or add more API keys.")
     print("="*70)
-    print(f"Key: {API_KEY[:20]}...{API_KEY[-4:]}")
-    print(f"Quota reset to: 0/{QUOTA_LIMIT:,}")
-    print("="*70 + "\n")
 
-    return True
+def get_discovery_doc():
+    """
+    Return the YouTube Data API discovery document, loaded once.
+
+    Uses the copy bundled with google-api-python-client (2.x), else the
+    local DISCOVERY_DOC_FILE; only if neither exists is it downloaded once
+    and saved there. Building clients from it never needs the network.
+    """
+    global DISCOVERY_DOC
+    with KEY_LOCK:
+        if DISCOVERY_DOC is None:
+            try:
+                from googleapiclient.discovery_cache import get_static_doc
+                DISCOVERY_DOC = get_static_doc("youtube", "v3")
+            except ImportError:
+                pass
+
+        if DISCOVERY_DOC is None:
+            try:
+                with open(DISCOVERY_DOC_FILE, encoding="utf-8") as f:
+                    DISCOVERY_DOC = f.read()
+            except FileNotFoundError:
+                from googleapiclient.http import build_http
+                response, content = build_http().request(DISCOVERY_URL)
+                if response.status != 200:
+                    raise RuntimeError(f"Could not download the discovery document ({response.status})")
+                DISCOVERY_DOC = content.decode("utf-8")
+                with open(DISCOVERY_DOC_FILE, "w", encoding="utf-8") as f:
+                    f.write(DISCOVERY_DOC)
+
+        return DISCOVERY_DOC
+
+def build_youtube_client(api_key):
+    """Build a YouTube client for one API key from the discovery document (no network)
+
+    Requests go to API_ROOT_URL instead of Google when it is set (the
+    offline benchmark points it at youtubeapi_fakeserver.py).
+    """
+    from googleapiclient.discovery import build_from_document
+    client_options = {"api_endpoint": API_ROOT_URL} if API_ROOT_URL else None
+    return build_from_document(get_discovery_doc(), developerKey=api_key, client_options=client_options)
+
+def request_params(endpoint):
+    """The part (and, with FIELD_MASKS, fields) parameters of a list() call on an endpoint"""
+    profile = REQUEST_PROFILES[endpoint]
+    return dict(profile) if FIELD_MASKS else {"part": profile["part"]}
+
+def metered_response(operation, postproc):
+    """
+    Wrap a request's response parser to record, per operation, the body
+    bytes received (labelled with the transfer encoding - httplib2 has
+    already gunzipped them) and the time spent decoding the JSON.
+    """
+    def parse(resp, content):
+        encoding = resp.get("-content-encoding", "identity") if hasattr(resp, "get") else "identity"
+        METRICS.increment("api_response_bytes_total", (("operation", operation), ("encoding", encoding)), len(content or b""))
+        started = time.perf_counter()
+        try:
+            return postproc(resp, content)
+        finally:
+            METRICS.increment("api_decode_seconds_total", (("operation", operation),), time.perf_counter() - started)
+    return parse
+
+def get_youtube_client(key_index):
+    """Return the YouTube client for an API key, building it on first use
+
+    Clients are shared by all threads; requests run on the calling thread's
+    own connection (get_thread_http()).
+    """
+    with KEY_LOCK:
+        if key_index not in YOUTUBE_CLIENTS:
+            YOUTUBE_CLIENTS[key_index] = build_youtube_client(API_KEYS[key_index])
+        return YOUTUBE_CLIENTS[key_index]
+
+def get_thread_http():
+    """Return this thread's HTTP connection, reused for requests on every key
+
+    httplib2 connections must not be shared between threads, so each worker
+    keeps one and passes it to execute().
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        from googleapiclient.http import build_http
+        http = _thread_local.http = build_http()
+    return http
+
+def get_rate_limiter(key_index):
+    """Return the token bucket for an API key, creating it on first use"""
+    with KEY_LOCK:
+        if key_index not in RATE_LIMITERS:
+            RATE_LIMITERS[key_index] = TokenBucket(REQUESTS_PER_SECOND_PER_KEY, REQUEST_BURST_PER_KEY)
+        return RATE_LIMITERS[key_index]
 
 def is_quota_exceeded_error(error):
     """Check if error is due to quota exceeded"""
@@ -116,21 +589,254 @@ def is_quota_exceeded_error(error):
                 return True
     return False
 
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    After `threshold` consecutive transient failures the circuit opens and
+    requests to the endpoint wait `cooldown` seconds instead of piling more
+    load onto a failing backend. Then a single probe request goes through:
+    success closes the circuit, another failure opens it again. A probe
+    that ends without reaching the endpoint (abandon()) hands the probe to
+    the next request.
+    """
+
+    def __init__(self, endpoint, threshold, cooldown):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_until = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block while the circuit is open or another request is probing it; True if this caller is the probe"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.state == "closed":
+                    return False
+                if self.state == "open" and now >= self.opened_until:
+                    self.state = "half_open"  # This caller is the probe
+                    return True
+                delay = max(self.opened_until - now, 0.05) if self.state == "open" else 0.05
+            time.sleep(delay)
+
+    def abandon(self):
+        """Give up a probe that got no answer from the endpoint: the next request probes instead"""
+        with self.lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_until = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state != "half_open" and self.failures < self.threshold:
+                return
+            self.state = "open"
+            self.failures = 0
+            self.opened_until = time.monotonic() + self.cooldown
+        _count_retry("breaker_trips")
+        print(f"    🔌 Circuit open for {self.endpoint}: pausing requests for {self.cooldown:.0f}s")
+
+def get_circuit_breaker(operation):
+    """Return the circuit breaker of the endpoint an operation calls (channels_batch -> channels)"""
+    endpoint = operation.split("_")[0]
+    with KEY_LOCK:
+        if endpoint not in CIRCUIT_BREAKERS:
+            CIRCUIT_BREAKERS[endpoint] = CircuitBreaker(endpoint, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+        return CIRCUIT_BREAKERS[endpoint]
+
+def _count_retry(stat, amount=1):
+    with KEY_LOCK:
+        RETRY_STATS[stat] += amount
+
+def is_transient_error(error):
+    """Check if an error is worth retrying: 429, 5xx, rate limits and connection failures"""
+    if isinstance(error, HttpError):
+        if error.resp.status in TRANSIENT_STATUS_CODES:
+            return True
+        content = str(error.content)
+        return error.resp.status == 403 and ('rateLimitExceeded' in content or 'userRateLimitExceeded' in content)
+
+    httplib2 = sys.modules.get("httplib2")
+    if httplib2 is not None and isinstance(error, httplib2.HttpLib2Error):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+def retry_delay(attempt, error=None):
+    """Exponential backoff with full jitter; a Retry-After header sets the minimum"""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    if isinstance(error, HttpError):
+        retry_after = str(error.resp.get("retry-after", ""))
+        if retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+    return delay
+
+def map_with_requeue(fn, tasks, mapper=map, label="requests"):
+    """
+    Run fn over tasks with mapper, re-queueing tasks that fail transiently.
+
+    execute_request() already retries each request with backoff; tasks that
+    still failed go to the back of the queue and get up to REQUEUE_ROUNDS
+    more passes once the rest of the stage is done, giving the endpoint's
+    circuit time to recover. Other errors are not retried.
+
+    Returns (results, failed): results in task order with None for failed
+    tasks, and the indexes of the tasks that failed.
+    """
+    results = [None] * len(tasks)
+    pending = list(range(len(tasks)))
+
+    def attempt(index):
+        try:
+            return index, fn(tasks[index]), None
+        except Exception as e:
+            return index, None, e
+
+    failed = []
+    for round_number in range(REQUEUE_ROUNDS + 1):
+        if round_number:
+            print(f"    🔁 Re-queueing {len(pending)} failed {label}")
+            _count_retry("requeued", len(pending))
+
+        retry = []
+        for index, result, error in mapper(attempt, pending):
+            if error is None:
+                results[index] = result
+            elif is_transient_error(error) and not KEYS_EXHAUSTED:
+                retry.append(index)
+            else:
+                if not isinstance(error, AllKeysExhaustedError):
+                    print(f"    ⚠️ Error in {label}: {error}")
+                failed.append(index)
+
+        pending = retry
+        if not pending:
+            break
+
+    failed.extend(pending)
+    if pending:
+        print(f"    ❌ Gave up on {len(pending)} {label} after {REQUEUE_ROUNDS} re-queue round(s)")
+    return results, sorted(failed)
+
+def execute_request(operation, cost, make_request):
+    """
+    Execute a YouTube API request on the pool key with the most quota left.
+
+    make_request(client) must return the request object to execute. The
+    cost is charged to the key before the call (and refunded for an attempt
+    that is not billed, so a retried request is charged once), the call
+    waits on the key's token bucket and on the endpoint's circuit breaker,
+    and a quotaExceeded takes the key out of the pool and retries on another. Transient errors
+    (429, 5xx, connection failures) are retried up to RETRY_MAX_ATTEMPTS
+    times with jittered exponential backoff. Raises AllKeysExhaustedError
+    once no key can take the request; any other error (or a transient one
+    that kept failing) propagates to the caller.
+    """
+    pool = get_key_pool()
+    breaker = get_circuit_breaker(operation)
+    attempts = 0
+
+    while True:
+        key_index = pool.acquire(cost)
+        if key_index is None:
+            report_keys_exhausted()
+            raise AllKeysExhaustedError()
+
+        # Only a request that holds a key may become the breaker's probe, and
+        # a probe always settles the breaker (answer, failure or abandon())
+        probing = breaker.wait()
+        settled = billed = False
+        try:
+            client = get_youtube_client(key_index)
+            get_rate_limiter(key_index).acquire()
+
+            started = time.perf_counter()
+            try:
+                request = make_request(client)
+                if hasattr(request, "postproc"):
+                    request.postproc = metered_response(operation, request.postproc)
+                res = request.execute(http=get_thread_http())
+            except Exception as e:
+                METRICS.observe("api_request_seconds", operation, time.perf_counter() - started)
+                status = str(e.resp.status) if isinstance(e, HttpError) else type(e).__name__
+                METRICS.increment("api_requests_total", (("operation", operation), ("status", status)))
+
+                if is_transient_error(e):
+                    breaker.record_failure()
+                    settled = True
+                    attempts += 1
+                    if attempts >= RETRY_MAX_ATTEMPTS:
+                        _count_retry("abandoned")
+                        print(f"    ❌ {operation} failed {attempts} times, giving up: {e}")
+                        raise
+                    _count_retry("retried")
+                    time.sleep(retry_delay(attempts, e))
+                    continue
+
+                if not isinstance(e, HttpError):
+                    raise
+
+                breaker.record_success()  # The endpoint answered
+                settled = True
+                if is_quota_exceeded_error(e):
+                    print(f"    ⚠️ Quota exceeded on API key #{key_index + 1} - retrying on the other keys")
+                    pool.mark_exhausted(key_index)
+                    continue
+
+                # Error responses (including 304 Not Modified) are still billed
+                billed = True
+                track_quota(operation, cost, key_index)
+                raise
+
+            METRICS.observe("api_request_seconds", operation, time.perf_counter() - started)
+            METRICS.increment("api_requests_total", (("operation", operation), ("status", "200")))
+            breaker.record_success()
+            settled = billed = True
+            track_quota(operation, cost, key_index)
+            return res
+        finally:
+            if not billed:
+                pool.refund(key_index, cost)
+            if probing and not settled:
+                breaker.abandon()
+
 # ------------------------------------------------
 # 🛡️ HELPER FUNCTIONS
 # ------------------------------------------------
 
-def track_quota(operation, cost):
-    """Track API quota usage and warn if approaching limit"""
+def print_key_usage(pool):
+    """Print each API key's spending for this run and for the whole quota day"""
+    for i, api_key in enumerate(pool.keys):
+        status = " (exhausted)" if i in pool.exhausted else ""
+        print(f"   API Key #{i + 1} ({api_key[:8]}...{api_key[-4:]}): {pool.run_spent[i]:,} units this run | "
+              f"{pool.spent[i]:,}/{QUOTA_LIMIT:,} today ({pool.spent[i] / QUOTA_LIMIT * 100:.1f}%){status}")
+
+def track_quota(operation, cost, key_index=None):
+    """Track API quota used by this run (per operation and key) and warn as a key approaches its daily limit"""
     global QUOTA_USED
-    QUOTA_USED += cost
+    with KEY_LOCK:
+        QUOTA_USED += cost
+        used = QUOTA_USED
+    key_label = str(key_index + 1) if key_index is not None else "unknown"
+    METRICS.increment("quota_units_total", (("operation", operation), ("key", key_label)), cost)
 
-    percentage = (QUOTA_USED / QUOTA_LIMIT) * 100
+    if key_index is not None:
+        spent = get_key_pool().spent[key_index]
+        warn_at = QUOTA_LIMIT * 0.9
+        if spent >= warn_at > spent - cost:  # Warning at 90%
+            print(f"⚠️ WARNING: API key #{key_index + 1} has used {spent:,}/{QUOTA_LIMIT:,} units today ({spent / QUOTA_LIMIT * 100:.1f}%)")
 
-    if QUOTA_USED > 9000:  # Warning at 90%
-        print(f"⚠️ WARNING: {QUOTA_USED:,}/{QUOTA_LIMIT:,} quota used ({percentage:.1f}%)")
-    elif QUOTA_USED > 0 and QUOTA_USED % 1000 < 100:  # Milestone updates
-        print(f"📊 Quota: {QUOTA_USED:,}/{QUOTA_LIMIT:,} used ({percentage:.1f}%)")
+    if used % 1000 < cost:  # Milestone updates
+        print(f"📊 Quota: {used:,} units used this run")
 
 def safe_divide(numerator, denominator, default=0):
     """Safely divide, returning default if denominator is 0"""
@@ -170,57 +876,1604 @@ def parse_duration(duration_str):
         return None
 
 # ------------------------------------------------
-# 1️⃣ Load channels from CSV
+# 📈 RUN METRICS
 # ------------------------------------------------
-def get_channels_from_csv():
+
+# Latency histogram bucket upper bounds, in seconds
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Exported metric name -> (Prometheus type, help text)
+METRIC_DEFINITIONS = {
+    "api_request_seconds": ("histogram", "Latency of YouTube API requests by operation"),
+    "stage_seconds": ("histogram", "Time spent per pipeline stage call (channel_lookup, playlist_fetch, video_fetch, filtering, scoring)"),
+    "api_requests_total": ("counter", "YouTube API requests by operation and outcome"),
+    "quota_units_total": ("counter", "Quota units spent by operation and API key"),
+    "cache_events_total": ("counter", "Response cache events"),
+    "retry_events_total": ("counter", "Retried, re-queued and abandoned requests and circuit breaker trips"),
+    "key_quota_spent_today": ("gauge", "Units spent today per API key, from the quota ledger"),
+    "channels": ("gauge", "Channels seen, fetched, written and qualified in the run"),
+    "prefilter_skips_total": ("counter", "Channels and videos the uploads-playlist prefilter kept out of videos.list"),
+    "run_duration_seconds": ("gauge", "Wall-clock duration of the run"),
+    "api_response_bytes_total": ("counter", "Response body bytes received by operation and transfer encoding (after gunzip)"),
+    "api_decode_seconds_total": ("counter", "Time spent parsing response JSON by operation"),
+    "refresh_decisions_total": ("counter", "Input channels the refresh prioritization queued (new, due) or deferred"),
+}
+
+class RunMetrics:
+    """
+    Thread-safe counters and latency histograms for one run.
+
+    Histograms are keyed by (name, label value) and counters by (name,
+    labels), where labels is a tuple of (label, value) pairs. write()
+    exports everything as JSON and as Prometheus text, which the scheduler's
+    healthcheck server serves on /metrics.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def observe(self, name, label, seconds):
+        """Record one latency sample in the (name, label) histogram"""
+        with self.lock:
+            histogram = self.histograms.get((name, label))
+            if histogram is None:
+                histogram = self.histograms[(name, label)] = {"buckets": [0] * len(METRICS_BUCKETS), "count": 0, "sum": 0.0}
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            index = bisect.bisect_left(METRICS_BUCKETS, seconds)
+            if index < len(METRICS_BUCKETS):
+                histogram["buckets"][index] += 1
+
+    def increment(self, name, labels, amount=1):
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def _label_name(self, name):
+        return "stage" if name == "stage_seconds" else "operation"
+
+    def snapshot(self, gauges=None):
+        """Return all metrics as a JSON-serializable dict; gauges are {(name, labels): value}"""
+        with self.lock:
+            histograms = {}
+            for (name, label), histogram in sorted(self.histograms.items()):
+                cumulative = list(itertools.accumulate(histogram["buckets"]))
+                histograms.setdefault(name, {})[label] = {
+                    "count": histogram["count"],
+                    "sum": round(histogram["sum"], 6),
+                    "buckets": {str(bound): count for bound, count in zip(METRICS_BUCKETS, cumulative)},
+                }
+
+            values = {}
+            for (name, labels), value in sorted({**self.counters, **(gauges or {})}.items()):
+                values.setdefault(name, []).append({"labels": dict(labels), "value": value})
+
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "written_at": datetime.now().isoformat(),
+                "histograms": histograms,
+                "metrics": values,
+            }
+
+    def to_prometheus(self, gauges=None, prefix="youtube_scraper_"):
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot(gauges)
+        lines = []
+
+        def labels_text(labels):
+            if not labels:
+                return ""
+            escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+            return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+        for name in METRIC_DEFINITIONS:
+            metric_type, help_text = METRIC_DEFINITIONS[name]
+            if name not in snapshot["histograms"] and name not in snapshot["metrics"]:
+                continue
+            lines.append(f"# HELP {prefix}{name} {help_text}")
+            lines.append(f"# TYPE {prefix}{name} {metric_type}")
+
+            for label, histogram in snapshot["histograms"].get(name, {}).items():
+                label_name = self._label_name(name)
+                for bound, count in histogram["buckets"].items():
+                    lines.append(f"{prefix}{name}_bucket{labels_text({label_name: label, 'le': bound})} {count}")
+                lines.append(f"{prefix}{name}_bucket{labels_text({label_name: label, 'le': '+Inf'})} {histogram['count']}")
+                lines.append(f"{prefix}{name}_sum{labels_text({label_name: label})} {histogram['sum']}")
+                lines.append(f"{prefix}{name}_count{labels_text({label_name: label})} {histogram['count']}")
+
+            for sample in snapshot["metrics"].get(name, []):
+                lines.append(f"{prefix}{name}{labels_text(sample['labels'])} {sample['value']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prometheus_path=None, gauges=None):
+        """Write the metrics files (each atomically, so readers never see half a file)"""
+        outputs = []
+        if json_path:
+            outputs.append((json_path, json.dumps(self.snapshot(gauges), indent=2)))
+        if prometheus_path:
+            outputs.append((prometheus_path, self.to_prometheus(gauges)))
+
+        for path, content in outputs:
+            try:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {path}: {e}")
+
+METRICS = RunMetrics()
+
+@contextmanager
+def timed_stage(stage):
+    """Record how long the wrapped pipeline stage took"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe("stage_seconds", stage, time.perf_counter() - started)
+
+def write_run_metrics(channels=None):
+    """
+    Write the run's metrics files, adding cache/retry/ledger figures;
+    channels is {kind: count}. Returns {"json" / "prometheus": absolute
+    path} of the files written (the scheduler serves them from there).
     """
-    Load channels from CSV file with filters:
+    gauges = {("run_duration_seconds", ()): round(time.time() - METRICS.started_at, 3)}
+    for kind, count in (channels or {}).items():
+        gauges[("channels", (("kind", kind),))] = count
+    for event, count in CACHE_STATS.items():
+        gauges[("cache_events_total", (("event", event),))] = count
+    for event, count in RETRY_STATS.items():
+        gauges[("retry_events_total", (("event", event),))] = count
+    if API_KEYS:
+        pool = get_key_pool()
+        for i, spent in enumerate(pool.spent):
+            gauges[("key_quota_spent_today", (("key", str(i + 1)),))] = spent
+    METRICS.write(METRICS_JSON_FILE, METRICS_PROMETHEUS_FILE, gauges)
+    return {kind: os.path.abspath(path)
+            for kind, path in (("json", METRICS_JSON_FILE), ("prometheus", METRICS_PROMETHEUS_FILE)) if path}
+
+def print_transfer_summary(channels):
+    """Print the response bytes received and JSON decode time of the run, per endpoint and per channel"""
+    received, decoding = {}, {}
+    with METRICS.lock:
+        for (name, labels), value in METRICS.counters.items():
+            endpoint = dict(labels).get("operation", "").split("_")[0]
+            if name == "api_response_bytes_total":
+                received[endpoint] = received.get(endpoint, 0) + value
+            elif name == "api_decode_seconds_total":
+                decoding[endpoint] = decoding.get(endpoint, 0) + value
+    if not received:
+        return
+    total = sum(received.values())
+    print(f"📦 Responses: {total / 1024:,.0f} KB received ({total / 1024 / max(channels, 1):.1f} KB per channel) | "
+          f"{sum(decoding.values()) * 1000:,.0f} ms decoding JSON - "
+          + " | ".join(f"{endpoint} {size / 1024:,.0f} KB" for endpoint, size in sorted(received.items())))
+
+# ------------------------------------------------
+# 💾 RESPONSE CACHE
+# ------------------------------------------------
+
+# Cache counters, reported at the end of main()
+CACHE_STATS = {"hits": 0, "misses": 0, "revalidated": 0, "quota_saved": 0}
+RESPONSE_CACHE = None
+
+class ResponseCache:
+    """
+    SQLite cache of YouTube API responses, keyed by (resource, key).
+
+    Entries older than their resource's TTL are stale: they are no longer
+    served directly, but their ETag can still be used for a conditional
+    request. The least recently used entries are evicted once the total
+    body size exceeds max_bytes. The total is kept in the database by
+    triggers, so processes sharing the file (shards) all see every write.
+    """
+
+    def __init__(self, path, ttl_seconds, max_bytes):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                resource TEXT NOT NULL,
+                key TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (resource, key)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO cache_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))")
+        self.conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+            BEGIN UPDATE cache_size SET total_bytes = total_bytes + NEW.size; END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses
+            BEGIN UPDATE cache_size SET total_bytes = total_bytes + NEW.size - OLD.size; END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+            BEGIN UPDATE cache_size SET total_bytes = total_bytes - OLD.size; END;
+        """)
+        self.conn.commit()
+
+    @property
+    def total_bytes(self):
+        """Body bytes in the cache, written by every process sharing it"""
+        return self.conn.execute("SELECT total_bytes FROM cache_size").fetchone()[0]
+
+    def get_many(self, resource, keys, touch=True):
+        """Return {key: (body, etag, is_fresh)} for the cached keys
+
+        touch=False peeks without refreshing the entries' LRU position.
+        """
+        now = time.time()
+        ttl = self.ttl_seconds.get(resource, 0)
+        found = {}
+        keys = list(keys)
+
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT key, body, etag, fetched_at FROM responses WHERE resource = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [resource, *chunk]
+                ).fetchall()
+                for key, body, etag, fetched_at in rows:
+                    found[key] = (json.loads(body), etag, now - fetched_at < ttl)
+
+            if found and touch:
+                self.conn.executemany(
+                    "UPDATE responses SET accessed_at = ? WHERE resource = ? AND key = ?",
+                    [(now, resource, key) for key in found]
+                )
+                self.conn.commit()
+
+        return found
+
+    def get(self, resource, key):
+        """Return (body, etag, is_fresh) for a cached key, or None"""
+        return self.get_many(resource, [key]).get(key)
+
+    def put_many(self, resource, entries):
+        """Store (key, body, etag) entries, evicting old entries if over budget"""
+        now = time.time()
+        rows = [(resource, key, json.dumps(body), etag, now) for key, body, etag in entries]
+
+        with self.lock:
+            # An upsert (not REPLACE, whose implicit delete skips triggers) keeps cache_size exact
+            self.conn.executemany(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (resource, key) DO UPDATE SET body = excluded.body, etag = excluded.etag, "
+                "size = excluded.size, fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at",
+                [(resource_, key, body, etag, len(body), fetched_at, fetched_at)
+                 for resource_, key, body, etag, fetched_at in rows]
+            )
+            self.conn.commit()
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def put(self, resource, key, body, etag=None):
+        self.put_many(resource, [(key, body, etag)])
+
+    def touch(self, resource, key):
+        """Mark an entry as fresh again after a 304 Not Modified"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE resource = ? AND key = ?",
+                (now, now, resource, key)
+            )
+            self.conn.commit()
+
+    def _evict(self):
+        """Delete least recently used entries until 90% of max_bytes is free"""
+        target = self.max_bytes * 0.9
+        total = self.total_bytes
+        cursor = self.conn.execute("SELECT rowid, size FROM responses ORDER BY accessed_at ASC")
+        doomed = []
+        for rowid, size in cursor:
+            if total <= target:
+                break
+            doomed.append((rowid,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE rowid = ?", doomed)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def get_response_cache():
+    """Return the shared ResponseCache, opening it on first use (None if disabled)"""
+    global RESPONSE_CACHE, CACHE_ENABLED
+    if not CACHE_ENABLED:
+        return None
+
+    with KEY_LOCK:
+        if RESPONSE_CACHE is None:
+            try:
+                RESPONSE_CACHE = ResponseCache(CACHE_DB_FILE, CACHE_TTL_SECONDS, CACHE_MAX_BYTES)
+            except sqlite3.Error as e:
+                print(f"⚠️ Response cache disabled ({CACHE_DB_FILE}): {e}")
+                CACHE_ENABLED = False
+        return RESPONSE_CACHE
+
+def _count_cache(stat, amount=1):
+    with KEY_LOCK:
+        CACHE_STATS[stat] += amount
+
+def get_cached_items(resource, ids):
+    """
+    Split item IDs into fresh cached items and IDs that must be fetched.
+
+    Returns ({id: item}, [missing ids]). Stale entries count as missing.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return {}, list(ids)
+
+    cached = cache.get_many(resource, ids)
+    hits = {key: body for key, (body, etag, fresh) in cached.items() if fresh}
+    missing = [key for key in ids if key not in hits]
+
+    # Only whole requests are saved: IDs are packed IDS_PER_REQUEST per call
+    saved = math.ceil(len(ids) / IDS_PER_REQUEST) - math.ceil(len(missing) / IDS_PER_REQUEST)
+    _count_cache("hits", len(hits))
+    _count_cache("misses", len(missing))
+    _count_cache("quota_saved", saved)
+    return hits, missing
+
+def store_items(resource, items):
+    """Store API items in the cache under their "id" field"""
+    cache = get_response_cache()
+    if cache is not None and items:
+        cache.put_many(resource, [(item["id"], item, item.get("etag")) for item in items])
+
+def execute_cached_request(resource, key, operation, cost, make_request):
+    """
+    execute_request() behind the response cache.
+
+    Fresh entries are returned without calling the API. Stale entries with
+    an ETag are revalidated with If-None-Match; a 304 reuses the cached body.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return execute_request(operation, cost, make_request)
+
+    cached = cache.get(resource, key)
+    if cached and cached[2]:
+        _count_cache("hits")
+        _count_cache("quota_saved", cost)
+        return cached[0]
+
+    etag = cached[1] if cached else None
+
+    def conditional_request(yt):
+        req = make_request(yt)
+        if etag:
+            req.headers["If-None-Match"] = etag
+        return req
+
+    try:
+        res = execute_request(operation, cost, conditional_request)
+    except HttpError as e:
+        if etag and e.resp.status == 304:
+            cache.touch(resource, key)
+            _count_cache("revalidated")
+            return cached[0]
+        raise
+
+    _count_cache("misses")
+    cache.put(resource, key, res, res.get("etag"))
+    return res
+
+# ------------------------------------------------
+# 📝 CHECKPOINT JOURNAL
+# ------------------------------------------------
+
+def _journal_default(value):
+    """JSON encoder for values in result dicts (publish dates are Timestamps)"""
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of finished channels.
+
+    One line is written and fsynced per process_channel() result, so a crash
+    loses at most the channel in flight. The first line records the input
+    file the journal belongs to.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+        if not resume or self.file.tell() == 0:
+            self._write({"_checkpoint": {"input": input_name(), "started_at": datetime.now().isoformat()}})
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, default=_journal_default) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, channel_id, result):
+        """Journal one channel's result (None for channels that could not be retrieved)"""
+        self._write({"channel_id": channel_id, "result": result})
+
+    def close(self):
+        self.file.close()
+
+def load_checkpoint(path):
+    """
+    Load a checkpoint journal written by CheckpointJournal.
+
+    Returns {channel_id: result}. A torn final line from a crash mid-write
+    is ignored.
+    """
+    journaled = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if "_checkpoint" in record:
+                    if record["_checkpoint"].get("input") != input_name():
+                        print(f"  ⚠️ Checkpoint was written for {record['_checkpoint'].get('input')}, not {input_name()}")
+                    continue
+
+                # Journals written before results were stripped may still carry the payloads
+                journaled[record["channel_id"]] = result_row(record.get("result"))
+    except FileNotFoundError:
+        print(f"  ⚠️ No checkpoint found at {path} - starting fresh")
+
+    return journaled
+
+def result_row(result):
+    """A result without its per-channel payloads (the _video_data / _channel_data records)"""
+    if result is None:
+        return None
+    return {key: value for key, value in result.items() if not key.startswith("_")}
+
+def _should_journal(result):
+    """Fetch failures and failures after every key ran out are retried on resume"""
+    if result is not None and result.get("_retry"):
+        return False
+    if not KEYS_EXHAUSTED:
+        return True
+    return result is not None and result.get("Status") not in ("No videos found", "Video analysis failed")
+
+# ------------------------------------------------
+# 🗂️ CHANNEL STATE STORE
+# ------------------------------------------------
+
+CHANNEL_STATE = None
+
+class ChannelStateStore:
+    """
+    SQLite store of what previous runs learned about each channel.
+
+    For every channel it keeps the recent upload IDs (newest first) with
+    their playlist publish times; for every video, the last fetched
+    videos.list item. Repeat runs use it to stop paging the uploads playlist
+    at known videos and to request videos.list only for new uploads plus a
+    bounded refresh of stale stats. The last two Merch_Scores of each
+    channel (0 when it did not qualify) drive refresh prioritization.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_state (
+                channel_id TEXT PRIMARY KEY,
+                video_ids TEXT NOT NULL,
+                newest_video_id TEXT,
+                newest_published_at TEXT,
+                status TEXT,
+                qualifying_count INTEGER,
+                analyzed_at REAL NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(channel_state)")}
+        if "upload_times" not in columns:
+            self.conn.execute("ALTER TABLE channel_state ADD COLUMN upload_times TEXT")
+        for column in ("merch_score", "previous_score"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE channel_state ADD COLUMN {column} REAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS video_state (
+                video_id TEXT PRIMARY KEY,
+                item TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def _select(self, sql, keys):
+        rows = []
+        keys = list(keys)
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                rows.extend(self.conn.execute(sql.format(",".join("?" * len(chunk))), chunk).fetchall())
+        return rows
+
+    def get_channels(self, channel_ids):
+        """Return {channel_id: state dict} for channels seen in earlier runs"""
+        rows = self._select(
+            "SELECT channel_id, video_ids, newest_video_id, newest_published_at, status, qualifying_count, analyzed_at, "
+            "upload_times, merch_score, previous_score FROM channel_state WHERE channel_id IN ({})", channel_ids
+        )
+        return {
+            row[0]: {
+                "video_ids": json.loads(row[1]),
+                "newest_video_id": row[2],
+                "newest_published_at": row[3],
+                "status": row[4],
+                "qualifying_count": row[5],
+                "analyzed_at": row[6],
+                "upload_times": json.loads(row[7]) if row[7] else None,
+                "merch_score": row[8],
+                "previous_score": row[9],
+            }
+            for row in rows
+        }
+
+    def get_videos(self, video_ids):
+        """Return {video_id: (item, fetched_at)} for stored videos"""
+        rows = self._select("SELECT video_id, item, fetched_at FROM video_state WHERE video_id IN ({})", video_ids)
+        return {video_id: (json.loads(item), fetched_at) for video_id, item, fetched_at in rows}
+
+    def get_video_fetch_times(self, video_ids):
+        """Return {video_id: fetched_at} for stored videos (without loading the items)"""
+        return dict(self._select("SELECT video_id, fetched_at FROM video_state WHERE video_id IN ({})", video_ids))
+
+    def save_videos(self, items):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO video_state VALUES (?, ?, ?)",
+                [(item["id"], json.dumps(item), now) for item in items]
+            )
+            self.conn.commit()
+
+    def save_channels(self, states):
+        """
+        Store {channel_id: state dict} as returned by get_channels(). A
+        merch_score in the state (0 for channels that did not qualify) is
+        recorded like save_scores(); without one the stored scores are kept.
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO channel_state (channel_id, video_ids, newest_video_id, newest_published_at, "
+                "status, qualifying_count, analyzed_at, upload_times, merch_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (channel_id) DO UPDATE SET video_ids = excluded.video_ids, "
+                "newest_video_id = excluded.newest_video_id, newest_published_at = excluded.newest_published_at, "
+                "status = excluded.status, qualifying_count = excluded.qualifying_count, "
+                "analyzed_at = excluded.analyzed_at, upload_times = excluded.upload_times, "
+                "previous_score = CASE WHEN excluded.merch_score IS NULL THEN previous_score ELSE merch_score END, "
+                "merch_score = COALESCE(excluded.merch_score, merch_score)",
+                [(channel_id, json.dumps(state["video_ids"]), state.get("newest_video_id"),
+                  state.get("newest_published_at"), state.get("status"), state.get("qualifying_count"),
+                  state.get("analyzed_at") or now,
+                  json.dumps(state["upload_times"]) if state.get("upload_times") else None,
+                  state.get("merch_score"))
+                 for channel_id, state in states.items()]
+            )
+            self.conn.commit()
+
+    def save_scores(self, scores):
+        """Record {channel_id: Merch_Score} of a scored run; the stored score becomes the previous one"""
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE channel_state SET previous_score = merch_score, merch_score = ? WHERE channel_id = ?",
+                [(score, channel_id) for channel_id, score in scores.items()]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def get_channel_state():
+    """Return the shared ChannelStateStore, opening it on first use (None if disabled)"""
+    global CHANNEL_STATE, INCREMENTAL_FETCH
+    if not INCREMENTAL_FETCH:
+        return None
+
+    with KEY_LOCK:
+        if CHANNEL_STATE is None:
+            try:
+                CHANNEL_STATE = ChannelStateStore(CHANNEL_STATE_FILE)
+            except sqlite3.Error as e:
+                print(f"⚠️ Incremental fetching disabled ({CHANNEL_STATE_FILE}): {e}")
+                INCREMENTAL_FETCH = False
+        return CHANNEL_STATE
+
+def select_videos_to_fetch(channel_video_ids, stored_videos):
+    """
+    Pick the video IDs that need a videos.list call.
+
+    Videos never fetched before are always included. Of the stored videos
+    whose stats are older than VIDEO_STATS_MAX_AGE, at most
+    VIDEO_STATS_REFRESH_PER_CHANNEL per channel are refreshed, newest first.
+    """
+    stale_before = time.time() - VIDEO_STATS_MAX_AGE
+    to_fetch = []
+
+    for video_ids in channel_video_ids:
+        refreshed = 0
+        for vid in video_ids:
+            if vid not in stored_videos:
+                to_fetch.append(vid)
+            elif stored_videos[vid][1] < stale_before and refreshed < VIDEO_STATS_REFRESH_PER_CHANNEL:
+                to_fetch.append(vid)
+                refreshed += 1
+
+    return to_fetch
+
+# ------------------------------------------------
+# 🔖 HANDLE INDEX
+# ------------------------------------------------
+
+HANDLE_INDEX = None
+
+class HandleIndex:
+    """
+    SQLite index of @handle -> UC... channel ID.
+
+    A forHandle lookup costs a unit per handle; once a handle's channel ID
+    is known, the channel is looked up by ID instead, in the batched
+    channels.list calls (IDS_PER_REQUEST channels per unit). Handles are
+    case-insensitive, so they are stored lowercased without the @.
+    """
+
+    def __init__(self, path, max_age=HANDLE_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS handle_index (
+                handle TEXT PRIMARY KEY,
+                channel_id TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def _key(handle):
+        return handle.lstrip('@').lower()
+
+    def get_many(self, handles):
+        """Return {handle: channel_id} for the handles resolved within max_age"""
+        by_key = {}
+        for handle in handles:
+            by_key.setdefault(self._key(handle), []).append(handle)
+        keys = list(by_key)
+        resolved_after = time.time() - self.max_age
+
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT handle, channel_id FROM handle_index "
+                    f"WHERE resolved_at >= ? AND handle IN ({','.join('?' * len(chunk))})",
+                    [resolved_after, *chunk]
+                ).fetchall()
+                for key, channel_id in rows:
+                    found.update(dict.fromkeys(by_key[key], channel_id))
+        return found
+
+    def put(self, handle, channel_id):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO handle_index VALUES (?, ?, ?)",
+                              (self._key(handle), channel_id, time.time()))
+            self.conn.commit()
+
+    def discard(self, handles):
+        """Drop handles whose indexed channel is gone, so they are resolved again"""
+        with self.lock:
+            self.conn.executemany("DELETE FROM handle_index WHERE handle = ?",
+                                  [(self._key(handle),) for handle in handles])
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def get_handle_index():
+    """Return the shared HandleIndex, opening it on first use (None if disabled)"""
+    global HANDLE_INDEX, HANDLE_INDEX_FILE
+    if not HANDLE_INDEX_FILE:
+        return None
+
+    with KEY_LOCK:
+        if HANDLE_INDEX is None:
+            try:
+                HANDLE_INDEX = HandleIndex(HANDLE_INDEX_FILE, HANDLE_INDEX_MAX_AGE)
+            except sqlite3.Error as e:
+                print(f"⚠️ Handle index disabled ({HANDLE_INDEX_FILE}): {e}")
+                HANDLE_INDEX_FILE = None
+        return HANDLE_INDEX
+
+def channel_keys(channel_ids):
+    """
+    The channel each CSV channel_id stands for, as a dedup key: the UC... ID,
+    which for a @handle comes from the handle index. Handles not indexed
+    yet key as the lowercased handle.
+    """
+    handle_index = get_handle_index()
+    handles = [cid for cid in channel_ids if cid.startswith('@')]
+    indexed = handle_index.get_many(handles) if handle_index and handles else {}
+    return [indexed.get(cid) or (cid.lower() if cid.startswith('@') else cid) for cid in channel_ids]
+
+# ------------------------------------------------
+# 📤 RESULT SINKS
+# ------------------------------------------------
+
+# ALL_CHANNELS columns in file order, with the dtype each is written as
+ALL_CHANNELS_COLUMNS = {
+    "Channel_Name": "string",
+    "Channel_ID": "string",
+    "CSV_Subs": "Int64",
+    "Actual_Subs": "Int64",
+    "Total_Channel_Views": "Int64",
+    "Total_Channel_Videos": "Int64",
+    "Videos_Fetched": "Int64",
+    "Qualifying_Videos_60d": "Int64",
+    "Shorts_Skipped": "Int64",
+    "Short_Vids_Skipped": "Int64",
+    "Old_Videos_Skipped": "Int64",
+    "Avg_Views_All": "Int64",
+    "Avg_Likes_All": "Int64",
+    "Avg_Comments_All": "Int64",
+    "Total_Views_All": "Int64",
+    "Avg_Views_Qualified": "Int64",
+    "Avg_Likes_Qualified": "Int64",
+    "Avg_Comments_Qualified": "Int64",
+    "Total_Views_Qualified": "Int64",
+    "Total_Likes_Qualified": "Int64",
+    "Total_Comments_Qualified": "Int64",
+    "First_Qualifying_Upload": "string",
+    "Last_Qualifying_Upload": "string",
+    "Subs_Growth_Per_Day": "float",
+    "Views_Growth_Per_Day": "float",
+    "Search_Term": "string",
+    "Query_Name": "string",
+    "Status": "string",
+}
+
+def _require_pyarrow():
+    """Import pyarrow on first Parquet use (it is optional and slow to import)"""
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+
+class ResultSink:
+    """
+    Buffered writer for result rows.
+
+    Rows are appended with write() as channels finish and flushed every
+    OUTPUT_BATCH_ROWS rows, so at most one batch is held in memory. Keys
+    outside the sink's columns (the _video_data / _channel_data payloads)
+    are dropped. The file is created by the first flush, so a run without
+    results leaves no empty file behind.
+    """
+
+    extension = None
+
+    def __init__(self, path, columns=None, batch_rows=None):
+        self.path = path
+        self.columns = columns or ALL_CHANNELS_COLUMNS
+        self.batch_rows = batch_rows or OUTPUT_BATCH_ROWS
+        self.rows = []
+        self.count = 0
+
+    def write(self, row):
+        self.rows.append({col: row.get(col) for col in self.columns})
+        self.count += 1
+        if len(self.rows) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        frame = pd.DataFrame(self.rows, columns=list(self.columns)).astype(self.columns)
+        self.rows = []
+        self._write_frame(frame)
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _write_frame(self, frame):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+class CsvResultSink(ResultSink):
+    """Appends each batch to a CSV file (header written once)"""
+
+    extension = "csv"
+
+    def __init__(self, path, columns=None, batch_rows=None):
+        super().__init__(path, columns, batch_rows)
+        self.file = None
+
+    def _write_frame(self, frame):
+        header = self.file is None
+        if header:
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+        frame.to_csv(self.file, header=header, index=False)
+        self.file.flush()
+
+    def _close(self):
+        if self.file:
+            self.file.close()
+
+class ParquetResultSink(ResultSink):
+    """Writes each batch as one row group of a Parquet file"""
+
+    extension = "parquet"
+
+    def __init__(self, path, columns=None, batch_rows=None):
+        _require_pyarrow()
+        super().__init__(path, columns, batch_rows)
+        self.writer = None
+
+    def _write_frame(self, frame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def _close(self):
+        if self.writer:
+            self.writer.close()
+
+RESULT_SINKS = {
+    "csv": CsvResultSink,
+    "parquet": ParquetResultSink,
+}
+
+def open_result_sink(name, timestamp, output_format=None):
+    """Open a sink for youtube_{name}_{timestamp}.{csv|parquet}"""
+    output_format = output_format or OUTPUT_FORMAT
+    if output_format not in RESULT_SINKS:
+        raise ValueError(f"Unknown output format '{output_format}' (available: {', '.join(RESULT_SINKS)})")
+    sink_class = RESULT_SINKS[output_format]
+    return sink_class(f"youtube_{name}_{timestamp}.{sink_class.extension}")
+
+def save_results(df, name, timestamp, output_format=None):
+    """Write a complete (already ranked) DataFrame as youtube_{name}_{timestamp}.{csv|parquet}"""
+    output_format = output_format or OUTPUT_FORMAT
+    if output_format == "parquet":
+        _require_pyarrow()
+        filename = f"youtube_{name}_{timestamp}.parquet"
+        df.to_parquet(filename, index=False)
+    else:
+        filename = f"youtube_{name}_{timestamp}.csv"
+        df.to_csv(filename, index=False)
+    return filename
+
+def read_result_batches(path, batch_rows=None):
+    """Yield DataFrames of a results file (CSV or Parquet) one batch at a time"""
+    batch_rows = batch_rows or INPUT_CHUNK_SIZE
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield batch.to_pandas()
+    else:
+        text_columns = {col: str for col, dtype in ALL_CHANNELS_COLUMNS.items() if dtype == "string"}
+        yield from pd.read_csv(path, chunksize=batch_rows, dtype=text_columns)
+
+def load_scoring_candidates(path):
+    """
+    Read a results file batch by batch, keeping only channels with enough
+    qualifying videos to be scored.
+
+    Returns (rows read, candidates DataFrame) - the candidates are a small
+    slice of a large run, so score_channels() can rank them in one pass.
+    """
+    total = 0
+    candidates = []
+    empty = None
+    for batch in read_result_batches(path):
+        total += len(batch)
+        if "Qualifying_Videos_60d" in batch.columns:
+            batch = batch[batch["Qualifying_Videos_60d"].fillna(0) >= MIN_VIDEOS_IN_TIMEFRAME]
+        if batch.empty:
+            empty = batch
+        else:
+            candidates.append(batch)
+
+    if candidates:
+        return total, pd.concat(candidates, ignore_index=True)
+    return total, empty if empty is not None else pd.DataFrame(columns=list(ALL_CHANNELS_COLUMNS))
+
+# ------------------------------------------------
+# 📸 SNAPSHOT STORE
+# ------------------------------------------------
+
+# Snapshot file columns, with the dtype each is written as
+CHANNEL_SNAPSHOT_COLUMNS = {
+    "Snapshot_At": "string",
+    "Channel_ID": "string",
+    "Subscribers": "Int64",
+    "Total_Views": "Int64",
+    "Video_Count": "Int64",
+    "Subs_Per_Day": "float",
+    "Views_Per_Day": "float",
+}
+VIDEO_SNAPSHOT_COLUMNS = {
+    "Snapshot_At": "string",
+    "Video_ID": "string",
+    "Channel_ID": "string",
+    "Published_At": "string",
+    "Views": "Int64",
+    "Likes": "Int64",
+    "Comments": "Int64",
+    "Views_Per_Day": "float",
+}
+
+SNAPSHOT_STORE = None
+
+def _stat(value):
+    """A statistics count as an int (None when missing or hidden)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class SnapshotStore:
+    """
+    Append-only history of the channel and video stats each run observed.
+
+    Every run adds one file per kind to a date partition:
+    SNAPSHOT_DIR/{channels,videos}/date=YYYY-MM-DD/<run>.parquet (or .csv),
+    which pandas, pyarrow and DuckDB read as one dataset; nothing is ever
+    rewritten. index.sqlite keeps each channel's and video's baseline (the
+    values of its last counted snapshot) and growth per day, so growth is
+    computed from one keyed lookup instead of a scan of the history.
+    Baselines only move once SNAPSHOT_GROWTH_MIN_INTERVAL has passed -
+    cached responses make closer snapshots meaningless - and until then
+    the last rates are reported again.
+    """
+
+    def __init__(self, directory, run_name, output_format):
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # Shard processes share the index
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS channel_latest (
+                channel_id TEXT PRIMARY KEY,
+                observed_at REAL NOT NULL,
+                subs INTEGER,
+                views INTEGER,
+                subs_per_day REAL,
+                views_per_day REAL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS video_latest (
+                video_id TEXT PRIMARY KEY,
+                observed_at REAL NOT NULL,
+                views INTEGER,
+                views_per_day REAL
+            )
+        """)
+        self.conn.commit()
+
+        self.date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        sink_class = RESULT_SINKS[output_format]
+        self.sinks = {}
+        for kind, columns in (("channels", CHANNEL_SNAPSHOT_COLUMNS), ("videos", VIDEO_SNAPSHOT_COLUMNS)):
+            partition = os.path.join(directory, kind, f"date={self.date}")
+            os.makedirs(partition, exist_ok=True)
+            self.sinks[kind] = sink_class(os.path.join(partition, f"{run_name}.{sink_class.extension}"), columns)
+
+    def _growth(self, table, key_column, observed, value_columns):
+        """
+        Growth per day of each key's values since its baseline in table,
+        moving baselines that are old enough. observed is {key: values};
+        returns {key: rates} (None rates for keys seen for the first time).
+        """
+        now = time.time()
+        rate_columns = [f"{col}_per_day" for col in value_columns]
+        keys = list(observed)
+        width = len(value_columns)
+        with self.lock:
+            baselines = {}
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                baselines.update((row[0], row[1:]) for row in self.conn.execute(
+                    f"SELECT {key_column}, observed_at, {', '.join(value_columns + rate_columns)} "
+                    f"FROM {table} WHERE {key_column} IN ({','.join('?' * len(chunk))})", chunk))
+
+            rates, updates = {}, []
+            for key, values in observed.items():
+                baseline = baselines.get(key)
+                if baseline is None:
+                    rates[key] = (None,) * width
+                elif now - baseline[0] < SNAPSHOT_GROWTH_MIN_INTERVAL:
+                    rates[key] = baseline[1 + width:]
+                    continue
+                else:
+                    days = (now - baseline[0]) / 86400
+                    rates[key] = tuple(None if new is None or old is None else (new - old) / days
+                                       for new, old in zip(values, baseline[1:1 + width]))
+                updates.append((key, now, *values, *rates[key]))
+
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, observed_at, {', '.join(value_columns + rate_columns)}) "
+                f"VALUES ({','.join('?' * (2 + 2 * width))})", updates)
+            self.conn.commit()
+        return rates
+
+    def record_channels(self, channels):
+        """Snapshot channel_data dicts; returns {channel_id: (subscribers per day, views per day)}"""
+        channels = {data["channel_id"]: data for data in channels}
+        growth = self._growth("channel_latest", "channel_id",
+                              {cid: (data["subs"], data["views_total"]) for cid, data in channels.items()},
+                              ["subs", "views"])
+        snapshot_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self.lock:
+            for cid, data in channels.items():
+                subs_per_day, views_per_day = growth[cid]
+                self.sinks["channels"].write({
+                    "Snapshot_At": snapshot_at,
+                    "Channel_ID": cid,
+                    "Subscribers": data["subs"],
+                    "Total_Views": data["views_total"],
+                    "Video_Count": data["video_count"],
+                    "Subs_Per_Day": subs_per_day,
+                    "Views_Per_Day": views_per_day,
+                })
+        return growth
+
+    def record_videos(self, items, owners):
+        """Snapshot freshly fetched videos.list items; owners maps video ID -> channel ID"""
+        items = {item["id"]: item for item in items}
+        growth = self._growth("video_latest", "video_id",
+                              {vid: (_stat(item.get("statistics", {}).get("viewCount")),) for vid, item in items.items()},
+                              ["views"])
+        snapshot_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with self.lock:
+            for vid, item in items.items():
+                stats = item.get("statistics", {})
+                self.sinks["videos"].write({
+                    "Snapshot_At": snapshot_at,
+                    "Video_ID": vid,
+                    "Channel_ID": owners.get(vid),
+                    "Published_At": item.get("snippet", {}).get("publishedAt"),
+                    "Views": _stat(stats.get("viewCount")),
+                    "Likes": _stat(stats.get("likeCount")),
+                    "Comments": _stat(stats.get("commentCount")),
+                    "Views_Per_Day": growth[vid][0],
+                })
+
+    def close(self):
+        with self.lock:
+            for sink in self.sinks.values():
+                sink.close()
+            self.conn.close()
+
+def open_snapshot_store(run_name):
+    """Open the run's SnapshotStore (None when SNAPSHOT_DIR is unset or it cannot be opened)"""
+    global SNAPSHOT_STORE
+    if not SNAPSHOT_DIR:
+        return None
+    output_format = SNAPSHOT_FORMAT
+    if output_format == "parquet":
+        try:
+            _require_pyarrow()
+        except RuntimeError as e:
+            print(f"⚠️ {e} - snapshots are written as CSV")
+            output_format = "csv"
+    try:
+        SNAPSHOT_STORE = SnapshotStore(SNAPSHOT_DIR, run_name, output_format)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ Snapshot store disabled ({SNAPSHOT_DIR}): {e}")
+        SNAPSHOT_STORE = None
+    return SNAPSHOT_STORE
+
+def load_channel_growth(channel_ids):
+    """
+    {channel_id: (subscribers, total views, subscribers per day, views per
+    day)} from the snapshot index, for channels snapshotted before (empty
+    without a snapshot store)
+    """
+    path = os.path.join(SNAPSHOT_DIR, "index.sqlite") if SNAPSHOT_DIR else None
+    if not path or not os.path.exists(path):
+        return {}
+
+    growth = {}
+    channel_ids = list(channel_ids)
+    try:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            for i in range(0, len(channel_ids), 500):
+                chunk = channel_ids[i:i+500]
+                growth.update((row[0], row[1:]) for row in conn.execute(
+                    "SELECT channel_id, subs, views, subs_per_day, views_per_day FROM channel_latest "
+                    f"WHERE channel_id IN ({','.join('?' * len(chunk))})", chunk))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"  ⚠️ Could not read the snapshot index ({path}): {e}")
+    return growth
+
+def close_snapshot_store():
+    global SNAPSHOT_STORE
+    if SNAPSHOT_STORE is not None:
+        SNAPSHOT_STORE.close()
+        SNAPSHOT_STORE = None
+
+# ------------------------------------------------
+# 🗄️ DATABASE SOURCE AND RESULTS
+# ------------------------------------------------
+
+# Score columns of the results table, filled in for qualified channels after scoring
+DB_SCORE_COLUMNS = {
+    "Engagement_Rate": "float",
+    "Comment_Rate": "float",
+    "Consistent_Reach": "float",
+    "Upload_Per_Month": "float",
+    "View_Velocity": "float",
+    "Like_Rate": "float",
+    "Merch_Score": "float",
+}
+DB_KEY_COLUMNS = ["Channel_ID", "Search_Term", "Query_Name"]
+DB_COLUMN_TYPES = {"string": "TEXT", "Int64": "BIGINT", "float": "DOUBLE PRECISION"}
+
+def _require_psycopg2():
+    """Import psycopg2 on first PostgreSQL use (it is optional)"""
+    global psycopg2
+    if psycopg2 is None:
+        try:
+            import psycopg2
+            import psycopg2.extras
+        except ImportError:
+            raise RuntimeError("PostgreSQL needs psycopg2: pip install psycopg2-binary")
+
+def input_name():
+    """What channels are read from (recorded in the checkpoint journal)"""
+    if INPUT_SOURCE == "db":
+        return f"{DB_CHANNELS_TABLE} table"
+    return CSV_INPUT_FILE
+
+class Database:
+    """
+    Connection to the channels database: PostgreSQL (DATABASE_URL
+    postgresql://...) or a SQLite stand-in (sqlite:///path).
+
+    SQL is written with ? placeholders and translated for psycopg2. Each
+    Database holds one connection, so the channel stream and the result
+    upserts use separate instances.
+    """
+
+    def __init__(self, url):
+        if not url:
+            raise ValueError("No database configured - set DATABASE_URL or pass --database-url")
+        if url.startswith("sqlite:///"):
+            self.dialect = "sqlite"
+            self.conn = sqlite3.connect(url[len("sqlite:///"):])
+            self.conn.execute("PRAGMA journal_mode=WAL")  # The channel stream stays open while results are written
+        elif url.startswith(("postgres://", "postgresql://")):
+            _require_psycopg2()
+            self.dialect = "postgresql"
+            self.conn = psycopg2.connect(url)
+        else:
+            raise ValueError(f"Unsupported database URL (use postgresql://... or sqlite:///...): {url.split(':')[0]}:...")
+
+    def _sql(self, sql):
+        return sql.replace("?", "%s") if self.dialect == "postgresql" else sql
+
+    def _value(self, value):
+        if isinstance(value, datetime) and self.dialect == "sqlite":
+            return value.isoformat(sep=" ")  # Stored as UTC ISO text, which compares in time order
+        return value
+
+    def stream(self, sql, params=(), name="stream"):
+        """Yield result rows, DB_FETCH_ROWS per round trip (a server-side cursor on PostgreSQL)"""
+        if self.dialect == "postgresql":
+            cursor = self.conn.cursor(name=f"youtube_{name}")
+            cursor.itersize = DB_FETCH_ROWS
+        else:
+            cursor = self.conn.cursor()
+        try:
+            cursor.execute(self._sql(sql), [self._value(p) for p in params])
+            while True:
+                rows = cursor.fetchmany(DB_FETCH_ROWS)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+            self.conn.rollback()  # Ends the read transaction (and the named cursor)
+
+    def table_columns(self, table):
+        """Lowercased column names of a table"""
+        cursor = self.conn.cursor()
+        try:
+            if self.dialect == "sqlite":
+                cursor.execute(f"PRAGMA table_info({table})")
+                return {row[1].lower() for row in cursor.fetchall()}
+            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s", (table,))
+            return {row[0].lower() for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def ensure_results_table(self):
+        columns = {**ALL_CHANNELS_COLUMNS, **DB_SCORE_COLUMNS}
+        definitions = [
+            f"{col.lower()} {DB_COLUMN_TYPES[dtype]}" + (" NOT NULL DEFAULT ''" if col in DB_KEY_COLUMNS else "")
+            for col, dtype in columns.items()
+        ]
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {DB_RESULTS_TABLE} (
+                {', '.join(definitions)},
+                analyzed_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY ({', '.join(col.lower() for col in DB_KEY_COLUMNS)})
+            )
+        """)
+        # Tables created before a column was added get it now
+        existing = self.table_columns(DB_RESULTS_TABLE)
+        for col, dtype in columns.items():
+            if col.lower() not in existing:
+                cursor.execute(f"ALTER TABLE {DB_RESULTS_TABLE} ADD COLUMN {col.lower()} {DB_COLUMN_TYPES[dtype]}")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{DB_RESULTS_TABLE}_analyzed_at "
+                       f"ON {DB_RESULTS_TABLE}(analyzed_at DESC)")
+        self.conn.commit()
+        cursor.close()
+
+    def upsert(self, table, columns, rows, key_columns):
+        """Insert rows, updating the non-key columns of rows whose key already exists"""
+        names = [col.lower() for col in columns]
+        keys = [col.lower() for col in key_columns]
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names if name not in keys)
+        conflict = f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+        rows = [[self._value(value) for value in row] for row in rows]
+
+        cursor = self.conn.cursor()
+        try:
+            if self.dialect == "postgresql":
+                # One multi-row INSERT per 1,000 rows
+                psycopg2.extras.execute_values(
+                    cursor, f"INSERT INTO {table} ({', '.join(names)}) VALUES %s {conflict}", rows, page_size=1000)
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) {conflict}", rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.conn.close()
+
+def db_reanalyze_after():
+    """Seconds a channel is left alone after it was analyzed (refresh priority decides beyond its shortest interval)"""
+    return min(DB_REANALYZE_AFTER, REFRESH_MIN_INTERVAL) if REFRESH_PRIORITY else DB_REANALYZE_AFTER
+
+def _db_channels_query(columns):
+    """SQL and parameters selecting `columns` of the channels due for analysis (see get_channels_from_db())"""
+    sql = f"""
+        SELECT {columns}
+        FROM {DB_CHANNELS_TABLE} c
+        WHERE c.subscribers >= ?
+          AND c.channel_id IS NOT NULL AND c.channel_id <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM {DB_RESULTS_TABLE} r
+              WHERE r.channel_id = c.channel_id
+                AND r.search_term = COALESCE(c.search_term, '')
+                AND r.query_name = COALESCE(c.query_name, '')
+                AND r.analyzed_at >= ?
+          )
+        ORDER BY c.subscribers DESC
+    """
+    params = [MIN_SUBS_FILTER, datetime.now(timezone.utc) - timedelta(seconds=db_reanalyze_after())]
+    if MAX_CHANNELS_TO_PROCESS:
+        sql += " LIMIT ?"
+        params.append(MAX_CHANNELS_TO_PROCESS)
+    return sql, params
+
+def get_channels_from_db():
+    """
+    Stream channels from DB_CHANNELS_TABLE with the filters done in SQL:
     - subscribers >= MIN_SUBS_FILTER
     - channel_id IS NOT NULL/empty
+    - not analyzed (in DB_RESULTS_TABLE) within DB_REANALYZE_AFTER (or
+      REFRESH_MIN_INTERVAL, if shorter, with REFRESH_PRIORITY)
+
+    Rows come biggest channel first from a server-side cursor,
+    DB_FETCH_ROWS at a time, so memory stays flat however large the table
+    is. MAX_CHANNELS_TO_PROCESS becomes a LIMIT.
     """
     try:
-        print(f"📂 Loading CSV file: {CSV_INPUT_FILE}")
+        print(f"📂 Streaming channels from the {DB_CHANNELS_TABLE} table")
+        db = Database(DATABASE_URL)
+    except Exception as e:
+        print(f"  ❌ Error opening database: {e}")
+        return
 
-        df = pd.read_csv(CSV_INPUT_FILE)
+    try:
+        db.ensure_results_table()
+        sql, params = _db_channels_query("c.channel_id, c.channel_name, c.subscribers, "
+                                         "COALESCE(c.search_term, ''), COALESCE(c.query_name, '')")
+        count = 0
+        for channel_id, channel_name, subscribers, search_term, query_name in db.stream(sql, params, "channels"):
+            count += 1
+            yield {"channel_id": channel_id, "channel_name": channel_name, "subscribers": subscribers,
+                   "search_term": search_term, "query_name": query_name}
+
+        print(f"  ✓ Streamed {count:,} channels (≥{MIN_SUBS_FILTER:,} subs, not analyzed in the last "
+              f"{db_reanalyze_after() / 3600:g}h)")
+    except Exception as e:
+        print(f"  ❌ Error loading channels from database: {e}")
+    finally:
+        db.close()
 
-        # Validate CSV format
-        required_columns = ['channel_id', 'channel_name', 'subscribers']
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"  ❌ CSV must have '{col}' column")
-                return []
+class DatabaseResultSink(ResultSink):
+    """
+    Upserts result rows into DB_RESULTS_TABLE, one multi-row statement per
+    batch, keyed by channel ID, search term and query name.
 
-        original_count = len(df)
-        print(f"  ✓ Loaded {original_count} channels from CSV")
+    ALL_CHANNELS rows clear the score columns; write_scores() fills them
+    in for the qualified channels once they are scored. The connection is
+    opened (and the table created if needed) by the first write and closed
+    by close().
+    """
 
-        # Filter: subscribers >= MIN_SUBS_FILTER
-        df_filtered = df[df['subscribers'] >= MIN_SUBS_FILTER].copy()
-        removed_subs = original_count - len(df_filtered)
+    def __init__(self, url=None, batch_rows=None):
+        super().__init__(f"{DB_RESULTS_TABLE} table", {**ALL_CHANNELS_COLUMNS, **DB_SCORE_COLUMNS}, batch_rows)
+        self.url = url or DATABASE_URL
+        self.db = None
+        self.analyzed_at = datetime.now(timezone.utc)
+
+    def _write_frame(self, frame):
+        self._upsert(frame)
+
+    def _upsert(self, frame):
+        if self.db is None:
+            self.db = Database(self.url)
+            self.db.ensure_results_table()
+        frame = frame.copy()
+        frame[DB_KEY_COLUMNS] = frame[DB_KEY_COLUMNS].astype(object).fillna("")
+        # A key may occur once per statement; the last row listing it wins
+        frame = frame.drop_duplicates(subset=DB_KEY_COLUMNS, keep="last")
+        columns = list(frame.columns)
+        values = [[None if pd.isna(value) else value for value in frame[col].tolist()] for col in columns]
+        rows = [row + (self.analyzed_at,) for row in zip(*values)]
+        self.db.upsert(DB_RESULTS_TABLE, columns + ["analyzed_at"], rows, DB_KEY_COLUMNS)
+
+    def write_scores(self, df_qualified):
+        """Store the scores of a score_channels() result"""
+        if not df_qualified.empty:
+            self._upsert(df_qualified[DB_KEY_COLUMNS + [col for col in DB_SCORE_COLUMNS if col in df_qualified.columns]])
+
+    def _close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
 
-        # Filter: channel_id not null/empty
-        df_filtered = df_filtered[df_filtered['channel_id'].notna()].copy()
-        df_filtered = df_filtered[df_filtered['channel_id'].str.strip() != ''].copy()
-        removed_null = len(df) - removed_subs - len(df_filtered)
+# ------------------------------------------------
+# 1️⃣ Load channels from CSV
+# ------------------------------------------------
+def get_channels_from_csv():
+    """
+    Stream channels from the CSV file with filters:
+    - subscribers >= MIN_SUBS_FILTER
+    - channel_id IS NOT NULL/empty
 
-        print(f"  ✓ Filtered: {len(df_filtered)} channels (removed {removed_subs} < {MIN_SUBS_FILTER:,} subs, {removed_null} NULL IDs)")
+    Channels are yielded biggest first (by subscribers, then file order),
+    so the biggest channels are done first if the quota runs out. The file
+    is read INPUT_CHUNK_SIZE rows at a time and filtered as it is read, so
+    memory stays flat however large the file is: with
+    MAX_CHANNELS_TO_PROCESS set, only the top N channels are kept (in a
+    heap); otherwise each sorted chunk is spilled to a temporary file and
+    the chunks are merged (an external sort - a file of one chunk is
+    sorted in memory).
+    """
+    try:
+        print(f"📂 Streaming CSV file: {CSV_INPUT_FILE}")
+
+        total_rows = removed_subs = removed_null = 0
+        top_channels = []  # min-heap of (subscribers, -row number, record)
+        runs = []          # sorted chunks: [(-subscribers, row number, record)], spilled once there are two
+        spill_dir = None
+
+        for chunk in pd.read_csv(CSV_INPUT_FILE, chunksize=INPUT_CHUNK_SIZE, dtype=INPUT_DTYPES):
+            # Validate CSV format
+            if total_rows == 0:
+                for col in ['channel_id', 'channel_name', 'subscribers']:
+                    if col not in chunk.columns:
+                        print(f"  ❌ CSV must have '{col}' column")
+                        return
+
+            total_rows += len(chunk)
+
+            # Filter: subscribers >= MIN_SUBS_FILTER
+            subscribers = pd.to_numeric(chunk['subscribers'], errors='coerce')
+            big_enough = subscribers >= MIN_SUBS_FILTER
+
+            # Filter: channel_id not null/empty
+            channel_ids = chunk['channel_id']
+            has_id = channel_ids.notna() & (channel_ids.str.strip() != '')
+
+            removed_subs += int((~big_enough).sum())
+            removed_null += int((big_enough & ~has_id).sum())
+
+            selected = chunk[big_enough & has_id].assign(subscribers=subscribers[big_enough & has_id].astype("int64"))
+            rows = zip(selected.index, selected['subscribers'], selected.to_dict('records'))
+            if MAX_CHANNELS_TO_PROCESS:
+                for row_number, subs, record in rows:
+                    if len(top_channels) < MAX_CHANNELS_TO_PROCESS:
+                        heapq.heappush(top_channels, (subs, -row_number, record))
+                    else:
+                        heapq.heappushpop(top_channels, (subs, -row_number, record))
+                continue
 
-        # Apply limit if set
-        if MAX_CHANNELS_TO_PROCESS:
-            df_filtered = df_filtered.head(MAX_CHANNELS_TO_PROCESS)
-            print(f"  ⚠️ Limited to {MAX_CHANNELS_TO_PROCESS} channels for testing")
+            runs.append(sorted((-subs, row_number, record) for row_number, subs, record in rows))
+            if len(runs) > 1:
+                spill_dir = spill_dir or tempfile.TemporaryDirectory(prefix="youtube_input_")
+                runs = [run if isinstance(run, str) else _spill_run(run, spill_dir.name) for run in runs]
 
-        # Sort by subscribers descending
-        df_filtered = df_filtered.sort_values('subscribers', ascending=False)
+        kept = total_rows - removed_subs - removed_null
+        print(f"  ✓ Read {total_rows:,} rows: {kept:,} channels passed filters "
+              f"(removed {removed_subs:,} < {MIN_SUBS_FILTER:,} subs, {removed_null:,} NULL IDs)")
 
-        return df_filtered.to_dict('records')
+        # Apply limit: biggest channels first
+        if MAX_CHANNELS_TO_PROCESS:
+            print(f"  ⚠️ Limited to the top {MAX_CHANNELS_TO_PROCESS} channels by subscribers")
+            for subs, neg_row, record in sorted(top_channels, reverse=True):
+                yield record
+        else:
+            try:
+                for neg_subs, row_number, record in heapq.merge(*(_read_run(run) if isinstance(run, str) else run
+                                                                   for run in runs)):
+                    yield record
+            finally:
+                if spill_dir:
+                    spill_dir.cleanup()
 
     except FileNotFoundError:
         print(f"  ❌ File not found: {CSV_INPUT_FILE}")
         print(f"  Please ensure the CSV file is in the same directory as this script")
-        return []
     except Exception as e:
         print(f"  ❌ Error loading CSV: {e}")
-        return []
+
+def _spill_run(run, directory):
+    """Write a sorted run of (sort key..., record) tuples to a temporary file; returns its path"""
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        for entry in run:
+            pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_run(path):
+    """Stream the entries of a _spill_run() file back"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def external_sort(runs, prefix="youtube_sort_"):
+    """
+    Yield the records of runs (lists of (sort key..., record) tuples whose
+    keys are unique) in sort order with one run in memory: once there is
+    a second run, each sorted run is spilled to a temporary file and the
+    files are merged
+    """
+    sorted_runs, spill_dir = [], None
+    try:
+        for run in runs:
+            sorted_runs.append(sorted(run))
+            if len(sorted_runs) > 1:
+                spill_dir = spill_dir or tempfile.TemporaryDirectory(prefix=prefix)
+                sorted_runs = [r if isinstance(r, str) else _spill_run(r, spill_dir.name) for r in sorted_runs]
+        for entry in heapq.merge(*(_read_run(r) if isinstance(r, str) else r for r in sorted_runs)):
+            yield entry[-1]
+    finally:
+        if spill_dir:
+            spill_dir.cleanup()
+
+def load_channels():
+    """
+    Stream the input channels from the CSV file or, with INPUT_SOURCE 'db',
+    the database - only this process's channels when sharded (in_shard()).
+    """
+    channels = get_channels_from_db() if INPUT_SOURCE == "db" else get_channels_from_csv()
+    if SHARD is not None:
+        channels = (channel for channel in channels if in_shard(channel['channel_id']))
+    return channels
+
+def count_duplicate_channels(channels=None):
+    """
+    Dedup pass over the input: count the rows that pass the filters of
+    load_channels() per channel (channel_keys(), so a @handle and its
+    UC... ID count as one channel once the handle index knows it).
+
+    Only the channel IDs are read (the channel_id and subscribers columns
+    of the CSV, or channel_id from the database) - or taken from channels,
+    an already loaded list. Returns {channel key: rows} for the channels
+    listed more than once - or, while the index does not know some
+    @handles yet, for every channel: once resolved, a handle may turn out
+    to be any other row's channel (process_channels() merges them).
+    """
+    counts = {}
+
+    def count(channel_ids):
+        channel_ids = [cid for cid in channel_ids if in_shard(cid)]
+        for key, rows in pd.Series(channel_keys(channel_ids), dtype=object).value_counts().items():
+            counts[key] = counts.get(key, 0) + rows
+
+    def listed():
+        if any(key.startswith('@') for key in counts):
+            return counts
+        return {key: rows for key, rows in counts.items() if rows > 1}
+
+    if channels is not None:
+        count([channel['channel_id'] for channel in channels])
+        return listed()
+
+    try:
+        if INPUT_SOURCE == "db":
+            db = Database(DATABASE_URL)
+            try:
+                db.ensure_results_table()
+                sql, params = _db_channels_query("c.channel_id")
+                ids = (row[0] for row in db.stream(sql, params, "channel_ids"))
+                while chunk := list(itertools.islice(ids, INPUT_CHUNK_SIZE)):
+                    count(chunk)
+            finally:
+                db.close()
+        else:
+            for chunk in pd.read_csv(CSV_INPUT_FILE, chunksize=INPUT_CHUNK_SIZE,
+                                     usecols=['channel_id', 'subscribers'], dtype={'channel_id': str}):
+                subscribers = pd.to_numeric(chunk['subscribers'], errors='coerce')
+                channel_ids = chunk['channel_id']
+                count(channel_ids[(subscribers >= MIN_SUBS_FILTER) & channel_ids.notna()
+                                  & (channel_ids.str.strip() != '')].tolist())
+    except Exception:
+        return {}  # load_channels() reports the problem
+
+    return listed()
 
 # ------------------------------------------------
 # 2️⃣ Get channel statistics (USING CHANNEL ID DIRECTLY!)
@@ -234,371 +2487,753 @@ def get_channel_stats(channel_id_input, original_name):
 
     NEVER uses the expensive search API!
     """
-    max_retries = len(API_KEYS)
+    try:
+        item = fetch_channel_item(channel_id_input)
+        if not item:
+            return None
 
-    for attempt in range(max_retries):
-        try:
-            # Check if it's a @handle
-            if channel_id_input.startswith('@'):
-                # Use forHandle parameter - ONLY 1 UNIT instead of 100!
-                handle = channel_id_input[1:]  # Remove @ symbol
-                req = youtube.channels().list(
-                    part="snippet,statistics,contentDetails",
-                    forHandle=handle
-                )
-                res = req.execute()
-                track_quota("channels_forHandle", 1)  # Only 1 unit!
+        return _parse_channel_item(item, original_name)
 
-            else:
-                # It's already a proper UC... channel ID - direct query (1 unit)
-                req = youtube.channels().list(
-                    part="snippet,statistics,contentDetails",
-                    id=channel_id_input
-                )
-                res = req.execute()
-                track_quota("channels", 1)
+    except AllKeysExhaustedError:
+        print(f"    ❌ All API keys exhausted")
+        return None
+    except HttpError as e:
+        print(f"    ⚠️ HTTP error: {e}")
+        return None
+    except Exception as e:
+        print(f"    ⚠️ Error: {e}")
+        return None
+
+def fetch_channel_item(channel_id_input):
+    """Fetch the channels.list item for one @handle or UC... ID (None if not found); errors propagate
 
+    Handles found in the handle index are looked up by their UC... ID;
+    handles resolved with forHandle are added to it.
+    """
+    # Check if it's a @handle
+    if channel_id_input.startswith('@'):
+        handle_index = get_handle_index()
+        channel_id = handle_index.get_many([channel_id_input]).get(channel_id_input) if handle_index else None
+        if channel_id:
+            item = fetch_channel_item(channel_id)
+            if item:
+                return item
+            handle_index.discard([channel_id_input])  # Channel gone or handle moved: resolve it again
+
+        # Use forHandle parameter - ONLY 1 UNIT instead of 100!
+        handle = channel_id_input[1:]  # Remove @ symbol
+        res = execute_cached_request("channels", channel_id_input, "channels_forHandle", 1,
+            lambda yt: yt.channels().list(
+                **request_params("channels"),
+                forHandle=handle
+            ))  # Only 1 unit!
+        items = res.get("items", [])
+        if items and handle_index:
+            handle_index.put(channel_id_input, items[0]["id"])
+
+    else:
+        # It's already a proper UC... channel ID - direct query (1 unit)
+        cached, missing = get_cached_items("channels", [channel_id_input])
+        items = list(cached.values())
+        if missing:
+            res = execute_request("channels", 1, lambda yt: yt.channels().list(
+                **request_params("channels"),
+                id=channel_id_input
+            ))
             items = res.get("items", [])
-            if not items:
-                return None
+            store_items("channels", items)
 
-            item = items[0]
-            stats = item.get("statistics", {})
-            snippet = item.get("snippet", {})
-            content = item.get("contentDetails", {})
+    return items[0] if items else None
 
-            return {
-                "channel_id": item["id"],
-                "title": snippet.get("title", original_name),
-                "subs": int(stats.get("subscriberCount", 0)),
-                "views_total": int(stats.get("viewCount", 0)),
-                "video_count": int(stats.get("videoCount", 0)),
-                "uploads_playlist": content.get("relatedPlaylists", {}).get("uploads", ""),
-                "created_at": snippet.get("publishedAt", "")
-            }
+def _parse_channel_item(item, original_name):
+    """Convert a channels.list item into the channel_data dict"""
+    stats = item.get("statistics", {})
+    snippet = item.get("snippet", {})
+    content = item.get("contentDetails", {})
 
-        except HttpError as e:
-            if is_quota_exceeded_error(e):
-                print(f"    ⚠️ Quota exceeded on API key #{CURRENT_KEY_INDEX + 1}")
-                if switch_api_key():
-                    print(f"    🔄 Retrying with API key #{CURRENT_KEY_INDEX + 1}...")
-                    continue  # Retry with new key
-                else:
-                    print(f"    ❌ All API keys exhausted")
-                    return None
-            else:
-                print(f"    ⚠️ HTTP error: {e}")
-                return None
-        except Exception as e:
-            print(f"    ⚠️ Error: {e}")
-            return None
+    return {
+        "channel_id": item["id"],
+        "title": snippet.get("title", original_name),
+        "subs": int(stats.get("subscriberCount", 0)),
+        "views_total": int(stats.get("viewCount", 0)),
+        "video_count": int(stats.get("videoCount", 0)),
+        "uploads_playlist": content.get("relatedPlaylists", {}).get("uploads", ""),
+        "created_at": snippet.get("publishedAt", "")
+    }
+
+def get_channel_stats_batch(channel_ids, names=None):
+    """
+    Get stats for up to IDS_PER_REQUEST UC... channel IDs in ONE call (1 unit).
+
+    Returns a dict keyed by channel ID. IDs missing from the response
+    (terminated, deleted or invalid channels) are absent from the dict.
+    Errors propagate to the caller.
+    """
+    names = names or {}
+    res = execute_request("channels_batch", 1, lambda yt: yt.channels().list(
+        **request_params("channels"),
+        id=",".join(channel_ids)
+    ))
+    store_items("channels", res.get("items", []))
 
-    return None
+    return {
+        item["id"]: _parse_channel_item(item, names.get(item["id"], ""))
+        for item in res.get("items", [])
+    }
+
+def resolve_channels(csv_channels, mapper=map, failed=None):
+    """
+    Resolve channel stats for a group of CSV channels.
+
+    UC... IDs - and @handles whose ID is in the handle index - are grouped
+    into IDS_PER_REQUEST-id channels.list calls; other @handles need
+    forHandle and go one per call. A channel listed under several CSV IDs
+    is requested once. Returns a dict keyed by the CSV channel_id -
+    channels that could not be retrieved map to None. Lookups that failed
+    on API errors (rather than finding nothing) are re-queued, and if they
+    still fail their IDs are added to the `failed` set.
+    """
+    names = {c['channel_id']: c['channel_name'] for c in csv_channels}
+    lookup = dict.fromkeys(names)
+    failed = failed if failed is not None else set()
+
+    handles = [cid for cid in names if cid.startswith('@')]
+    handle_index = get_handle_index()
+    indexed = handle_index.get_many(handles) if handle_index and handles else {}
+    handles = [cid for cid in handles if cid not in indexed]
+
+    # UC... ID -> the CSV IDs it was listed under (its own ID and/or indexed handles)
+    aliases = {}
+    for cid in names:
+        if cid in indexed or not cid.startswith('@'):
+            aliases.setdefault(indexed.get(cid, cid), []).append(cid)
+
+    cached, channel_ids = get_cached_items("channels", list(aliases))
+    for channel_id, item in cached.items():
+        lookup.update((cid, _parse_channel_item(item, names[cid])) for cid in aliases[channel_id])
+
+    batch_names = {channel_id: names[cids[0]] for channel_id, cids in aliases.items()}
+    batches = [channel_ids[i:i+IDS_PER_REQUEST] for i in range(0, len(channel_ids), IDS_PER_REQUEST)]
+    found_batches, failed_batches = map_with_requeue(
+        lambda batch: get_channel_stats_batch(batch, batch_names), batches, mapper, "channel batches")
+
+    for found in found_batches:
+        for channel_id, data in (found or {}).items():
+            lookup.update((cid, data) for cid in aliases.get(channel_id, ()))
+    for index in failed_batches:
+        failed.update(cid for channel_id in batches[index] for cid in aliases[channel_id])
+
+    # Indexed handles whose channel was not found (deleted, or the handle moved) are resolved again
+    moved = [cid for cid in indexed if lookup[cid] is None and cid not in failed]
+    if moved:
+        handle_index.discard(moved)
+        handles.extend(moved)
+
+    items, failed_handles = map_with_requeue(fetch_channel_item, handles, mapper, "handle lookups")
+    for handle, item in zip(handles, items):
+        lookup[handle] = _parse_channel_item(item, names[handle]) if item else None
+    failed.update(handles[index] for index in failed_handles)
+
+    return lookup
 
 # ------------------------------------------------
 # 3️⃣ Get recent video IDs from uploads playlist
 # ------------------------------------------------
-def get_recent_video_ids(playlist_id, max_videos=50):
+def get_recent_video_ids(playlist_id, max_videos=50, known_ids=None, published=None):
     """Get recent video IDs from channel's uploads playlist with pagination
 
-    Automatically retries with next API key if quota exceeded.
+    known_ids are the channel's upload IDs from the previous run (newest
+    first). Paging stops at the first page containing a known video, and the
+    new uploads are put in front of the known ones. published, when given,
+    is a dict that gets each fetched upload's playlist videoPublishedAt.
+
+    Errors propagate when not even the first page could be fetched; a
+    failure on a later page returns the IDs fetched so far.
     """
     if not playlist_id:
         return []
 
     video_ids = []
     next_page_token = None
-    max_retries = len(API_KEYS)
+    known = set(known_ids or ())
 
     try:
         while len(video_ids) < max_videos:
-            for attempt in range(max_retries):
-                try:
-                    req = youtube.playlistItems().list(
-                        part="contentDetails",
-                        playlistId=playlist_id,
-                        maxResults=min(50, max_videos - len(video_ids)),
-                        pageToken=next_page_token
-                    )
-                    res = req.execute()
-                    track_quota("playlistItems", 1)
-
-                    video_ids.extend([item["contentDetails"]["videoId"]
-                                    for item in res.get("items", [])])
-
-                    next_page_token = res.get("nextPageToken")
-                    break  # Success, exit retry loop
-
-                except HttpError as e:
-                    if is_quota_exceeded_error(e):
-                        if switch_api_key():
-                            continue  # Retry with new key
-                        else:
-                            return video_ids  # Return what we got
-                    else:
-                        return video_ids
-                except Exception as e:
-                    return video_ids
-
-            if not next_page_token:
+            max_results = min(50, max_videos - len(video_ids))
+            res = execute_cached_request(
+                "playlistItems", f"{playlist_id}:{next_page_token or ''}:{max_results}", "playlistItems", 1,
+                lambda yt: yt.playlistItems().list(
+                    **request_params("playlistItems"),
+                    playlistId=playlist_id,
+                    maxResults=max_results,
+                    pageToken=next_page_token
+                ))
+
+            page_ids = [item["contentDetails"]["videoId"] for item in res.get("items", [])]
+            video_ids.extend(page_ids)
+            if published is not None:
+                published.update((item["contentDetails"]["videoId"], item["contentDetails"].get("videoPublishedAt"))
+                                 for item in res.get("items", []))
+
+            next_page_token = res.get("nextPageToken")
+            if not next_page_token or known.intersection(page_ids):
                 break
 
-        return video_ids[:max_videos]
+    except Exception:
+        if not video_ids:
+            raise  # Nothing fetched - let the caller re-queue the channel
 
-    except Exception as e:
-        return video_ids
+    if known:
+        video_ids = list(dict.fromkeys(video_ids + list(known_ids)))
+
+    return video_ids[:max_videos]
+
+def split_recent_uploads(video_ids, upload_times):
+    """
+    Split a channel's upload IDs by their playlist publish time: returns
+    (IDs inside the DAYS_LOOKBACK window, number of older uploads).
+
+    Uploads without a known publish time count as recent - videos.list
+    has the final say on dates (the same cutoff as the date filter).
+    """
+    cutoff = datetime.now() - timedelta(days=DAYS_LOOKBACK)
+    recent, old = [], 0
+    for vid, published_at in zip(video_ids, upload_times):
+        try:
+            published = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+        except (AttributeError, ValueError):
+            recent.append(vid)
+            continue
+        if published.astimezone(timezone.utc).replace(tzinfo=None) >= cutoff:
+            recent.append(vid)
+        else:
+            old += 1
+    return recent, old
 
 # ------------------------------------------------
 # 4️⃣ Get video metrics (COLLECT ALL DATA - NO EARLY FILTERING)
 # ------------------------------------------------
-def get_video_metrics(video_ids):
+def fetch_video_items(video_ids, mapper=map, failed=None):
+    """
+    Fetch videos.list items for any number of video IDs.
+
+    IDs may come from many channels - fresh cached items are served from the
+    response cache and the rest are pooled and packed into full
+    IDS_PER_REQUEST-id requests (1 unit each). Returns a dict keyed by video
+    ID. Failed batches are re-queued; IDs of batches that still failed are
+    absent from the dict and added to the `failed` set.
+    """
+    video_items, missing_ids = get_cached_items("videos", list(dict.fromkeys(video_ids)))
+    batches = [missing_ids[i:i+IDS_PER_REQUEST] for i in range(0, len(missing_ids), IDS_PER_REQUEST)]
+
+    def fetch_batch(batch_ids):
+        res = execute_request("videos", 1, lambda yt: yt.videos().list(
+            **request_params("videos"),
+            id=",".join(batch_ids)
+        ))
+        store_items("videos", res.get("items", []))
+        return res.get("items", [])
+
+    results, failed_batches = map_with_requeue(fetch_batch, batches, mapper, "video batches")
+    for items in results:
+        for item in items or []:
+            video_items[item["id"]] = item
+    if failed is not None:
+        for index in failed_batches:
+            failed.update(batches[index])
+    return video_items
+
+# ISO 8601 duration (PT#H#M#S); group 1 tells "PT" apart from no match at all
+DURATION_PATTERN = r'^(PT)(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?'
+
+class VideoSummary:
+    """
+    One channel's video metrics: totals for ALL fetched videos and for the
+    QUALIFYING ones (after the date/duration filters), plus filter counts.
+
+    Kept for every analyzed channel until its result is written, so it holds
+    plain ints only; the first/last qualifying upload are epoch nanoseconds.
+    titles and upload_epochs (an int64 array) are filled only when
+    KEEP_VIDEO_TITLES is on.
+    """
+    __slots__ = ("total_videos_fetched", "total_likes_all", "total_comments_all", "total_views_all",
+                 "qualifying_video_count", "qualifying_likes", "qualifying_comments", "qualifying_views",
+                 "first_upload", "last_upload",
+                 "shorts_skipped", "old_videos_skipped", "too_short_skipped", "duration_missing",
+                 "titles", "upload_epochs")
+
+    def __init__(self, total_videos_fetched=0, total_likes_all=0, total_comments_all=0, total_views_all=0,
+                 qualifying_video_count=0, qualifying_likes=0, qualifying_comments=0, qualifying_views=0,
+                 first_upload=None, last_upload=None,
+                 shorts_skipped=0, old_videos_skipped=0, too_short_skipped=0, duration_missing=0):
+        self.total_videos_fetched = total_videos_fetched
+        self.total_likes_all = total_likes_all
+        self.total_comments_all = total_comments_all
+        self.total_views_all = total_views_all
+        self.qualifying_video_count = qualifying_video_count
+        self.qualifying_likes = qualifying_likes
+        self.qualifying_comments = qualifying_comments
+        self.qualifying_views = qualifying_views
+        self.first_upload = first_upload
+        self.last_upload = last_upload
+        self.shorts_skipped = shorts_skipped
+        self.old_videos_skipped = old_videos_skipped
+        self.too_short_skipped = too_short_skipped
+        self.duration_missing = duration_missing
+        self.titles = None
+        self.upload_epochs = None
+
+    @property
+    def avg_views_all(self):
+        return safe_divide(self.total_views_all, self.total_videos_fetched)
+
+    @property
+    def avg_likes_all(self):
+        return safe_divide(self.total_likes_all, self.total_videos_fetched)
+
+    @property
+    def avg_comments_all(self):
+        return safe_divide(self.total_comments_all, self.total_videos_fetched)
+
+    @property
+    def avg_views(self):
+        return safe_divide(self.qualifying_views, self.qualifying_video_count)
+
+    @property
+    def avg_likes(self):
+        return safe_divide(self.qualifying_likes, self.qualifying_video_count)
+
+    @property
+    def avg_comments(self):
+        return safe_divide(self.qualifying_comments, self.qualifying_video_count)
+
+    @staticmethod
+    def _isoformat(epoch):
+        return pd.Timestamp(epoch, tz="UTC").isoformat() if epoch is not None else ""
+
+    @property
+    def first_upload_iso(self):
+        return self._isoformat(self.first_upload)
+
+    @property
+    def last_upload_iso(self):
+        return self._isoformat(self.last_upload)
+
+def build_video_frame(channel_video_ids, video_items):
+    """
+    Load the fetched items of many channels into one columnar DataFrame.
+
+    channel_video_ids is a list with one list of video IDs per channel; the
+    "group" column holds each video's index in that list. IDs without an
+    item are skipped. Counts are parsed in bulk, missing counts become 0.
+    """
+    rows = []
+    for group, video_ids in enumerate(channel_video_ids):
+        for vid in video_ids:
+            video = video_items.get(vid)
+            if video is None:
+                continue
+            stats = video.get("statistics", {})
+            snippet = video.get("snippet", {})
+            rows.append((
+                group,
+                snippet.get("publishedAt"),
+                video.get("contentDetails", {}).get("duration"),
+                snippet.get("title", "") if KEEP_VIDEO_TITLES else None,
+                stats.get("viewCount", 0),
+                stats.get("likeCount", 0),
+                stats.get("commentCount", 0),
+            ))
+
+    frame = pd.DataFrame(rows, columns=["group", "published_at", "duration", "title", "views", "likes", "comments"])
+    for col in ("views", "likes", "comments"):
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").fillna(0).astype("int64")
+    return frame
+
+def summarize_video_frame(frame, n_groups):
+    """
+    Apply the video filters to a build_video_frame() DataFrame as boolean
+    masks and aggregate each group with one groupby.
+
+    Filters (counted in this order, like the per-video loop used to):
+    1. Last DAYS_LOOKBACK days only (unparseable dates count as old)
+    2. Duration present and parseable
+    3. Exclude Shorts (<MAX_SHORT_DURATION seconds)
+    4. Exclude short-form content (<MIN_VIDEO_DURATION seconds)
+
+    Returns a list of n_groups VideoSummary records (None for groups without items).
+    """
+    summaries = [None] * n_groups
+    if frame.empty:
+        return summaries
+
+    # FILTER 1: Date (Last 60 Days)
+    cutoff_date = datetime.now() - timedelta(days=DAYS_LOOKBACK)
+    published = pd.to_datetime(frame["published_at"], utc=True, errors="coerce", format="ISO8601").dt.tz_localize(None)
+    in_window = (published >= cutoff_date).to_numpy()
+
+    # FILTER 2: Get Duration
+    parts = frame["duration"].astype("object").str.extract(DURATION_PATTERN)
+    parsed = parts[0].notna().to_numpy()
+    hms = parts[[1, 2, 3]].astype("float64").fillna(0).to_numpy()
+    seconds = hms @ np.array([3600, 60, 1])
+
+    has_duration = in_window & parsed
+    shorts = has_duration & (seconds < MAX_SHORT_DURATION)            # FILTER 3
+    too_short = has_duration & ~shorts & (seconds < MIN_VIDEO_DURATION)  # FILTER 4
+    qualifying = has_duration & (seconds >= MIN_VIDEO_DURATION)
+
+    views, likes, comments = (frame[col].to_numpy() for col in ("views", "likes", "comments"))
+    totals = pd.DataFrame({
+        "group": frame["group"].to_numpy(),
+        "fetched": 1,
+        "views": views,
+        "likes": likes,
+        "comments": comments,
+        "qualifying": qualifying.astype("int64"),
+        "q_views": np.where(qualifying, views, 0),
+        "q_likes": np.where(qualifying, likes, 0),
+        "q_comments": np.where(qualifying, comments, 0),
+        "old": (~in_window).astype("int64"),
+        "missing": (in_window & ~parsed).astype("int64"),
+        "shorts": shorts.astype("int64"),
+        "too_short": too_short.astype("int64"),
+    }).groupby("group", sort=False).sum()
+
+    # Qualifying upload times as int64 epoch nanoseconds (qualifying implies a parsed date)
+    qualifying_rows = pd.DataFrame({
+        "group": frame["group"].to_numpy()[qualifying],
+        "epoch": published.astype("datetime64[ns]").to_numpy()[qualifying].view("int64"),
+    })
+    first_last = qualifying_rows.groupby("group", sort=False)["epoch"].agg(["min", "max"])
+    first_uploads, last_uploads = first_last["min"].to_dict(), first_last["max"].to_dict()
+    if KEEP_VIDEO_TITLES:
+        qualifying_rows["title"] = frame["title"].to_numpy()[qualifying]
+        titles = qualifying_rows.groupby("group", sort=False)["title"].agg(list).to_dict()
+        epochs = qualifying_rows.groupby("group", sort=False)["epoch"].agg(lambda e: array("q", e)).to_dict()
+
+    for group, row in zip(totals.index, totals.itertuples(index=False)):
+        summary = VideoSummary(
+            total_videos_fetched=int(row.fetched),
+            total_likes_all=int(row.likes),
+            total_comments_all=int(row.comments),
+            total_views_all=int(row.views),
+            qualifying_video_count=int(row.qualifying),
+            qualifying_likes=int(row.q_likes),
+            qualifying_comments=int(row.q_comments),
+            qualifying_views=int(row.q_views),
+            first_upload=first_uploads.get(group),
+            last_upload=last_uploads.get(group),
+            shorts_skipped=int(row.shorts),
+            old_videos_skipped=int(row.old),
+            too_short_skipped=int(row.too_short),
+            duration_missing=int(row.missing),
+        )
+        if KEEP_VIDEO_TITLES:
+            summary.titles = titles.get(group, [])
+            summary.upload_epochs = epochs.get(group, array("q"))
+        summaries[group] = summary
+
+    return summaries
+
+def get_channel_video_metrics(channel_video_ids, video_items):
+    """
+    Get video metrics for many channels at once from pooled video items.
+
+    Returns one VideoSummary per channel (None where none of the
+    channel's videos could be fetched or analyzed).
+    """
+    try:
+        frame = build_video_frame(channel_video_ids, video_items)
+        return summarize_video_frame(frame, len(channel_video_ids))
+    except Exception as e:
+        print(f"    ⚠️ Error analyzing videos: {e}")
+        return [None] * len(channel_video_ids)
+
+def get_video_metrics(video_ids, video_items=None):
     """
     Get detailed metrics for videos with filters:
     1. Last 60 days only
     2. Exclude Shorts (<60 seconds)
     3. Exclude short-form content (<4 minutes)
 
+    video_items is an optional fetch_video_items() result covering video_ids;
+    when omitted the videos are fetched here.
+
     Returns data for ALL videos AND qualifying videos separately
     """
     if not video_ids:
         return None
 
-    try:
-        # Batch video requests (50 max per request)
-        all_videos = []
-        max_retries = len(API_KEYS)
-
-        for i in range(0, len(video_ids), 50):
-            batch_ids = video_ids[i:i+50]
-
-            for attempt in range(max_retries):
-                try:
-                    req = youtube.videos().list(
-                        part="snippet,statistics,contentDetails",
-                        id=",".join(batch_ids)
-                    )
-                    res = req.execute()
-                    track_quota("videos", 1)
-
-                    all_videos.extend(res.get("items", []))
-                    break  # Success, exit retry loop
-
-                except HttpError as e:
-                    if is_quota_exceeded_error(e):
-                        if switch_api_key():
-                            continue  # Retry with new key
-                        else:
-                            break  # No more keys, skip this batch
-                    else:
-                        break  # Other error, skip this batch
-                except Exception as e:
-                    break  # Error, skip this batch
-
-        if not all_videos:
-            return None
+    if video_items is None:
+        video_items = fetch_video_items(video_ids)
 
-        # Initialize counters for ALL videos
-        total_videos_fetched = len(all_videos)
-        total_likes_all = 0
-        total_comments_all = 0
-        total_views_all = 0
-
-        # Initialize counters for QUALIFYING videos
-        qualifying_likes = 0
-        qualifying_comments = 0
-        qualifying_views = 0
-        qualifying_titles = []
-        qualifying_dates = []
-
-        # Filter counters
-        shorts_skipped = 0
-        old_videos_skipped = 0
-        too_short_skipped = 0
-        duration_missing = 0
-
-        # Calculate cutoff date (60 days ago)
-        cutoff_date = datetime.now() - timedelta(days=DAYS_LOOKBACK)
-
-        # Process each video
-        for video in all_videos:
-            stats = video.get("statistics", {})
-            snippet = video.get("snippet", {})
-            content_details = video.get("contentDetails", {})
+    return get_channel_video_metrics([video_ids], video_items)[0]
 
-            # Collect stats for ALL videos (no filters)
-            total_likes_all += int(stats.get("likeCount", 0))
-            total_comments_all += int(stats.get("commentCount", 0))
-            total_views_all += int(stats.get("viewCount", 0))
+# ------------------------------------------------
+# 5️⃣ Calculate normalized merchandise score (ONLY FOR QUALIFYING CHANNELS)
+# ------------------------------------------------
 
-            # Now apply filters for QUALIFYING videos
-            passed_all_filters = True
+# Built-in weight profiles. Weights are applied in this order; caps are the
+# raw values that normalize to 1.0. Profiles in SCORING_PROFILES_FILE are
+# merged over "default", so they only need the values they change.
+SCORING_PROFILES = {
+    "default": {
+        "weights": {
+            "engagement": 0.30,
+            "consistent_reach": 0.20,
+            "comment_rate": 0.20,
+            "upload_consistency": 0.10,
+            "view_velocity": 0.10,
+            "like_rate": 0.10,
+        },
+        "caps": {
+            "engagement": 0.10,
+            "comment_rate": 0.02,
+            "consistent_reach": 0.50,
+            "upload_consistency": 15,
+            "view_velocity": 0.10,
+            "like_rate": 0.06,
+        },
+    },
+}
+
+def load_scoring_profile(name=None):
+    """Return the weights/caps profile called name (default: SCORING_PROFILE)"""
+    name = name or SCORING_PROFILE
+    profiles = dict(SCORING_PROFILES)
+
+    if os.path.exists(SCORING_PROFILES_FILE):
+        with open(SCORING_PROFILES_FILE, encoding="utf-8") as f:
+            profiles.update(json.load(f))
+
+    if name not in profiles:
+        raise ValueError(f"Unknown scoring profile '{name}' (available: {', '.join(sorted(profiles))})")
+
+    default = SCORING_PROFILES["default"]
+    profile = profiles[name]
+    return {
+        "name": name,
+        "weights": {**default["weights"], **profile.get("weights", {})},
+        "caps": {**default["caps"], **profile.get("caps", {})},
+    }
 
-            # FILTER 1: Date (Last 60 Days)
-            try:
-                published_date = pd.to_datetime(snippet.get("publishedAt"))
-                published_date_naive = published_date.tz_localize(None) if published_date.tzinfo else published_date
+def _divide(numerator, denominator):
+    """Element-wise safe_divide(): 0 wherever the denominator is 0"""
+    numerator = np.asarray(numerator, dtype="float64")
+    denominator = np.asarray(denominator, dtype="float64")
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
 
-                if published_date_naive < cutoff_date:
-                    old_videos_skipped += 1
-                    passed_all_filters = False
-            except Exception:
-                old_videos_skipped += 1
-                passed_all_filters = False
+def compute_scores(inputs, profile=None):
+    """
+    Compute raw metrics, normalized metrics and the weighted score for every
+    row of inputs as array operations.
 
-            if not passed_all_filters:
-                continue
+    inputs columns: count, total_likes, total_comments, total_views (of the
+    qualifying videos), first_upload, last_upload (datetimes), subs and
+    views_total (channel lifetime views). Returns a DataFrame with
+    <metric>_raw, <metric>_norm and score columns.
+    """
+    profile = profile or load_scoring_profile()
+    count = inputs["count"].to_numpy(dtype="float64")
 
-            # FILTER 2: Get Duration
-            duration_str = content_details.get("duration")
-            if not duration_str:
-                duration_missing += 1
-                continue
+    avg_likes = _divide(inputs["total_likes"], count)
+    avg_comments = _divide(inputs["total_comments"], count)
+    avg_views = _divide(inputs["total_views"], count)
 
-            duration_seconds = parse_duration(duration_str)
-            if duration_seconds is None:
-                duration_missing += 1
-                continue
+    # Calculate Raw Metrics
+    span_days = np.maximum(7, (inputs["last_upload"] - inputs["first_upload"]).dt.days.to_numpy(dtype="float64"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        upload_consistency = np.where(count > 1, count / span_days * 30, count / DAYS_LOOKBACK * 30)
+
+    raw = {
+        "engagement": _divide(avg_likes + avg_comments, avg_views),
+        "comment_rate": _divide(avg_comments, avg_views),
+        "consistent_reach": _divide(avg_views, inputs["subs"]),
+        "upload_consistency": upload_consistency,
+        "view_velocity": _divide(inputs["total_views"], inputs["views_total"]),
+        "like_rate": _divide(avg_likes, avg_views),
+    }
 
-            # FILTER 3: Exclude Shorts (<60 sec)
-            if duration_seconds < MAX_SHORT_DURATION:
-                shorts_skipped += 1
-                continue
+    scores = pd.DataFrame(index=inputs.index)
+    score = np.zeros(len(inputs))
+    for metric, values in raw.items():
+        scores[f"{metric}_raw"] = values
+
+    # Normalize to 0-1 Scale and Apply Custom Weights
+    for metric, weight in profile["weights"].items():
+        cap = profile["caps"][metric]
+        norm = np.clip(raw[metric] / cap, 0, 1) if cap else np.zeros(len(inputs))
+        scores[f"{metric}_norm"] = norm
+        score = score + weight * norm
+
+    scores["score"] = score
+    return scores
+
+def calculate_merchandise_score(channel_data, video_data, profile=None):
+    """Calculate merchandise partnership score with custom weights (one channel, a VideoSummary)"""
+    inputs = pd.DataFrame({
+        "count": [video_data.qualifying_video_count],
+        "total_likes": [video_data.qualifying_likes],
+        "total_comments": [video_data.qualifying_comments],
+        "total_views": [video_data.qualifying_views],
+        "first_upload": pd.to_datetime([video_data.first_upload], utc=True),
+        "last_upload": pd.to_datetime([video_data.last_upload], utc=True),
+        "subs": [channel_data["subs"]],
+        "views_total": [channel_data["views_total"]],
+    })
+    row = compute_scores(inputs, profile).iloc[0]
 
-            # FILTER 4: Exclude Short Videos (<4 min)
-            if duration_seconds < MIN_VIDEO_DURATION:
-                too_short_skipped += 1
-                continue
+    return {
+        "score": row["score"],
+        "engagement_norm": row["engagement_norm"],
+        "comment_rate_norm": row["comment_rate_norm"],
+        "consistent_reach_norm": row["consistent_reach_norm"],
+        "upload_consistency_norm": row["upload_consistency_norm"],
+        "view_velocity_norm": row["view_velocity_norm"],
+        "like_rate_norm": row["like_rate_norm"],
+        "engagement_raw": row["engagement_raw"],
+        "comment_rate_raw": row["comment_rate_raw"],
+        "like_rate_raw": row["like_rate_raw"],
+        "view_velocity_raw": row["view_velocity_raw"],
+        "upload_consistency_raw": row["upload_consistency_raw"]
+    }
 
-            # Video Passed All Filters - Count as QUALIFYING
-            qualifying_likes += int(stats.get("likeCount", 0))
-            qualifying_comments += int(stats.get("commentCount", 0))
-            qualifying_views += int(stats.get("viewCount", 0))
-            qualifying_titles.append(snippet.get("title", ""))
-            qualifying_dates.append(published_date)
+def _round_values(values, digits):
+    """Round like Python's round() so scores match the per-channel output exactly"""
+    return [round(v, digits) for v in np.asarray(values, dtype="float64").tolist()]
 
-        qualifying_count = len(qualifying_dates)
+def score_channels(df_all, profile=None):
+    """
+    Score every qualifying channel of an ALL_CHANNELS DataFrame in one pass.
 
-        return {
-            # ALL videos data (no filters)
-            "total_videos_fetched": total_videos_fetched,
-            "total_likes_all": total_likes_all,
-            "total_comments_all": total_comments_all,
-            "total_views_all": total_views_all,
-            "avg_likes_all": safe_divide(total_likes_all, total_videos_fetched),
-            "avg_comments_all": safe_divide(total_comments_all, total_videos_fetched),
-            "avg_views_all": safe_divide(total_views_all, total_videos_fetched),
-
-            # QUALIFYING videos data (with filters)
-            "qualifying_video_count": qualifying_count,
-            "qualifying_likes": qualifying_likes,
-            "qualifying_comments": qualifying_comments,
-            "qualifying_views": qualifying_views,
-            "avg_likes": safe_divide(qualifying_likes, qualifying_count),
-            "avg_comments": safe_divide(qualifying_comments, qualifying_count),
-            "avg_views": safe_divide(qualifying_views, qualifying_count),
-            "total_views": qualifying_views,
-            "titles": qualifying_titles,
-            "dates": qualifying_dates,
-
-            # Filter statistics
-            "shorts_skipped": shorts_skipped,
-            "old_videos_skipped": old_videos_skipped,
-            "too_short_skipped": too_short_skipped,
-            "duration_missing": duration_missing
-        }
+    A channel qualifies with >= MIN_VIDEOS_IN_TIMEFRAME qualifying videos
+    that have views. Returns the QUALIFIED_CHANNELS DataFrame sorted by
+    Merch_Score (highest first). Raises ValueError if df_all lacks the raw
+    qualifying totals (ALL_CHANNELS files written before they were added).
+    """
+    required = ["Qualifying_Videos_60d", "Total_Likes_Qualified", "Total_Comments_Qualified",
+                "Total_Views_Qualified", "First_Qualifying_Upload", "Last_Qualifying_Upload",
+                "Actual_Subs", "Total_Channel_Views"]
+    missing = [col for col in required if col not in df_all.columns]
+    if missing:
+        raise ValueError(f"ALL_CHANNELS data is missing columns needed for scoring: {', '.join(missing)}")
+
+    count = df_all["Qualifying_Videos_60d"].fillna(0)
+    enough_videos = count >= MIN_VIDEOS_IN_TIMEFRAME
+    has_views = df_all["Total_Views_Qualified"].fillna(0) > 0
+
+    skipped = int((enough_videos & ~has_views).sum())
+    if skipped:
+        print(f"  ⚠️ Skipping {skipped} channel(s): insufficient video data for scoring")
+
+    df = df_all[enough_videos & has_views]
+    inputs = pd.DataFrame({
+        "count": df["Qualifying_Videos_60d"],
+        "total_likes": df["Total_Likes_Qualified"],
+        "total_comments": df["Total_Comments_Qualified"],
+        "total_views": df["Total_Views_Qualified"],
+        "first_upload": pd.to_datetime(df["First_Qualifying_Upload"], utc=True, errors="coerce", format="ISO8601"),
+        "last_upload": pd.to_datetime(df["Last_Qualifying_Upload"], utc=True, errors="coerce", format="ISO8601"),
+        "subs": df["Actual_Subs"],
+        "views_total": df["Total_Channel_Views"],
+    })
+    scores = compute_scores(inputs, profile)
+
+    df_qualified = pd.DataFrame({
+        "Channel_Name": df["Channel_Name"].to_numpy(),
+        "Channel_ID": df["Channel_ID"].to_numpy(),
+        "CSV_Subs": df["CSV_Subs"].to_numpy(),
+        "Actual_Subs": df["Actual_Subs"].to_numpy(dtype="int64"),
+        "Qualifying_Videos_60d": df["Qualifying_Videos_60d"].to_numpy(dtype="int64"),
+        "Avg_Views": df["Avg_Views_Qualified"].to_numpy(dtype="int64"),
+        "Avg_Likes": df["Avg_Likes_Qualified"].to_numpy(dtype="int64"),
+        "Avg_Comments": df["Avg_Comments_Qualified"].to_numpy(dtype="int64"),
+        "Total_Views_Qualified": df["Total_Views_Qualified"].to_numpy(dtype="int64"),
+        "Engagement_Rate": _round_values(scores["engagement_raw"] * 100, 3),
+        "Comment_Rate": _round_values(scores["comment_rate_raw"] * 100, 3),
+        "Consistent_Reach": _round_values(scores["consistent_reach_norm"], 2),
+        "Upload_Per_Month": _round_values(scores["upload_consistency_raw"], 1),
+        "View_Velocity": _round_values(scores["view_velocity_norm"], 2),
+        "Like_Rate": _round_values(scores["like_rate_raw"] * 100, 3),
+        "Merch_Score": _round_values(scores["score"], 4),
+        "Search_Term": df["Search_Term"].to_numpy(),
+        "Query_Name": df["Query_Name"].to_numpy(),
+    })
+
+    order = np.argsort(-scores["score"].to_numpy(), kind="stable")
+    return df_qualified.iloc[order].reset_index(drop=True)
+
+def rescore_file(path, profile_name=None):
+    """Re-score a saved ALL_CHANNELS file (CSV or Parquet) with a scoring profile - no API calls"""
+    profile = load_scoring_profile(profile_name)
+    print(f"📂 Re-scoring {path} with profile '{profile['name']}'")
+
+    total, candidates = load_scoring_candidates(path)
+    df_qualified = score_channels(candidates, profile)
+    print(f"  ✓ {len(df_qualified):,} of {total:,} channels qualified")
 
-    except Exception as e:
-        return None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_format = "parquet" if path.endswith(".parquet") else "csv"
+    filename = save_results(df_qualified, f"QUALIFIED_CHANNELS_{profile['name']}", timestamp, output_format)
+    print(f"💾 Saved to: {filename}")
+    return df_qualified
 
 # ------------------------------------------------
-# 5️⃣ Calculate normalized merchandise score (ONLY FOR QUALIFYING CHANNELS)
+# 6️⃣ Process single channel (COLLECT ALL DATA)
 # ------------------------------------------------
-def calculate_merchandise_score(channel_data, video_data):
-    """Calculate merchandise partnership score with custom weights"""
+def process_channel(csv_channel, channel_lookup=None):
+    """Process a single channel from CSV - collect ALL data regardless of qualification
 
-    # Calculate Raw Metrics
-    engagement_raw = safe_divide(
-        video_data["avg_likes"] + video_data["avg_comments"],
-        video_data["avg_views"]
-    )
-
-    comment_rate_raw = safe_divide(
-        video_data["avg_comments"],
-        video_data["avg_views"]
-    )
-
-    consistent_reach_raw = safe_divide(
-        video_data["avg_views"],
-        channel_data["subs"]
-    )
-
-    if len(video_data["dates"]) > 1:
-        span_days = max(7, (max(video_data["dates"]) - min(video_data["dates"])).days)
-        upload_consistency_raw = len(video_data["dates"]) / span_days * 30
-    else:
-        upload_consistency_raw = len(video_data["dates"]) / DAYS_LOOKBACK * 30
-
-    view_velocity_raw = safe_divide(
-        video_data["total_views"],
-        channel_data["views_total"]
-    )
-
-    like_rate_raw = safe_divide(
-        video_data["avg_likes"],
-        video_data["avg_views"]
-    )
-
-    # Normalize to 0-1 Scale
-    engagement_norm = normalize_metric(engagement_raw, 0, 0.10)
-    comment_rate_norm = normalize_metric(comment_rate_raw, 0, 0.02)
-    consistent_reach_norm = normalize_metric(consistent_reach_raw, 0, 0.50)
-    upload_consistency_norm = normalize_metric(upload_consistency_raw, 0, 15)
-    view_velocity_norm = normalize_metric(view_velocity_raw, 0, 0.10)
-    like_rate_norm = normalize_metric(like_rate_raw, 0, 0.06)
-
-    # Apply Custom Weights
-    merchandise_score = (
-        0.30 * engagement_norm +
-        0.20 * consistent_reach_norm +
-        0.20 * comment_rate_norm +
-        0.10 * upload_consistency_norm +
-        0.10 * view_velocity_norm +
-        0.10 * like_rate_norm
-    )
+    channel_lookup is an optional resolve_channels() result; channels found
+    in it are not looked up again.
+    """
 
-    return {
-        "score": merchandise_score,
-        "engagement_norm": engagement_norm,
-        "comment_rate_norm": comment_rate_norm,
-        "consistent_reach_norm": consistent_reach_norm,
-        "upload_consistency_norm": upload_consistency_norm,
-        "view_velocity_norm": view_velocity_norm,
-        "like_rate_norm": like_rate_norm,
-        "engagement_raw": engagement_raw,
-        "comment_rate_raw": comment_rate_raw,
-        "like_rate_raw": like_rate_raw,  # MISSING - Added!
-        "view_velocity_raw": view_velocity_raw,  # MISSING - Added!
-        "upload_consistency_raw": upload_consistency_raw
-    }
+    # Step 1: Get channel statistics using ID (pre-resolved in batches when available)
+    channel_id = csv_channel['channel_id']
+    if channel_lookup is None or channel_id not in channel_lookup:
+        channel_lookup = {channel_id: get_channel_stats(channel_id, csv_channel['channel_name'])}
 
-# ------------------------------------------------
-# 6️⃣ Process single channel (COLLECT ALL DATA)
-# ------------------------------------------------
-def process_channel(csv_channel):
-    """Process a single channel from CSV - collect ALL data regardless of qualification"""
+    # Steps 2-4: Recent videos, video metrics and the result row
+    return analyze_channels([csv_channel], channel_lookup)[0]
+
+def build_channel_result(csv_channel, channel_data, video_ids, video_data, fetch_failed=False, prefiltered=None):
+    """Build the ALL_CHANNELS result row for a channel from its fetched data
+
+    video_data is the channel's get_video_metrics() VideoSummary (None if its
+    videos could not be analyzed). fetch_failed marks a channel whose data
+    could not be fetched because of API errors; its row is flagged so it is
+    not journaled. prefiltered is (recent uploads, older uploads) for a
+    channel the playlist prefilter ruled out before videos.list.
+    """
 
     channel_id = csv_channel['channel_id']
     channel_name = csv_channel['channel_name']
     csv_subs = csv_channel['subscribers']
 
-    # Step 1: Get channel statistics using ID
-    channel_data = get_channel_stats(channel_id, channel_name)
+    if fetch_failed:
+        print(f"  ❌ Fetch failed after retries - retry with --resume")
+        return {
+            "Channel_Name": channel_name,
+            "Channel_ID": channel_id,
+            "CSV_Subs": csv_subs,
+            "Actual_Subs": channel_data["subs"] if channel_data else None,
+            "Total_Channel_Views": channel_data["views_total"] if channel_data else None,
+            "Total_Channel_Videos": channel_data["video_count"] if channel_data else None,
+            "Videos_Fetched": 0,
+            "Qualifying_Videos_60d": 0,
+            "Status": "Fetch failed",
+            "Search_Term": csv_channel.get('search_term', ''),
+            "Query_Name": csv_channel.get('query_name', ''),
+            "_retry": True,
+        }
+
     if not channel_data:
         print(f"  ❌ Could not retrieve channel data")
         return None
 
-    # Step 2: Get recent videos
-    video_ids = get_recent_video_ids(channel_data["uploads_playlist"], VIDEOS_PER_CHANNEL)
     if not video_ids:
         print(f"  ❌ No videos found")
         return {
@@ -615,8 +3250,24 @@ def process_channel(csv_channel):
             "Query_Name": csv_channel.get('query_name', ''),
         }
 
-    # Step 3: Get video metrics (ALL data + qualifying data)
-    video_data = get_video_metrics(video_ids)
+    if prefiltered:
+        recent, old = prefiltered
+        print(f"  ⏭️ Only {recent} upload(s) in the last {DAYS_LOOKBACK} days - videos not fetched")
+        return {
+            "Channel_Name": channel_name,
+            "Channel_ID": channel_id,
+            "CSV_Subs": csv_subs,
+            "Actual_Subs": channel_data["subs"],
+            "Total_Channel_Views": channel_data["views_total"],
+            "Total_Channel_Videos": channel_data["video_count"],
+            "Videos_Fetched": 0,
+            "Qualifying_Videos_60d": 0,
+            "Old_Videos_Skipped": old,
+            "Status": f"Too few recent uploads ({recent} < {MIN_VIDEOS_IN_TIMEFRAME})",
+            "Search_Term": csv_channel.get('search_term', ''),
+            "Query_Name": csv_channel.get('query_name', ''),
+        }
+
     if not video_data:
         print(f"  ❌ Could not analyze videos")
         return {
@@ -634,7 +3285,7 @@ def process_channel(csv_channel):
         }
 
     # Build result with ALL data (no filtering at this stage)
-    qualifying_count = video_data["qualifying_video_count"]
+    qualifying_count = video_data.qualifying_video_count
 
     status = "Analyzed"
     if qualifying_count < MIN_VIDEOS_IN_TIMEFRAME:
@@ -650,23 +3301,27 @@ def process_channel(csv_channel):
         "Total_Channel_Videos": channel_data["video_count"],
 
         # Video fetch stats
-        "Videos_Fetched": video_data["total_videos_fetched"],
+        "Videos_Fetched": video_data.total_videos_fetched,
         "Qualifying_Videos_60d": qualifying_count,
-        "Shorts_Skipped": video_data.get("shorts_skipped", 0),
-        "Short_Vids_Skipped": video_data.get("too_short_skipped", 0),
-        "Old_Videos_Skipped": video_data.get("old_videos_skipped", 0),
+        "Shorts_Skipped": video_data.shorts_skipped,
+        "Short_Vids_Skipped": video_data.too_short_skipped,
+        "Old_Videos_Skipped": video_data.old_videos_skipped,
 
         # ALL videos metrics (no filters)
-        "Avg_Views_All": round(video_data["avg_views_all"]),
-        "Avg_Likes_All": round(video_data["avg_likes_all"]),
-        "Avg_Comments_All": round(video_data["avg_comments_all"]),
-        "Total_Views_All": video_data["total_views_all"],
+        "Avg_Views_All": round(video_data.avg_views_all),
+        "Avg_Likes_All": round(video_data.avg_likes_all),
+        "Avg_Comments_All": round(video_data.avg_comments_all),
+        "Total_Views_All": video_data.total_views_all,
 
         # QUALIFYING videos metrics (with filters)
-        "Avg_Views_Qualified": round(video_data["avg_views"]) if qualifying_count > 0 else 0,
-        "Avg_Likes_Qualified": round(video_data["avg_likes"]) if qualifying_count > 0 else 0,
-        "Avg_Comments_Qualified": round(video_data["avg_comments"]) if qualifying_count > 0 else 0,
-        "Total_Views_Qualified": video_data["total_views"],
+        "Avg_Views_Qualified": round(video_data.avg_views) if qualifying_count > 0 else 0,
+        "Avg_Likes_Qualified": round(video_data.avg_likes) if qualifying_count > 0 else 0,
+        "Avg_Comments_Qualified": round(video_data.avg_comments) if qualifying_count > 0 else 0,
+        "Total_Views_Qualified": video_data.qualifying_views,
+        "Total_Likes_Qualified": video_data.qualifying_likes,
+        "Total_Comments_Qualified": video_data.qualifying_comments,
+        "First_Qualifying_Upload": video_data.first_upload_iso,
+        "Last_Qualifying_Upload": video_data.last_upload_iso,
 
         # Metadata
         "Search_Term": csv_channel.get('search_term', ''),
@@ -679,147 +3334,945 @@ def process_channel(csv_channel):
     }
 
     # Print progress
-    print(f"  ✅ {channel_name[:40]:40} | Fetched: {video_data['total_videos_fetched']:2d} | Qualified: {qualifying_count:2d} | Status: {status[:30]}")
+    print(f"  ✅ {channel_name[:40]:40} | Fetched: {video_data.total_videos_fetched:2d} | Qualified: {qualifying_count:2d} | Status: {status[:30]}")
 
     return result
 
+# Result columns that come from the CSV row rather than the API
+CSV_RESULT_FIELDS = {
+    "Channel_Name": "channel_name",
+    "Channel_ID": "channel_id",
+    "CSV_Subs": "subscribers",
+    "Search_Term": "search_term",
+    "Query_Name": "query_name",
+}
+
+def with_csv_fields(result, csv_channel):
+    """
+    A channel's result for another CSV row listing the same channel (under
+    a different search term, or by handle instead of ID): the API data is
+    shared, the row's own name, ID, subscribers and search term are used.
+    """
+    if result is None:
+        return None
+    fields = {column: csv_channel.get(key, '') for column, key in CSV_RESULT_FIELDS.items()}
+    if all(result.get(column) == value for column, value in fields.items()):
+        return result
+    return {**result, **fields}
+
 # ------------------------------------------------
-# 7️⃣ Main execution
+# 7️⃣ Concurrent channel processing
 # ------------------------------------------------
-def main():
-    """Run the scraper for all channels in CSV"""
-    global QUOTA_USED
+def analyze_channels(channels, channel_lookup, mapper=map, start_idx=None, total=None, failed=None):
+    """
+    Fetch and analyze the videos of already-resolved channels:
+
+    1. Fetch each channel's recent upload IDs (one playlist per channel),
+       stopping at videos known from the previous run
+    2. With PLAYLIST_PREFILTER, drop uploads the playlist dates outside the
+       DAYS_LOOKBACK window; channels left with fewer than
+       MIN_VIDEOS_IN_TIMEFRAME get a "Too few recent uploads" result
+       without any videos.list request
+    3. Pool the video IDs that need fetching - new uploads plus a bounded
+       refresh of stale stats - into full videos.list batches
+    4. Fan the items back out and build each channel's result, with the
+       growth since the channel's last snapshot (SNAPSHOT_DIR)
+
+    Failed playlist fetches and video batches are re-queued; channels whose
+    data still could not be fetched - or whose lookup failed (CSV IDs in
+    `failed`) - get a "Fetch failed" result that is not journaled, so
+    --resume retries them. Progress lines are printed when start_idx is
+    given (total may be None for streamed input). Returns results in input
+    order (None for channels that could not be retrieved).
+    """
+    state = get_channel_state()
+    resolved_ids = [data["channel_id"] for data in channel_lookup.values() if data]
+    previous = state.get_channels(resolved_ids) if state else {}
+    failed_channels = set(failed or ())
+
+    def fetch_upload_ids(channel):
+        channel_data = channel_lookup.get(channel['channel_id'])
+        if not channel_data:
+            return []
+        prev = previous.get(channel_data["channel_id"], {})
+        published = dict(zip(prev.get("video_ids") or (), prev.get("upload_times") or ()))
+        video_ids = get_recent_video_ids(channel_data["uploads_playlist"], VIDEOS_PER_CHANNEL, prev.get("video_ids"), published)
+        return video_ids, [published.get(vid) for vid in video_ids]
+
+    with timed_stage("playlist_fetch"):
+        uploads, failed_playlists = map_with_requeue(fetch_upload_ids, channels, mapper, "upload playlists")
+    uploads = [upload or ([], []) for upload in uploads]
+    channel_video_ids = [video_ids for video_ids, upload_times in uploads]
+    failed_channels.update(channels[index]['channel_id'] for index in failed_playlists)
+
+    # Only uploads inside the window are worth a videos.list unit
+    analyzed_ids, old_uploads, prefiltered = channel_video_ids, [0] * len(channels), [None] * len(channels)
+    if PLAYLIST_PREFILTER:
+        analyzed_ids = []
+        for index, (video_ids, upload_times) in enumerate(uploads):
+            recent, old_uploads[index] = split_recent_uploads(video_ids, upload_times)
+            if video_ids and len(recent) < MIN_VIDEOS_IN_TIMEFRAME:
+                prefiltered[index] = (len(recent), old_uploads[index])
+                recent = []
+            analyzed_ids.append(recent)
+        skipped = sum(1 for counts in prefiltered if counts)
+        if skipped:
+            METRICS.increment("prefilter_skips_total", (("kind", "channels"),), skipped)
+        METRICS.increment("prefilter_skips_total", (("kind", "videos"),),
+                          sum(len(all_ids) - len(ids) for all_ids, ids in zip(channel_video_ids, analyzed_ids)))
+
+    stored_videos = state.get_videos([vid for ids in analyzed_ids for vid in ids]) if state else {}
+    failed_videos = set()
+    with timed_stage("video_fetch"):
+        fetched = fetch_video_items(select_videos_to_fetch(analyzed_ids, stored_videos), mapper, failed_videos)
+    if failed_videos:
+        failed_channels.update(channel['channel_id'] for channel, ids in zip(channels, analyzed_ids)
+                               if failed_videos.intersection(ids))
+    video_items = {vid: item for vid, (item, fetched_at) in stored_videos.items()}
+    video_items.update(fetched)
+    if state:
+        state.save_videos(fetched.values())
+
+    # Video metrics (ALL data + qualifying data) for every channel in one pass
+    with timed_stage("filtering"):
+        channel_video_data = get_channel_video_metrics(analyzed_ids, video_items)
+    for video_data, old in zip(channel_video_data, old_uploads):
+        if video_data is not None:
+            video_data.old_videos_skipped += old
+
+    # Append this wave's stats to the snapshot history; growth comes from each channel's last snapshot
+    growth = {}
+    if SNAPSHOT_STORE is not None:
+        resolved = [channel_lookup.get(channel['channel_id']) for channel in channels]
+        growth = SNAPSHOT_STORE.record_channels([data for data in resolved if data])
+        owners = {vid: data["channel_id"] for data, ids in zip(resolved, analyzed_ids) if data for vid in ids}
+        SNAPSHOT_STORE.record_videos(fetched.values(), owners)
+
+    results = []
+    new_state = {}
+    for idx, (channel, (video_ids, upload_times), video_data) in enumerate(zip(channels, uploads, channel_video_data)):
+        if start_idx is not None:
+            position = f"{start_idx + idx}/{total}" if total else f"{start_idx + idx}"
+            print(f"[{position}] {channel['channel_name']} (ID: {channel['channel_id'][:20]}..., {channel['subscribers']:,} subs)")
+
+        try:
+            channel_data = channel_lookup.get(channel['channel_id'])
+            fetch_failed = channel['channel_id'] in failed_channels
+            result = build_channel_result(channel, channel_data, video_ids, video_data, fetch_failed, prefiltered[idx])
+            if result and channel_data and channel_data["channel_id"] in growth:
+                subs_per_day, views_per_day = growth[channel_data["channel_id"]]
+                result["Subs_Growth_Per_Day"] = round(subs_per_day, 1) if subs_per_day is not None else None
+                result["Views_Growth_Per_Day"] = round(views_per_day, 1) if views_per_day is not None else None
+        except Exception as e:
+            print(f"  ❌ Error: {e}")
+            result = None
+        results.append(result)
+
+        if result and video_ids and not fetch_failed:
+            newest = video_items.get(video_ids[0], {})
+            new_state[channel_data["channel_id"]] = {
+                "video_ids": video_ids,
+                "upload_times": upload_times,
+                "newest_video_id": video_ids[0],
+                "newest_published_at": newest.get("snippet", {}).get("publishedAt") or upload_times[0],
+                "status": result["Status"],
+                "qualifying_count": result["Qualifying_Videos_60d"],
+                # Qualifying channels get their score once the run is scored (record_scores())
+                "merch_score": None if result["Qualifying_Videos_60d"] >= MIN_VIDEOS_IN_TIMEFRAME else 0.0,
+            }
+
+    if state and new_state:
+        state.save_channels(new_state)
+
+    return results
+
+def process_wave(wave, mapper=map, start_idx=1, total=None):
+    """
+    Process a wave of CSV channels with requests packed across channels:
+    channel stats are resolved in IDS_PER_REQUEST-id channels.list batches,
+    then analyze_channels() handles uploads and pooled video batches.
+
+    Rows that resolve to the same channel are analyzed once and the result
+    is fanned out to each of them (with_csv_fields()). Returns results in
+    wave order (None for channels that could not be retrieved).
+    """
+    failed = set()
+    with timed_stage("channel_lookup"):
+        channel_lookup = resolve_channels(wave, mapper, failed)
+
+    keys = [(channel_lookup.get(channel['channel_id']) or {}).get("channel_id", channel['channel_id'])
+            for channel in wave]
+    unique = {}  # Channel -> its first row in the wave
+    for key, channel in zip(keys, wave):
+        unique.setdefault(key, channel)
+    results = dict(zip(unique, analyze_channels(list(unique.values()), channel_lookup, mapper, start_idx, total, failed)))
+    return [with_csv_fields(results[key], channel) for key, channel in zip(keys, wave)]
+
+def process_channels(channels, workers=MAX_WORKERS, total=None, journaled=None, duplicates=None):
+    """
+    Process a stream of channels in waves of PIPELINE_WAVE_SIZE with a pool
+    of worker threads.
+
+    Each wave runs through process_wave(), with the independent requests of
+    every stage spread over the workers. Channels found in journaled (a
+    load_checkpoint() result) are not fetched again; their journaled result
+    is passed through. duplicates ({channel key: rows}, from
+    count_duplicate_channels()) are the channels listed more than once:
+    the first result of each is kept until its last row, so a channel is
+    fetched once per run however many rows list it. A @handle counted
+    before it was resolved keeps its own key until its fetch (or another
+    row's) adds it to the handle index, then its rows join that channel's.
+    Yields (channel, result)
+    pairs in input order. Request pacing is handled per API key by the token
+    buckets in execute_request(), so no fixed sleep between channels is needed.
+    """
+    journaled = journaled or {}
+    rows_left = dict(duplicates or {})
+    shared = {}  # Channel key -> payload-free result, for duplicated channels with rows still to come
+
+    def merge_handle(handle, key):
+        """A @handle counted under its own key resolved to key: its rows (and shared result) join key's"""
+        rows_left[key] = rows_left.get(key, 0) + rows_left.pop(handle)
+        if handle in shared:
+            shared.setdefault(key, shared.pop(handle))
+
+    def dedup_keys(wave):
+        keys = channel_keys([channel['channel_id'] for channel in wave])
+        for channel, key in zip(wave, keys):
+            handle = channel['channel_id'].lower() if channel['channel_id'].startswith('@') else None
+            if handle in rows_left and key != handle:  # Resolved since it was counted
+                merge_handle(handle, key)
+        return keys
+
+    channels = iter(channels)
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    mapper = executor.map if executor else map
+    processed = 0
+
+    try:
+        while True:
+            wave = list(itertools.islice(channels, PIPELINE_WAVE_SIZE))
+            if not wave:
+                break
+
+            keys = dedup_keys(wave) if rows_left else [None] * len(wave)
+            pending = [channel for channel, key in zip(wave, keys)
+                       if channel['channel_id'] not in journaled and key not in shared]
+            new_results = iter(process_wave(pending, mapper, processed + 1, total))
+            processed += len(pending)
+
+            for channel, key in zip(wave, keys):
+                if channel['channel_id'] in journaled:
+                    result = with_csv_fields(journaled[channel['channel_id']], channel)
+                elif key in shared:
+                    result = with_csv_fields(shared[key], channel)
+                else:
+                    result = next(new_results)
+                    if key in rows_left and key.startswith('@'):
+                        resolved = channel_keys([channel['channel_id']])[0]  # Indexed by this fetch
+                        if resolved != key:
+                            merge_handle(key, resolved)
+                            key = resolved
+
+                if key in rows_left:
+                    if _should_journal(result):
+                        shared.setdefault(key, result_row(result))
+                    rows_left[key] -= 1
+                    if not rows_left[key]:
+                        del rows_left[key]
+                        shared.pop(key, None)
+
+                yield channel, result
+    finally:
+        if executor:
+            executor.shutdown()
+
+# ------------------------------------------------
+# 🧮 QUOTA PLANNER (no API calls)
+# ------------------------------------------------
+def estimate_channel_plans(channels):
+    """
+    Predict each channel's quota cost and chance to qualify from local data
+    only (the response cache and the channel state store) - no API calls.
+
+    Costs are fractional units per channel, following how requests are packed:
+    - lookup: 0 if the channels.list response is cached and fresh,
+      1/IDS_PER_REQUEST for UC... IDs and indexed @handles (batched),
+      1 for other @handles
+    - playlist: 0 if the first uploads page is cached and fresh, otherwise
+      one unit per page (a single page for channels known from a previous run)
+    - videos: new uploads, never-stored videos and the bounded stale-stats
+      refresh, packed IDS_PER_REQUEST per videos.list call (with
+      PLAYLIST_PREFILTER, known uploads outside the window are left out, and
+      channels that cannot reach MIN_VIDEOS_IN_TIMEFRAME cost nothing)
+
+    New uploads of a known channel are estimated from its last qualifying
+    count and the time since it was analyzed. The qualify chance of a known
+    channel blends its last outcome with the qualify rate of all known
+    channels (PLAN_HISTORY_WEIGHT); new channels get that rate, or
+    PLAN_PRIOR_QUALIFY_RATE when nothing is known yet. Later rows listing
+    an already planned channel reuse its result: they cost nothing and add
+    no expected qualified channels ("duplicate").
+
+    Returns one plan dict per channel, in input order.
+    """
+    cache = get_response_cache()
+    state = get_channel_state()
+    now = time.time()
+    stale_before = now - VIDEO_STATS_MAX_AGE
+    first_page = min(50, VIDEOS_PER_CHANNEL)
+
+    handle_index = get_handle_index()
+    handles = [c['channel_id'] for c in channels if c['channel_id'].startswith('@')]
+    indexed = handle_index.get_many(handles) if handle_index and handles else {}
+
+    # Cached channels.list responses (handles cache the whole response, IDs the item;
+    # indexed handles are looked up by ID)
+    lookup_keys = {c['channel_id']: indexed.get(c['channel_id'], c['channel_id']) for c in channels}
+    cached = cache.get_many("channels", list(set(lookup_keys.values())), touch=False) if cache else {}
+    items = {}
+    for cid, key in lookup_keys.items():
+        if key in cached:
+            body, etag, fresh = cached[key]
+            items[cid] = ((body.get("items") or [None])[0] if key.startswith('@') else body, fresh)
+
+    def resolved_id(cid):
+        item = items.get(cid, (None, False))[0]
+        if item:
+            return item["id"]
+        return indexed.get(cid) if cid.startswith('@') else cid
+
+    resolved = {c['channel_id']: resolved_id(c['channel_id']) for c in channels}
+    previous = state.get_channels([rid for rid in resolved.values() if rid]) if state else {}
+    fetch_times = state.get_video_fetch_times(
+        [vid for prev in previous.values() for vid in prev["video_ids"]]) if state else {}
+
+    playlists = {cid: item["contentDetails"]["relatedPlaylists"]["uploads"]
+                 for cid, (item, fresh) in items.items()
+                 if item and item.get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads")}
+    fresh_pages = {key for key, (body, etag, fresh) in
+                   (cache.get_many("playlistItems", [f"{pl}::{first_page}" for pl in playlists.values()], touch=False)
+                    if cache else {}).items() if fresh}
+
+    outcomes = [(prev.get("qualifying_count") or 0) >= MIN_VIDEOS_IN_TIMEFRAME for prev in previous.values()]
+    base_rate = sum(outcomes) / len(outcomes) if outcomes else PLAN_PRIOR_QUALIFY_RATE
+
+    plans = []
+    planned = set()
+    for channel in channels:
+        cid = channel['channel_id']
+        item, fresh = items.get(cid, (None, False))
+        prev = previous.get(resolved[cid])
+
+        key = resolved[cid] or cid.lower()
+        if key in planned:
+            plans.append({"channel": channel, "lookup": 0, "playlist": 0, "videos": 0,
+                          "cost": 0, "qualify": 0.0, "known": prev is not None, "duplicate": True})
+            continue
+        planned.add(key)
+
+        if fresh:
+            lookup = 0
+        else:
+            lookup = 1 if cid.startswith('@') and cid not in indexed else 1 / IDS_PER_REQUEST
+
+        if fresh and not item:
+            # Cached as not found: nothing else will be requested
+            plans.append({"channel": channel, "lookup": 0, "playlist": 0, "videos": 0,
+                          "cost": 0, "qualify": 0.0, "known": False})
+            continue
+
+        if f"{playlists.get(cid)}::{first_page}" in fresh_pages:
+            playlist = 0
+        elif prev:
+            playlist = 1
+        else:
+            playlist = math.ceil(VIDEOS_PER_CHANNEL / 50)
+
+        if prev:
+            days = max(now - prev["analyzed_at"], 0) / 86400
+            uploads_per_day = (prev.get("qualifying_count") or 0) / DAYS_LOOKBACK
+            new_uploads = min(VIDEOS_PER_CHANNEL, math.ceil(uploads_per_day * days))
+            known_ids = prev["video_ids"][:VIDEOS_PER_CHANNEL - new_uploads]
+            if PLAYLIST_PREFILTER:
+                # Known uploads that have left the window are never fetched again
+                known_ids, _ = split_recent_uploads(known_ids, prev.get("upload_times") or [None] * len(known_ids))
+            unstored = sum(1 for vid in known_ids if vid not in fetch_times)
+            stale = sum(1 for vid in known_ids if vid in fetch_times and fetch_times[vid] < stale_before)
+            videos = new_uploads + unstored + min(stale, VIDEO_STATS_REFRESH_PER_CHANNEL)
+            if PLAYLIST_PREFILTER and new_uploads + len(known_ids) < MIN_VIDEOS_IN_TIMEFRAME:
+                videos = 0
+            outcome = (prev.get("qualifying_count") or 0) >= MIN_VIDEOS_IN_TIMEFRAME
+            qualify = PLAN_HISTORY_WEIGHT * outcome + (1 - PLAN_HISTORY_WEIGHT) * base_rate
+        else:
+            videos = VIDEOS_PER_CHANNEL
+            qualify = base_rate
+
+        plans.append({
+            "channel": channel,
+            "lookup": lookup,
+            "playlist": playlist,
+            "videos": videos / IDS_PER_REQUEST,
+            "cost": lookup + playlist + videos / IDS_PER_REQUEST,
+            "qualify": qualify,
+            "known": prev is not None,
+        })
+
+    return plans
+
+def plan_work_queue(plans, key_budgets=None):
+    """
+    Order channel plans by expected qualified channels per quota unit (best
+    first) and spend the keys' quota in that order.
+
+    key_budgets are the units left per API key (default: what the quota
+    ledger has left today). The KeyPool spreads requests over the keys, so
+    their quota is spent as one budget; each plan's "key" says which key's
+    share of that budget pays for it (None once the quota runs out).
+    Duplicate rows go last, after the row whose result they reuse.
+    Returns the ordered plans.
+    """
+    if key_budgets is None:
+        key_budgets = get_key_pool().remaining()
+    key_limits = list(itertools.accumulate(key_budgets))
+
+    def priority(plan):
+        if plan.get("duplicate"):
+            return math.inf
+        return -(plan["qualify"] / plan["cost"]) if plan["cost"] else -math.inf
+
+    # sorted() is stable: equally good channels keep their input order
+    ordered = sorted(plans, key=priority)
+
+    spent = 0
+    key_index = 0
+    for plan in ordered:
+        spent += plan["cost"]
+        while key_index < len(key_limits) and spent > key_limits[key_index]:
+            key_index += 1
+        plan["key"] = key_index if key_index < len(key_limits) else None
+
+    return ordered
+
+def print_quota_plan(plans, key_budgets=None):
+    """Print the projected cost and completions of a plan_work_queue() result"""
+    if key_budgets is None:
+        key_budgets = get_key_pool().remaining()
+    fitting = [p for p in plans if p["key"] is not None]
+    overflow = [p for p in plans if p["key"] is None]
+    total_cost = sum(p["cost"] for p in plans)
+    known = sum(1 for p in plans if p["known"])
+    duplicates = sum(1 for p in plans if p.get("duplicate"))
+
+    print("\n" + "="*70)
+    print("🧮 QUOTA PLAN (dry run - no API calls)")
+    print("="*70)
+    print(f"Channels planned: {len(plans):,} ({known:,} known from previous runs, {len(plans) - known:,} new)")
+    if duplicates:
+        print(f"Duplicate rows: {duplicates:,} (reuse another row's result, no quota)")
+    print(f"Estimated cost: {sum(p['lookup'] for p in plans):,.1f} lookup + {sum(p['playlist'] for p in plans):,.0f} playlist "
+          f"+ {sum(p['videos'] for p in plans):,.1f} video units = {total_cost:,.1f} units "
+          f"(~{total_cost / len(plans) if plans else 0:.2f} per channel)")
+    print(f"Quota available: {sum(key_budgets):,} units across {len(key_budgets)} key(s)")
+
+    for key_index, budget in enumerate(key_budgets):
+        on_key = [p for p in fitting if p["key"] == key_index]
+        print(f"   Key #{key_index + 1}: {len(on_key):,} channels | ~{sum(p['cost'] for p in on_key):,.1f}/{budget:,} units "
+              f"| ~{sum(p['qualify'] for p in on_key):,.1f} expected qualified")
+
+    print(f"🎯 Projected: {len(fitting):,}/{len(plans):,} channels completed, "
+          f"~{sum(p['qualify'] for p in fitting):,.1f} expected qualified")
+    if overflow:
+        left = sum(p["cost"] for p in overflow)
+        print(f"⏭️  {len(overflow):,} channels don't fit: ~{left:,.1f} more units "
+              f"(~{math.ceil(left / QUOTA_LIMIT)} more key-day(s))")
+
+    if plans:
+        print("\nFirst in the work queue:")
+        for plan in plans[:10]:
+            print(f"   {plan['channel']['channel_name'][:40]:40} | ~{plan['cost']:.2f} units | "
+                  f"{plan['qualify']:.0%} qualify chance{' (known)' if plan['known'] else ''}")
+    print("="*70)
+
+def dry_run():
+    """Plan a run over the input CSV from cached history only and print the projection"""
+    print(f"🧮 Planning run for {input_name()} - no API calls are made")
+    channels = list(load_channels())
+    if REFRESH_PRIORITY:
+        channels = list(prioritize_refreshes(channels))
+    if not channels:
+        print("\n❌ No channels found matching criteria")
+        return []
+
+    plans = plan_work_queue(estimate_channel_plans(channels))
+    print_quota_plan(plans)
+    return plans
+
+# ------------------------------------------------
+# 🔄 REFRESH PRIORITY (which channels are due)
+# ------------------------------------------------
+def refresh_interval(score, volatility):
+    """
+    How often a channel should be refreshed: REFRESH_MIN_INTERVAL for top
+    scorers (REFRESH_TOP_SCORE) or fully volatile channels, growing
+    geometrically to REFRESH_MAX_INTERVAL for dormant non-qualifiers.
+    """
+    importance = min(1.0, max(score / REFRESH_TOP_SCORE, volatility, 0.0))
+    return REFRESH_MAX_INTERVAL * (REFRESH_MIN_INTERVAL / REFRESH_MAX_INTERVAL) ** importance
+
+def refresh_priorities(channels, now=None):
+    """
+    Each channel's refresh priority: the time since it was last analyzed
+    divided by its refresh_interval(); >= 1 means it is due. Never
+    analyzed channels get REFRESH_NEW_PRIORITY.
+
+    The interval comes from local history only (no API calls):
+    - score: the channel's last Merch_Score (0 when it did not qualify);
+      channels analyzed before scores were stored count as top scorers if
+      they qualified, so their score is learned on the next run
+    - volatility: its Merch_Score change between the last two analyses
+      (per REFRESH_SCORE_CHANGE_SCALE) or its subscriber / view growth per
+      day from the snapshot index (per REFRESH_GROWTH_SCALE), whichever
+      is larger
+
+    Returns a list of (priority, interval in seconds or None) in input order.
+    """
+    now = now or time.time()
+    state = get_channel_state()
+    keys = channel_keys([channel['channel_id'] for channel in channels])
+    previous = state.get_channels(set(keys)) if state else {}
+    growth = load_channel_growth(previous)
+
+    priorities = []
+    for key in keys:
+        prev = previous.get(key)
+        if prev is None:
+            priorities.append((REFRESH_NEW_PRIORITY, None))
+            continue
+
+        score = prev.get("merch_score")
+        if score is None:
+            score = REFRESH_TOP_SCORE if (prev.get("qualifying_count") or 0) >= MIN_VIDEOS_IN_TIMEFRAME else 0.0
+
+        volatility = 0.0
+        if prev.get("merch_score") is not None and prev.get("previous_score") is not None:
+            volatility = abs(prev["merch_score"] - prev["previous_score"]) / REFRESH_SCORE_CHANGE_SCALE
+        if key in growth:
+            subs, views, subs_per_day, views_per_day = growth[key]
+            for total, per_day in ((subs, subs_per_day), (views, views_per_day)):
+                if total and per_day is not None:
+                    volatility = max(volatility, abs(per_day) / total / REFRESH_GROWTH_SCALE)
+
+        interval = refresh_interval(score, volatility)
+        priorities.append((max(now - prev["analyzed_at"], 0) / interval, interval))
+
+    return priorities
+
+def prioritize_refreshes(channels):
+    """
+    Keep the channels that are due for a refresh (refresh_priorities()),
+    most overdue first; equally due channels keep their input order.
+
+    Without a channel state store every channel is due and the input
+    streams through untouched. With one, the most overdue channel is only
+    known once the whole input has been seen: channels are scored
+    INPUT_CHUNK_SIZE at a time and only the due ones are kept, sorted per
+    chunk and merged through temporary files (external_sort()) - memory
+    stays at one chunk, at the cost of a temporary copy of the due
+    channels before the first one is analyzed.
+    """
+    if get_channel_state() is None:
+        print("  ⚠️ Refresh priority needs the channel state store - every channel is due")
+        return channels
+    return external_sort(_due_channel_runs(iter(channels)), prefix="youtube_refresh_")
+
+def _due_channel_runs(channels):
+    """
+    prioritize_refreshes(): the due channels of each input chunk as
+    (-priority, input position, channel) runs; reports the decisions once
+    the input is exhausted
+    """
+    now = time.time()
+    total = new = due = deferred = 0
+    next_due = None
+    for chunk in iter(lambda: list(itertools.islice(channels, INPUT_CHUNK_SIZE)), []):
+        run = []
+        for channel, (priority, interval) in zip(chunk, refresh_priorities(chunk, now)):
+            if priority >= 1:
+                run.append((-priority, total, channel))
+                due += 1
+                new += interval is None
+            else:
+                deferred += 1
+                wait = interval * (1 - priority)
+                next_due = wait if next_due is None else min(next_due, wait)
+            total += 1
+        yield run
+
+    METRICS.increment("refresh_decisions_total", (("decision", "new"),), new)
+    METRICS.increment("refresh_decisions_total", (("decision", "due"),), due - new)
+    METRICS.increment("refresh_decisions_total", (("decision", "deferred"),), deferred)
+    print(f"  🔄 Refresh priority: {due:,}/{total:,} channels due ({new:,} new, {due - new:,} known)"
+          + (f" | {deferred:,} not due yet (next in {next_due / 3600:.1f}h)" if deferred else ""))
+
+def record_scores(candidates, df_qualified):
+    """
+    Store the Merch_Score of a run's scoring candidates in the channel
+    state store, for refresh_priorities() (0 for candidates that
+    score_channels() left out)
+    """
+    state = get_channel_state()
+    if state is None or candidates.empty:
+        return
+    scores = dict.fromkeys(channel_keys(candidates["Channel_ID"].astype(str).tolist()), 0.0)
+    if not df_qualified.empty:
+        scores.update(zip(channel_keys(df_qualified["Channel_ID"].astype(str).tolist()),
+                          df_qualified["Merch_Score"].astype(float)))
+    state.save_scores(scores)
+
+# ------------------------------------------------
+# 🧩 SHARDING (several processes or nodes, one merge)
+# ------------------------------------------------
+def parse_shard(spec):
+    """'i/N' (1-based shard i of N) -> (i - 1, N)"""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec or "")
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"Invalid shard '{spec}' - use i/N with 1 <= i <= N, e.g. 2/4")
+    return int(match.group(1)) - 1, int(match.group(2))
+
+def shard_of(channel_id, count):
+    """
+    Shard (0-based) of a CSV channel_id: a stable hash of the ID (handles
+    lowercased), so every process and node agrees without coordination and
+    rows listing the same ID - under several search terms - share a shard.
+    """
+    key = channel_id.lower() if channel_id.startswith('@') else channel_id
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big") % count
+
+def in_shard(channel_id):
+    return SHARD is None or shard_of(channel_id, SHARD[1]) == SHARD[0]
+
+def shard_name():
+    return f"shard{SHARD[0] + 1}of{SHARD[1]}"
+
+def _shard_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard_name()}{ext}"
+
+def configure_shard(spec):
+    """
+    Make this process shard i of N: it only processes the channels that
+    hash to it, spends only its own slice of API_KEYS (every Nth key, so
+    shards never share a key's quota) and keeps its own checkpoint journal
+    and metrics files. The other stores can be shared between shards: the
+    quota ledger merges spending under a file lock (KeyPool._sync()), and
+    the response cache, channel state and handle index are SQLite files
+    in WAL mode - the cache keeps its size in the database, so LRU
+    eviction sees every shard's writes.
+    """
+    global SHARD, API_KEYS, CHECKPOINT_FILE, METRICS_JSON_FILE, METRICS_PROMETHEUS_FILE
+    index, count = parse_shard(spec)
+    keys = API_KEYS[index::count]
+    if not keys:
+        raise ValueError(f"Shard {index + 1}/{count} has no API key: {len(API_KEYS)} key(s) for {count} shards")
+
+    SHARD = (index, count)
+    API_KEYS = keys
+    CHECKPOINT_FILE = _shard_path(CHECKPOINT_FILE)
+    METRICS_JSON_FILE = _shard_path(METRICS_JSON_FILE) if METRICS_JSON_FILE else None
+    METRICS_PROMETHEUS_FILE = _shard_path(METRICS_PROMETHEUS_FILE) if METRICS_PROMETHEUS_FILE else None
+
+def result_sort_key(row):
+    """Canonical row order of merged results: biggest channels (CSV subscribers) first, then ID, search term, query"""
+    def text(value):
+        return "" if value is None or pd.isna(value) else str(value)
+
+    subs = row.get("CSV_Subs")
+    return (0 if subs is None or pd.isna(subs) else -int(subs), text(row.get("Channel_ID")),
+            text(row.get("Search_Term")), text(row.get("Query_Name")))
+
+def iter_result_rows(path):
+    """Yield the rows of a results file (CSV or Parquet) as dicts, one batch in memory at a time"""
+    for batch in read_result_batches(path):
+        yield from batch.to_dict("records")
+
+def _sink_for(path):
+    """A result sink writing to path, in the format its extension names"""
+    for sink_class in RESULT_SINKS.values():
+        if path.endswith(f".{sink_class.extension}"):
+            return sink_class(path)
+    raise ValueError(f"Unknown results file type: {path}")
+
+def _result_runs(path):
+    """sort_result_file(): each batch of a results file as (result_sort_key(), file position, row) runs"""
+    position = 0
+    for batch in read_result_batches(path):
+        run = []
+        for row in batch.to_dict("records"):
+            run.append((result_sort_key(row), position, row))
+            position += 1
+        yield run
+
+def sort_result_file(path):
+    """Rewrite a shard's results file in canonical order, one batch in memory at a time (external_sort())"""
+    root, ext = os.path.splitext(path)
+    sink = _sink_for(f"{root}.sorting{ext}")
+    try:
+        for row in external_sort(_result_runs(path), prefix="youtube_results_"):
+            sink.write(row)
+    finally:
+        sink.close()
+    os.replace(sink.path, path)
+
+def merge_shards(paths, profile_name=None, timestamp=None):
+    """
+    Combine shard ALL_CHANNELS files into the canonical ALL_CHANNELS and
+    QUALIFIED_CHANNELS files.
+
+    Shard files are already in canonical order (sort_result_file()), so
+    they are k-way merged a batch at a time; channels are then scored
+    across all shards at once. The same channels give the same files
+    whatever the shard count. In database mode, the merged scores are
+    also upserted. Returns (ALL_CHANNELS path, QUALIFIED_CHANNELS path or None).
+    """
+    profile = load_scoring_profile(profile_name)
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    paths = sorted(paths)
+
+    found = [re.search(r"shard(\d+)of(\d+)", os.path.basename(path)) for path in paths]
+    counts = {int(match.group(2)) for match in found if match}
+    if len(counts) == 1:
+        count = counts.pop()
+        missing = sorted(set(range(1, count + 1)) - {int(match.group(1)) for match in found if match})
+        if missing:
+            print(f"  ⚠️ Missing shard(s) {', '.join(map(str, missing))} of {count} - merging the rest")
+    elif counts:
+        print(f"  ⚠️ Shard files from runs with different shard counts: {sorted(counts)}")
+
+    print(f"🧩 Merging {len(paths)} shard file(s)")
+    all_sink = open_result_sink("ALL_CHANNELS", timestamp)
+    try:
+        for row in heapq.merge(*(iter_result_rows(path) for path in paths), key=result_sort_key):
+            all_sink.write(row)
+    finally:
+        all_sink.close()
+
+    if not all_sink.count:
+        print("\n❌ No results in the shard files")
+        return None, None
+
+    total, candidates = load_scoring_candidates(all_sink.path)
+    df_qualified = score_channels(candidates, profile)
+    record_scores(candidates, df_qualified)
+    print(f"💾 ALL CHANNELS: {all_sink.path} ({total:,} channels)")
+
+    filename_qualified = None
+    if not df_qualified.empty:
+        filename_qualified = save_results(df_qualified, "QUALIFIED_CHANNELS", timestamp)
+        print(f"💾 QUALIFIED ONLY: {filename_qualified} ({len(df_qualified):,} channels, profile {profile['name']})")
+    else:
+        print(f"⚠️  QUALIFIED ONLY not created - no qualifying channels")
+
+    if INPUT_SOURCE == "db":
+        db_sink = DatabaseResultSink()
+        try:
+            db_sink.write_scores(df_qualified)
+            print(f"🗄️  Scores upserted into: {db_sink.path}")
+        finally:
+            db_sink.close()
+
+    return all_sink.path, filename_qualified
+
+def run_shards(count, shard_args, profile_name=None):
+    """
+    Run `count` shard processes of this script side by side (each with
+    --shard i/count and its own slice of the API keys), then merge their
+    outputs. Each shard's output goes to youtube_shard{i}of{N}_{run}.log.
+    shard_args are passed to every shard.
+    """
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    env = {**os.environ, "PYTHONIOENCODING": "utf-8", "PYTHONUNBUFFERED": "1"}
+    env.pop("YOUTUBE_SHARD", None)
+
+    print(f"🧩 Running {count} shard processes (run {run_id})")
+    shards = []
+    for index in range(count):
+        log_path = f"youtube_shard{index + 1}of{count}_{run_id}.log"
+        log = open(log_path, "w", encoding="utf-8")
+        command = [sys.executable, os.path.abspath(__file__), "--shard", f"{index + 1}/{count}",
+                   "--run-id", run_id, *shard_args]
+        shards.append((subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, env=env), log, log_path))
+
+    for index, (process, log, log_path) in enumerate(shards):
+        code = process.wait()
+        log.close()
+        print(f"   Shard {index + 1}/{count}: {'✓ done' if code == 0 else f'❌ exit code {code}'} ({log_path})")
+
+    paths = [path for index in range(count)
+             for path in (f"youtube_ALL_CHANNELS_shard{index + 1}of{count}_{run_id}.{sink.extension}"
+                          for sink in RESULT_SINKS.values())
+             if os.path.exists(path)]
+    return merge_shards(paths, profile_name, run_id)
+
+# ------------------------------------------------
+# 8️⃣ Main execution
+# ------------------------------------------------
+def main(workers=None, resume=False, profile_name=None, plan=False, run_id=None, channels=None):
+    """Run the scraper for all channels in CSV
+
+    With resume=True, channels already in CHECKPOINT_FILE are not fetched
+    again; their journaled results are merged with the new work.
+    profile_name selects the scoring profile (default: SCORING_PROFILE).
+    With plan=True the input is loaded up front and processed in the quota
+    planner's order (most expected qualified channels per unit first).
+    run_id names the output files (default: the start time). A sharded run
+    (configure_shard()) only writes its canonically ordered ALL_CHANNELS
+    file; scoring happens when the shards are merged (merge_shards()).
+    channels is an already loaded list of input channels (the service's
+    in-memory index) to process instead of streaming load_channels().
+    Returns the run's counts ({kind: channels}, plus the output paths),
+    or None when nothing was processed.
+    """
+    global QUOTA_USED, KEYS_EXHAUSTED
+    if not API_KEYS:
+        print("❌ No API keys configured - add them to API_KEYS or set YOUTUBE_API_KEYS")
+        return
+
     QUOTA_USED = 0
+    KEYS_EXHAUSTED = False  # The ledger knows which keys are still spent (a service runs across quota days)
+    CACHE_STATS.update(dict.fromkeys(CACHE_STATS, 0))
+    RETRY_STATS.update(dict.fromkeys(RETRY_STATS, 0))
+    METRICS.reset()
+    workers = workers or MAX_WORKERS
+    profile = load_scoring_profile(profile_name)
 
     print("\n" + "="*70)
     print("🚀 YOUTUBE MERCHANDISE PARTNERSHIP SCRAPER (DUAL CSV OUTPUT)")
     print("="*70)
-    print(f"Input CSV: {CSV_INPUT_FILE}")
-    print(f"API Keys Available: {len(API_KEYS)}")
-    print(f"Currently Using: Key #{CURRENT_KEY_INDEX + 1} ({API_KEY[:20]}...{API_KEY[-4:]})")
+    print(f"Input: {input_name()}")
+    pool = get_key_pool()
+    print(f"API Keys Available: {len(API_KEYS)} (spread across concurrently)")
+    print(f"Quota Ledger: {QUOTA_LEDGER_FILE} (quota day {pool.day}, resets at midnight Pacific)")
+    print_key_usage(pool)
     print(f"Minimum Subscribers Filter: {MIN_SUBS_FILTER:,}")
     print(f"Videos to Fetch per Channel: {VIDEOS_PER_CHANNEL}")
     print(f"Time Window: Last {DAYS_LOOKBACK} days")
     print(f"Duration Filter: ≥{MIN_VIDEO_DURATION//60} minutes ({MIN_VIDEO_DURATION}s)")
     print(f"Shorts Filter: <{MAX_SHORT_DURATION}s excluded")
     print(f"Min Videos for Qualification: {MIN_VIDEOS_IN_TIMEFRAME} qualifying videos")
+    print(f"Playlist Prefilter: {'on (videos.list only for uploads in the window)' if PLAYLIST_PREFILTER else 'off'}")
+    print(f"Scoring Profile: {profile['name']}")
     print(f"Daily Quota Limit per Key: {QUOTA_LIMIT:,} units")
-    print(f"Total Available Quota: {QUOTA_LIMIT * len(API_KEYS):,} units")
+    print(f"Quota Left Today: {sum(pool.remaining()):,} units (keeping {QUOTA_SAFETY_MARGIN} spare per key)")
+    print(f"Workers: {workers} | Rate Limit: {REQUESTS_PER_SECOND_PER_KEY or 'unlimited'} req/s per key")
+    if SHARD:
+        print(f"Shard: {SHARD[0] + 1}/{SHARD[1]} (channels hashed by ID, {len(API_KEYS)} key(s) of this shard)")
+    print(f"Response Cache: {CACHE_DB_FILE if CACHE_ENABLED else 'disabled'}")
+    print(f"Checkpoint: {CHECKPOINT_FILE}{' (resuming)' if resume else ''}")
+    print(f"Incremental Fetch: {CHANNEL_STATE_FILE if INCREMENTAL_FETCH else 'disabled'}")
+    print(f"Handle Index: {HANDLE_INDEX_FILE or 'disabled'}")
+    print(f"Snapshots: {SNAPSHOT_DIR or 'disabled'}")
+    if REFRESH_PRIORITY:
+        print(f"Refresh Priority: due channels only, every {REFRESH_MIN_INTERVAL / 3600:g}h (top scorers, fast movers) "
+              f"to {REFRESH_MAX_INTERVAL / 86400:g}d (dormant low scorers)")
+    print(f"Output Format: {OUTPUT_FORMAT} (written every {OUTPUT_BATCH_ROWS:,} rows)")
+    if INPUT_SOURCE == "db":
+        print(f"Results Table: {DB_RESULTS_TABLE} (upserted; channels re-analyzed after {db_reanalyze_after() / 3600:g}h)")
     if MAX_CHANNELS_TO_PROCESS:
         print(f"⚠️ TESTING MODE: Limited to {MAX_CHANNELS_TO_PROCESS} channels")
     print("="*70)
 
-    # STEP 1: Load channels from CSV
-    channels = get_channels_from_csv()
-
-    if not channels:
-        print("\n❌ No channels found in CSV matching criteria")
-        return
+    # STEP 1: Stream channels from CSV (or the database)
+    preloaded = channels
+    if channels is None:
+        channels = load_channels()
+    if REFRESH_PRIORITY:
+        channels = prioritize_refreshes(channels)
+    if plan:
+        channels = [p["channel"] for p in plan_work_queue(estimate_channel_plans(list(channels)))]
+        print(f"  🧮 Work queue ordered by expected qualified channels per quota unit")
+    journaled = load_checkpoint(CHECKPOINT_FILE) if resume else {}
+    duplicates = count_duplicate_channels(preloaded)
+    repeated = [rows for rows in duplicates.values() if rows > 1]
+    if repeated:
+        print(f"  🔁 {len(repeated):,} channels listed more than once ({sum(repeated) - len(repeated):,} extra rows) "
+              f"- each is fetched once and shared by its rows")
 
     print(f"\n{'='*70}")
-    print(f"📊 ANALYZING {len(channels)} CHANNELS")
+    print(f"📊 ANALYZING CHANNELS")
     print(f"{'='*70}\n")
 
-    # STEP 2: Process each channel (collect ALL data)
-    all_results = []
-
-    for idx, channel in enumerate(channels, 1):
-        channel_name = channel['channel_name']
-        channel_id = channel['channel_id']
-        csv_subs = channel['subscribers']
-
-        print(f"[{idx}/{len(channels)}] {channel_name} (ID: {channel_id[:20]}..., {csv_subs:,} subs)")
-
-        try:
-            result = process_channel(channel)
+    # STEP 2: Process each channel (collect ALL data), journaling and streaming rows to disk as we go
+    timestamp = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+    all_sink = open_result_sink(f"ALL_CHANNELS_{shard_name()}" if SHARD else "ALL_CHANNELS", timestamp)
+    db_sink = DatabaseResultSink() if INPUT_SOURCE == "db" else None
+    open_snapshot_store(f"{timestamp}_{shard_name()}" if SHARD else timestamp)
+    seen = processed = 0
+    checkpoint = CheckpointJournal(CHECKPOINT_FILE, resume)
 
+    try:
+        for channel, result in process_channels(channels, workers, MAX_CHANNELS_TO_PROCESS, journaled, duplicates):
+            seen += 1
+            if channel['channel_id'] not in journaled:
+                processed += 1
+                if _should_journal(result):
+                    checkpoint.record(channel['channel_id'], result_row(result))
+
+            # The row is written (and the per-channel payloads released) right away
             if result:
-                all_results.append(result)
-
-            # Rate limiting
-            time.sleep(0.3)
-
-        except Exception as e:
-            print(f"  ❌ Error: {e}")
-            continue
-
-    if not all_results:
-        print("\n❌ No channels successfully analyzed")
-        print(f"\n📊 Final Quota Usage: {QUOTA_USED:,}/{QUOTA_LIMIT:,} units ({(QUOTA_USED/QUOTA_LIMIT)*100:.1f}%)")
+                all_sink.write(result)
+                # Only final results go to the database: it decides what is analyzed again
+                if db_sink and _should_journal(result):
+                    db_sink.write(result)
+    finally:
+        checkpoint.close()
+        all_sink.close()
+        if db_sink:
+            db_sink.close()
+        close_snapshot_store()
+        pool.close()
+
+    if not seen:
+        print("\n❌ No channels found matching criteria")
         return
 
-    # STEP 3: Create DataFrame for ALL channels
-    df_all = pd.DataFrame(all_results)
-
-    # Remove internal data columns before saving
-    df_all_clean = df_all.drop(columns=['_video_data', '_channel_data'], errors='ignore')
-
-    # STEP 4: Filter for QUALIFYING channels and calculate scores
-    qualifying_results = []
-
-    for result in all_results:
-        # Check if channel qualifies and has valid data
-        if (result['Qualifying_Videos_60d'] >= MIN_VIDEOS_IN_TIMEFRAME and
-            '_video_data' in result and '_channel_data' in result and
-            result['_video_data'] is not None and result['_channel_data'] is not None):
-
-            try:
-                video_data = result['_video_data']
-                channel_data = result['_channel_data']
-
-                # Verify we have the required data for scoring
-                if (video_data.get("avg_views", 0) == 0 or
-                    not video_data.get("dates") or
-                    len(video_data.get("dates", [])) == 0):
-                    print(f"  ⚠️ Skipping {result['Channel_Name']}: insufficient video data for scoring")
-                    continue
+    if resume:
+        print(f"\n♻️ {seen - processed} channels restored from checkpoint, {processed} fetched")
 
-                # Calculate merchandise score
-                score_data = calculate_merchandise_score(channel_data, video_data)
-
-                # Add scoring data
-                qualifying_result = {
-                    "Channel_Name": result["Channel_Name"],
-                    "Channel_ID": result["Channel_ID"],
-                    "CSV_Subs": result["CSV_Subs"],
-                    "Actual_Subs": result["Actual_Subs"],
-                    "Qualifying_Videos_60d": result["Qualifying_Videos_60d"],
-                    "Avg_Views": result["Avg_Views_Qualified"],
-                    "Avg_Likes": result["Avg_Likes_Qualified"],
-                    "Avg_Comments": result["Avg_Comments_Qualified"],
-                    "Total_Views_Qualified": result["Total_Views_Qualified"],
-                    "Engagement_Rate": round(score_data['engagement_raw'] * 100, 3),
-                    "Comment_Rate": round(score_data['comment_rate_raw'] * 100, 3),
-                    "Consistent_Reach": round(score_data['consistent_reach_norm'], 2),
-                    "Upload_Per_Month": round(score_data['upload_consistency_raw'], 1),
-                    "View_Velocity": round(score_data['view_velocity_norm'], 2),
-                    "Like_Rate": round(score_data['like_rate_raw'] * 100, 3),
-                    "Merch_Score": round(score_data["score"], 4),
-                    "Search_Term": result["Search_Term"],
-                    "Query_Name": result["Query_Name"],
-                    "_score_sort": score_data["score"]
-                }
-                qualifying_results.append(qualifying_result)
+    if not all_sink.count:
+        print("\n❌ No channels successfully analyzed")
+        print(f"\n📊 Final Quota Usage: {QUOTA_USED:,} units this run")
+        print_key_usage(pool)
+        counts = {"seen": seen, "fetched": processed, "written": 0, "qualified": 0}
+        return {**counts, "metrics_files": write_run_metrics(counts)}
 
-            except Exception as e:
-                print(f"  ⚠️ Error scoring {result.get('Channel_Name', 'Unknown')}: {e}")
-                continue
+    if SHARD:
+        sort_result_file(all_sink.path)
+        print("\n" + "="*70)
+        print(f"🧩 SHARD {SHARD[0] + 1}/{SHARD[1]} COMPLETE")
+        print("="*70)
+        print(f"💾 {OUTPUT_FORMAT.upper()} (ALL CHANNELS, this shard) saved to: {all_sink.path}")
+        print(f"   Contains: {all_sink.count} channels - combine the shards with --merge to score them")
+        print(f"📊 Final Quota Usage: {QUOTA_USED:,} units this run")
+        print_key_usage(pool)
+        counts = {"seen": seen, "fetched": processed, "written": all_sink.count}
+        metrics_files = write_run_metrics(counts)
+        print("="*70)
+        return {**counts, "all_channels_file": all_sink.path, "metrics_files": metrics_files}
 
-    # Create DataFrame for QUALIFYING channels
-    if qualifying_results:
-        df_qualified = pd.DataFrame(qualifying_results)
-        df_qualified = df_qualified.sort_values("_score_sort", ascending=False)
-        df_qualified = df_qualified.drop("_score_sort", axis=1)
-    else:
-        df_qualified = pd.DataFrame()
+    # STEP 3: Filter for QUALIFYING channels and calculate scores from the streamed file
+    with timed_stage("scoring"):
+        total_analyzed, candidates = load_scoring_candidates(all_sink.path)
+        df_qualified = score_channels(candidates, profile)
+        record_scores(candidates, df_qualified)
 
-    # STEP 5: Display results
+    # STEP 4: Display results
     print("\n" + "="*70)
     print("📊 ANALYSIS COMPLETE")
     print("="*70)
-    print(f"Total channels analyzed: {len(all_results)}")
-    print(f"Channels with qualifying videos (≥{MIN_VIDEOS_IN_TIMEFRAME}): {len(qualifying_results)}")
-    print(f"Channels without enough qualifying videos: {len(all_results) - len(qualifying_results)}")
+    print(f"Total channels analyzed: {total_analyzed}")
+    print(f"Channels with qualifying videos (≥{MIN_VIDEOS_IN_TIMEFRAME}): {len(df_qualified)}")
+    print(f"Channels without enough qualifying videos: {total_analyzed - len(df_qualified)}")
 
     # Display top qualifying channels
     if not df_qualified.empty:
@@ -848,43 +4301,386 @@ def main():
         print(f"🟠 Moderate (0.30-0.49): {moderate:3d} channels")
         print(f"🔴 Poor (<0.30):         {poor:3d} channels")
 
-    # STEP 6: Export to TWO CSV files
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # STEP 5: Export the QUALIFIED file (ALL CHANNELS was streamed during the run)
+    label = OUTPUT_FORMAT.upper()
+    print("\n" + "="*70)
+    print(f"💾 {label} 1 (ALL CHANNELS) saved to: {all_sink.path}")
+    print(f"   Contains: {total_analyzed} channels with raw data")
 
+    filename_qualified = None
     try:
-        # CSV 1: ALL CHANNELS
-        filename_all = f"youtube_ALL_CHANNELS_{timestamp}.csv"
-        df_all_clean.to_csv(filename_all, index=False)
-        print("\n" + "="*70)
-        print(f"💾 CSV 1 (ALL CHANNELS) saved to: {filename_all}")
-        print(f"   Contains: {len(df_all_clean)} channels with raw data")
-
-        # CSV 2: QUALIFIED CHANNELS ONLY
         if not df_qualified.empty:
-            filename_qualified = f"youtube_QUALIFIED_CHANNELS_{timestamp}.csv"
-            df_qualified.to_csv(filename_qualified, index=False)
-            print(f"💾 CSV 2 (QUALIFIED ONLY) saved to: {filename_qualified}")
+            filename_qualified = save_results(df_qualified, "QUALIFIED_CHANNELS", timestamp)
+            print(f"💾 {label} 2 (QUALIFIED ONLY) saved to: {filename_qualified}")
             print(f"   Contains: {len(df_qualified)} channels with ≥{MIN_VIDEOS_IN_TIMEFRAME} videos + scores")
         else:
-            print(f"⚠️  CSV 2 (QUALIFIED ONLY) not created - no qualifying channels")
+            print(f"⚠️  {label} 2 (QUALIFIED ONLY) not created - no qualifying channels")
 
     except Exception as e:
-        print(f"\n⚠️ Error saving CSV: {e}")
+        print(f"\n⚠️ Error saving {label}: {e}")
+
+    if db_sink:
+        try:
+            db_sink.write_scores(df_qualified)
+            print(f"🗄️  Results upserted into: {db_sink.path} ({db_sink.count:,} rows, {len(df_qualified)} scored)")
+        except Exception as e:
+            print(f"\n⚠️ Error saving scores to the database: {e}")
+        finally:
+            db_sink.close()
 
     print(f"\n⏱️  Time window: Last {DAYS_LOOKBACK} days (videos ≥{MIN_VIDEO_DURATION//60}min only)")
-    print(f"📊 Final Quota Usage:")
-    print(f"   API Key #{CURRENT_KEY_INDEX + 1}: {QUOTA_USED:,}/{QUOTA_LIMIT:,} units ({(QUOTA_USED/QUOTA_LIMIT)*100:.1f}%)")
-    if CURRENT_KEY_INDEX > 0:
-        print(f"   🔄 Switched through {CURRENT_KEY_INDEX + 1} API key(s) during execution")
+    print(f"📊 Final Quota Usage: {QUOTA_USED:,} units this run")
+    print_key_usage(pool)
 
     # Calculate efficiency
-    avg_quota = QUOTA_USED / len(channels) if len(channels) > 0 else 0
+    avg_quota = QUOTA_USED / processed if processed > 0 else 0
     estimated_daily_capacity = QUOTA_LIMIT / avg_quota if avg_quota > 0 else 0
     total_capacity = (QUOTA_LIMIT * len(API_KEYS)) / avg_quota if avg_quota > 0 else 0
     print(f"⚡ Average quota per channel: {avg_quota:.1f} units")
     print(f"🚀 Estimated capacity per API key: ~{int(estimated_daily_capacity):,} channels")
     print(f"🎯 Total estimated capacity ({len(API_KEYS)} keys): ~{int(total_capacity):,} channels")
+    if avg_quota > 0:
+        print(f"⏳ Quota left today: ~{int(sum(pool.remaining()) / avg_quota):,} more channels")
+    if get_response_cache() is not None:
+        print(f"💾 Response cache: {CACHE_STATS['hits']:,} hits | {CACHE_STATS['misses']:,} misses | "
+              f"{CACHE_STATS['revalidated']:,} revalidated (304) | ~{CACHE_STATS['quota_saved']:,} quota units saved")
+    if any(RETRY_STATS.values()):
+        print(f"🔁 Retries: {RETRY_STATS['retried']:,} retried | {RETRY_STATS['requeued']:,} re-queued | "
+              f"{RETRY_STATS['abandoned']:,} abandoned | {RETRY_STATS['breaker_trips']:,} circuit breaker trip(s)")
+    print_transfer_summary(processed)
+    counts = {"seen": seen, "fetched": processed, "written": total_analyzed, "qualified": len(df_qualified)}
+    metrics_files = write_run_metrics(counts)
+    print(f"📈 Metrics written to: {', '.join(path for path in (METRICS_JSON_FILE, METRICS_PROMETHEUS_FILE) if path)}")
     print("="*70)
+    return {**counts, "all_channels_file": all_sink.path, "qualified_file": filename_qualified,
+            "metrics_files": metrics_files}
+
+# ------------------------------------------------
+# 🛰️ SERVICE MODE
+# ------------------------------------------------
+
+SERVICE_JOB_OPTIONS = {"channel_ids", "max_channels", "profile", "plan", "prioritize", "resume", "run_id", "workers"}
+
+class InputIndex:
+    """
+    The input channels, kept in memory between service jobs.
+
+    The CSV is streamed and filtered once, and again only when the file
+    (or the filters) change. Database input is queried for every job:
+    which channels are due depends on when they were last analyzed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.signature = None
+        self.channels = []
+
+    def load(self):
+        if INPUT_SOURCE == "db":
+            return list(load_channels())
+
+        try:
+            stat = os.stat(CSV_INPUT_FILE)
+            signature = (CSV_INPUT_FILE, stat.st_mtime_ns, stat.st_size, MIN_SUBS_FILTER, MAX_CHANNELS_TO_PROCESS, SHARD)
+        except OSError:
+            signature = None  # load_channels() reports the missing file
+
+        with self.lock:
+            if signature is None or signature != self.signature:
+                self.channels = list(load_channels())
+                self.signature = signature
+            else:
+                print(f"📂 Input index: {len(self.channels):,} channels from {CSV_INPUT_FILE} (unchanged, kept in memory)")
+            return self.channels
+
+class _EventStream:
+    """stdout replacement for a job: every printed line is also sent as a log event"""
+
+    def __init__(self, emit, echo):
+        self.emit = emit
+        self.echo = echo
+        self.lock = threading.Lock()
+        self.buffer = ""
+
+    def write(self, text):
+        self.echo.write(text)
+        with self.lock:  # Worker threads print too
+            self.buffer += text
+            *lines, self.buffer = self.buffer.split("\n")
+            for line in lines:
+                self.emit({"event": "log", "line": line})
+        return len(text)
+
+    def flush(self):
+        self.echo.flush()
+        with self.lock:
+            line, self.buffer = self.buffer, ""
+            if line:
+                self.emit({"event": "log", "line": line})
+
+class ScraperService:
+    """
+    A resident scraper: the API clients, key pool (quota ledger), response
+    cache, channel state, handle index and input channels stay loaded
+    between jobs, so a scheduled run only pays for its incremental work.
+    Jobs run one at a time.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or MAX_WORKERS
+        self.index = InputIndex()
+        self.lock = threading.Lock()  # Held while a job runs
+        self.started_at = time.time()
+        self.jobs = 0
+        self.current = None
+        self.last = None
+
+    def status(self):
+        status = {
+            "status": "running" if self.current else "idle",
+            "uptime_seconds": round(time.time() - self.started_at),
+            "jobs_run": self.jobs,
+            "input_channels": len(self.index.channels),
+            "current": self.current,
+            "last": self.last,
+        }
+        if API_KEYS:
+            status["quota_remaining"] = sum(get_key_pool().remaining())
+        return status
+
+    def select_channels(self, job):
+        """The input channels a job covers: all of them, or only job["channel_ids"] (a partial refresh)"""
+        channels = self.index.load()
+        wanted = job.get("channel_ids")
+        if wanted:
+            wanted = set(wanted)
+            channels = [channel for channel in channels if channel['channel_id'] in wanted]
+            missing = len(wanted - {channel['channel_id'] for channel in channels})
+            print(f"🎯 Partial refresh: {len(channels):,} channel rows"
+                  + (f" ({missing:,} requested ID(s) not in the input, skipped)" if missing else ""))
+        if job.get("max_channels"):
+            channels = heapq.nlargest(job["max_channels"], channels, key=lambda channel: channel['subscribers'])
+        return channels
+
+    def run_job(self, job, emit):
+        """Run one job (the caller holds self.lock); emit(event) receives its progress events"""
+        global REFRESH_PRIORITY
+        started = time.time()
+        self.current = {"job": job, "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        emit({"event": "started", **self.current})
+
+        stream = _EventStream(emit, sys.stdout)
+        summary = error = None
+        default_priority = REFRESH_PRIORITY
+        # Listed channels are refreshed whether or not they are due, unless the job asks otherwise
+        REFRESH_PRIORITY = bool(job.get("prioritize", default_priority and not job.get("channel_ids")))
+        try:
+            with redirect_stdout(stream):
+                summary = main(workers=job.get("workers") or self.workers, resume=bool(job.get("resume")),
+                               profile_name=job.get("profile"), plan=bool(job.get("plan")),
+                               run_id=job.get("run_id"), channels=self.select_channels(job))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            REFRESH_PRIORITY = default_priority
+            stream.flush()
+
+        seconds = round(time.time() - started, 1)
+        self.jobs += 1
+        self.last = {**self.current, "seconds": seconds, "summary": summary, "error": error}
+        self.current = None
+        emit({"event": "error", "error": error, "seconds": seconds} if error
+             else {"event": "done", "summary": summary, "seconds": seconds})
+
+    def close(self):
+        """Flush the quota ledger and close the warm stores"""
+        if KEY_POOL is not None:
+            KEY_POOL.close()
+        for store in (RESPONSE_CACHE, CHANNEL_STATE, HANDLE_INDEX):
+            if store is not None:
+                store.close()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /health: service status. POST /run: run over the input; POST
+    /refresh: run over {"channel_ids": [...]} only. Both take a JSON body
+    of SERVICE_JOB_OPTIONS and stream newline-delimited JSON events
+    (started, log, done / error) until the job ends.
+    """
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def send_json(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path in ("/", "/health"):
+            self.send_json(200, self.server.service.status())
+        else:
+            self.send_json(404, {"error": "Not Found"})
+
+    def do_POST(self):
+        if self.path not in ("/run", "/refresh"):
+            self.send_json(404, {"error": "Not Found"})
+            return
+
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            job = json.loads(body) if body.strip() else {}
+            if not isinstance(job, dict):
+                raise ValueError("the job must be a JSON object")
+        except ValueError as e:
+            self.send_json(400, {"error": f"Invalid job: {e}"})
+            return
+        unknown = set(job) - SERVICE_JOB_OPTIONS
+        if unknown:
+            self.send_json(400, {"error": f"Unknown job option(s): {', '.join(sorted(unknown))}"})
+            return
+        if self.path == "/refresh" and not job.get("channel_ids"):
+            self.send_json(400, {"error": "A refresh job needs channel_ids"})
+            return
+
+        service = self.server.service
+        if not service.lock.acquire(blocking=False):
+            self.send_json(409, {"error": "A job is already running", "current": service.current})
+            return
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            service.run_job(job, self.send_event)
+        finally:
+            service.lock.release()
+
+    def send_event(self, event):
+        """Write one progress event; a client that went away does not stop the job"""
+        if getattr(self, "disconnected", False):
+            return
+        try:
+            self.wfile.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        except OSError:
+            self.disconnected = True
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"🛰️ {self.address_string()} - {format % args}\n")
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(address=None, workers=None):
+    """
+    Run the scraper as a resident service on address (host:port, or
+    unix:/path for a Unix socket) until SIGTERM / Ctrl+C.
+    """
+    address = address or SERVICE_ADDRESS
+    if address.startswith("unix:"):
+        socket_path = address[len("unix:"):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left over from a service that did not shut down cleanly
+        server = _UnixHTTPServer(socket_path, ServiceRequestHandler)
+    else:
+        socket_path = None
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), ServiceRequestHandler)
+    server.service = ScraperService(workers)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🛰️ Scraper service listening on {address} (POST /run, POST /refresh, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ Stopping the scraper service")
+        if server.service.current:
+            print("   A job was still running - its checkpointed channels are kept (resume: true picks up the rest)")
+    finally:
+        server.server_close()
+        server.service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="YouTube merchandise partnership scraper")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"channels processed in parallel (default: {MAX_WORKERS})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"bypass the on-disk response cache ({CACHE_DB_FILE})")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help=f"ignore per-channel state from previous runs ({CHANNEL_STATE_FILE})")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"skip channels already journaled in {CHECKPOINT_FILE}")
+    parser.add_argument("--profile", default=None,
+                        help=f"scoring profile (default: {SCORING_PROFILE})")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="project quota cost and completions from cached history without calling the API")
+    parser.add_argument("--plan", action="store_true",
+                        help="process channels in the planner's order (most expected qualified per unit first)")
+    parser.add_argument("--prioritize", action="store_true",
+                        help="only refresh channels that are due (by last score, volatility and time since analysis)")
+    parser.add_argument("--format", choices=sorted(RESULT_SINKS), default=OUTPUT_FORMAT,
+                        help=f"output file format (default: {OUTPUT_FORMAT})")
+    parser.add_argument("--rescore", metavar="ALL_CHANNELS_FILE",
+                        help="re-score a saved ALL_CHANNELS CSV or Parquet file without calling the API")
+    parser.add_argument("--db", action="store_true",
+                        help=f"read channels from the {DB_CHANNELS_TABLE} table and upsert results into {DB_RESULTS_TABLE}")
+    parser.add_argument("--database-url", default=DATABASE_URL,
+                        help="postgresql://... or sqlite:///path (default: $DATABASE_URL)")
+    parser.add_argument("--shard", metavar="i/N", default=SHARD_SPEC,
+                        help="process only shard i of N, with every Nth API key (default: $YOUTUBE_SHARD)")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="run N shard processes side by side, then merge their outputs")
+    parser.add_argument("--merge", nargs="+", metavar="ALL_CHANNELS_SHARD_FILE",
+                        help="merge shard ALL_CHANNELS files into the ALL_CHANNELS and QUALIFIED_CHANNELS files")
+    parser.add_argument("--run-id", help="name output files with this instead of the start time")
+    parser.add_argument("--serve", nargs="?", const=SERVICE_ADDRESS, metavar="ADDRESS",
+                        help="stay resident and take run/refresh jobs over HTTP on host:port or unix:/path "
+                             f"(default: $YOUTUBE_SERVICE_ADDRESS or {SERVICE_ADDRESS})")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        CACHE_ENABLED = False
+    if args.no_incremental:
+        INCREMENTAL_FETCH = False
+    OUTPUT_FORMAT = args.format
+    if args.db:
+        INPUT_SOURCE = "db"
+    if args.prioritize:
+        REFRESH_PRIORITY = True
+    DATABASE_URL = args.database_url
+
+    if args.shard and not (args.shards or args.merge or args.rescore):
+        try:
+            configure_shard(args.shard)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+
+    if args.serve:
+        serve(args.serve, args.workers)
+    elif args.rescore:
+        rescore_file(args.rescore, args.profile)
+    elif args.merge:
+        merge_shards(args.merge, args.profile, args.run_id)
+    elif args.shards:
+        shard_args = ["--workers", str(args.workers), "--format", args.format]
+        shard_args += [flag for flag, on in (("--no-cache", args.no_cache), ("--no-incremental", args.no_incremental),
+                                             ("--resume", args.resume), ("--plan", args.plan), ("--db", args.db),
+                                             ("--prioritize", args.prioritize)) if on]
+        if args.profile:
+            shard_args += ["--profile", args.profile]
+        if args.database_url:
+            shard_args += ["--database-url", args.database_url]
+        run_shards(args.shards, shard_args, args.profile)
+    elif args.dry_run:
+        dry_run()
+    else:
+        main(workers=args.workers, resume=args.resume, profile_name=args.profile, plan=args.plan, run_id=args.run_id)
\ No newline at end of file
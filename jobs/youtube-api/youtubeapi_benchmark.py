@@ -0,0 +1,289 @@
+# ============================================================
+# ⏱️ Offline scraper benchmark (no real quota spent)
+# ============================================================
+#
+# Runs youtubeapi.py end to end against youtubeapi_fakeserver.py and
+# reports throughput, per-channel latency, peak memory and quota cost:
+#
+#   python youtubeapi_benchmark.py --channels 2000 --latency 0.05 --output bench.json
+#   python youtubeapi_benchmark.py --baseline bench.json   # exits 1 on a regression (for CI)
+#
+# FEATURES:
+# ✅ Fake API in a separate process, so peak RSS is the scraper's alone
+# ✅ Full main() run: channels/sec, quota units per channel, retries
+# ✅ Sequential process_channel() sample: p50 / p99 per-channel latency
+# ✅ Bytes held per analyzed channel by its result's scoring payload (_video_data)
+# ✅ Response KB per channel (decoded and on the wire) and JSON decode time
+# ✅ Configurable world size, latency, error rate and per-key quota (403s)
+# ✅ JSON report + regression check against a saved baseline
+#
+# ============================================================
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import urlopen
+
+from youtubeapi_fakeserver import FakeYouTubeWorld
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FAKE_SERVER = os.path.join(HERE, "youtubeapi_fakeserver.py")
+
+# -------------------- CONFIG --------------------
+DEFAULT_CHANNELS = 500            # Channels in the benchmark world (all listed in the input CSV)
+DEFAULT_MAX_VIDEOS = 120          # Max uploads per channel
+DEFAULT_LATENCY = 0.02            # Mean fake API latency in seconds
+DEFAULT_KEYS = 2                  # Fake API keys (requests are spread over the pool)
+DEFAULT_LATENCY_SAMPLE = 50       # Channels timed one at a time through process_channel()
+DEFAULT_TOLERANCE = 0.25          # Allowed relative change vs a baseline before it counts as a regression
+
+# Reported figures compared against a baseline: name -> True if higher is better
+TRACKED_METRICS = {
+    "channels_per_second": True,
+    "channel_latency_p50_ms": False,
+    "channel_latency_p99_ms": False,
+    "peak_rss_mb": False,
+    "payload_bytes_per_channel": False,
+    "response_kb_per_channel": False,
+    "wire_kb_per_channel": False,
+    "decode_ms_per_channel": False,
+    "quota_units_per_channel": False,
+}
+# ------------------------------------------------
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+@contextlib.contextmanager
+def fake_api_server(args):
+    """Run youtubeapi_fakeserver.py in a child process; yields its base URL"""
+    command = [sys.executable, FAKE_SERVER, "--port", "0",
+               "--channels", str(args.channels), "--max-videos", str(args.max_videos),
+               "--latency", str(args.latency), "--error-rate", str(args.error_rate), "--seed", str(args.seed)]
+    if args.quota_per_key is not None:
+        command += ["--quota-per-key", str(args.quota_per_key)]
+    if args.no_gzip:
+        command.append("--no-gzip")
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        line = server.stdout.readline()
+        match = re.search(r"(http://\S+/)", line)
+        if not match:
+            raise RuntimeError(f"Fake API server did not start: {line!r}")
+        yield match.group(1)
+    finally:
+        server.terminate()
+        server.wait()
+
+def deep_sizeof(obj, seen=None):
+    """Bytes held by obj and everything it references (dicts, sequences, __slots__ records)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    else:
+        for name in getattr(type(obj), "__slots__", ()):
+            size += deep_sizeof(getattr(obj, name, None), seen)
+    return size
+
+def server_stats(url):
+    with urlopen(url + "stats") as response:
+        return json.load(response)
+
+def load_scraper(url, keys):
+    """Import youtubeapi.py configured for the fake API (keys and endpoint come from the environment)"""
+    os.environ["YOUTUBE_API_ROOT_URL"] = url
+    os.environ["YOUTUBE_API_KEYS"] = ",".join(f"bench-key-{i + 1}" for i in range(keys))
+    sys.path.insert(0, HERE)
+    import youtubeapi
+    return youtubeapi
+
+def run_benchmark(args):
+    """Run the scraper against the fake API in a scratch directory; returns the report dict"""
+    workdir = tempfile.mkdtemp(prefix="youtube-bench-")
+    previous_dir = os.getcwd()
+    try:
+        os.chdir(workdir)  # Ledger, cache, journal, outputs and metrics all land in the scratch dir
+        world = FakeYouTubeWorld(args.channels, args.max_videos, args.seed)
+        input_csv = world.write_input_csv(os.path.join(workdir, "bench_channels.csv"))
+
+        with fake_api_server(args) as url:
+            yt = load_scraper(url, args.keys)
+            yt.CSV_INPUT_FILE = input_csv
+            yt.CACHE_ENABLED = args.cache
+            yt.INCREMENTAL_FETCH = False
+            yt.REQUESTS_PER_SECOND_PER_KEY = args.rate
+            yt.OUTPUT_FORMAT = args.format
+            yt.FIELD_MASKS = not args.no_field_masks
+
+            # Full run: throughput and quota
+            log = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(log):
+                yt.main(workers=args.workers)
+            elapsed = time.perf_counter() - started
+            quota_used = yt.QUOTA_USED
+            retries = dict(yt.RETRY_STATS)
+
+            with open(yt.METRICS_JSON_FILE, encoding="utf-8") as f:
+                metrics = json.load(f)
+            channels = {entry["labels"]["kind"]: entry["value"] for entry in metrics["metrics"].get("channels", [])}
+            stages = {stage: histogram["sum"] for stage, histogram in metrics["histograms"].get("stage_seconds", {}).items()}
+            received = sum(entry["value"] for entry in metrics["metrics"].get("api_response_bytes_total", []))
+            decoding = sum(entry["value"] for entry in metrics["metrics"].get("api_decode_seconds_total", []))
+            run_stats = server_stats(url)
+
+            # Sequential sample: what one channel costs end to end
+            latencies, payload_sizes = [], []
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for channel in itertools.islice(yt.get_channels_from_csv(), args.latency_sample):
+                    started_channel = time.perf_counter()
+                    result = yt.process_channel(channel)
+                    latencies.append((time.perf_counter() - started_channel) * 1000)
+                    if result and result.get("_video_data") is not None:
+                        payload_sizes.append(deep_sizeof(result["_video_data"]))
+
+        if args.log:
+            print(log.getvalue())
+    finally:
+        os.chdir(previous_dir)
+        if args.keep:
+            print(f"📁 Benchmark files kept in: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    fetched = channels.get("fetched", 0)
+    return {
+        "config": {name: getattr(args, name) for name in (
+            "channels", "max_videos", "latency", "error_rate", "quota_per_key", "keys",
+            "workers", "rate", "cache", "format", "seed", "latency_sample", "no_gzip", "no_field_masks")},
+        "channels": channels,
+        "seconds": round(elapsed, 3),
+        "channels_per_second": round(channels.get("seen", 0) / elapsed, 2) if elapsed else None,
+        "channel_latency_p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "channel_latency_p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "payload_bytes_per_channel": round(sum(payload_sizes) / len(payload_sizes)) if payload_sizes else None,
+        "quota_units": quota_used,
+        "quota_units_per_channel": round(quota_used / fetched, 2) if fetched else None,
+        "response_kb_per_channel": round(received / 1024 / fetched, 2) if fetched else None,
+        "wire_kb_per_channel": round(sum(run_stats.get("bytes_sent", {}).values()) / 1024 / fetched, 2) if fetched else None,
+        "decode_ms_per_channel": round(decoding * 1000 / fetched, 3) if fetched else None,
+        "stage_seconds": stages,
+        "retries": retries,
+        "fake_api": run_stats,
+    }
+
+def find_regressions(report, baseline, tolerance):
+    """Tracked figures that moved the wrong way by more than tolerance vs the baseline"""
+    regressions = []
+    for name, higher_is_better in TRACKED_METRICS.items():
+        current, previous = report.get(name), baseline.get(name)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{name}: {previous} -> {current} ({change:+.0%})")
+    return regressions
+
+def print_report(report):
+    print("\n" + "="*70)
+    print("⏱️  SCRAPER BENCHMARK (fake YouTube API)")
+    print("="*70)
+    config = report["config"]
+    print(f"World: {config['channels']:,} channels (≤{config['max_videos']} uploads) | "
+          f"latency {config['latency'] * 1000:.0f}ms | error rate {config['error_rate']:.1%} | "
+          f"{config['keys']} key(s) | {config['workers']} workers")
+    channels = report["channels"]
+    print(f"Channels: {channels.get('seen', 0):,} seen | {channels.get('fetched', 0):,} fetched | "
+          f"{channels.get('qualified', 0):,} qualified")
+    print(f"⚡ Throughput: {report['channels_per_second']} channels/sec ({report['seconds']}s)")
+    print(f"🕐 Per-channel latency: p50 {report['channel_latency_p50_ms']}ms | p99 {report['channel_latency_p99_ms']}ms "
+          f"({config['latency_sample']} sequential process_channel() calls)")
+    print(f"🧠 Peak RSS: {report['peak_rss_mb']} MB | "
+          f"{report['payload_bytes_per_channel']} bytes of scoring payload per analyzed channel")
+    print(f"📊 Quota: {report['quota_units']:,} units | {report['quota_units_per_channel']} per channel "
+          f"(fake API counted {report['fake_api']['quota_used']:,})")
+    print(f"📦 Responses: {report['response_kb_per_channel']} KB per channel decoded | "
+          f"{report['wire_kb_per_channel']} KB on the wire{' (gzip off)' if config.get('no_gzip') else ''} | "
+          f"{report['decode_ms_per_channel']} ms JSON decoding{' (no field masks)' if config.get('no_field_masks') else ''}")
+    if report["stage_seconds"]:
+        print("🧩 Stages: " + " | ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report["stage_seconds"].items()))
+    if any(report["retries"].values()):
+        print("🔁 Retries: " + " | ".join(f"{event} {count}" for event, count in report["retries"].items()))
+    print("="*70)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark youtubeapi.py against a fake YouTube API")
+    parser.add_argument("--channels", type=int, default=DEFAULT_CHANNELS,
+                        help=f"channels in the benchmark world (default: {DEFAULT_CHANNELS})")
+    parser.add_argument("--max-videos", type=int, default=DEFAULT_MAX_VIDEOS,
+                        help=f"max uploads per channel (default: {DEFAULT_MAX_VIDEOS})")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help=f"mean fake API latency in seconds (default: {DEFAULT_LATENCY})")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of fake API requests failing with 503 (default: 0)")
+    parser.add_argument("--quota-per-key", type=int, default=None,
+                        help="fake API units per key before 403 quotaExceeded (default: unlimited)")
+    parser.add_argument("--keys", type=int, default=DEFAULT_KEYS,
+                        help=f"fake API keys (default: {DEFAULT_KEYS})")
+    parser.add_argument("--workers", type=int, default=8, help="scraper workers (default: 8)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests/sec per key for the scraper's token buckets (default: unlimited)")
+    parser.add_argument("--cache", action="store_true", help="enable the scraper's response cache")
+    parser.add_argument("--no-field-masks", action="store_true", help="request whole parts (no `fields=` masks)")
+    parser.add_argument("--no-gzip", action="store_true", help="fake API never gzips responses")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="scraper output format")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-sample", type=int, default=DEFAULT_LATENCY_SAMPLE,
+                        help=f"channels timed through process_channel() (default: {DEFAULT_LATENCY_SAMPLE})")
+    parser.add_argument("--output", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved report; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed relative change vs the baseline (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--log", action="store_true", help="print the scraper's own output")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory with the run's files")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressions vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {args.baseline}")
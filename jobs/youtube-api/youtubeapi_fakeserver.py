@@ -0,0 +1,485 @@
+# ============================================================
+# 🧪 Fake YouTube Data API server (offline benchmarks)
+# ============================================================
+#
+# Serves synthetic `channels`, `playlistItems` and `videos` list
+# responses so youtubeapi.py can be run and benchmarked without
+# spending real quota. Point the scraper at it with:
+#
+#   python youtubeapi_fakeserver.py --port 8085 --channels 1000 --write-csv bench_channels.csv
+#   YOUTUBE_API_ROOT_URL=http://127.0.0.1:8085/ YOUTUBE_API_KEYS=k1,k2 python youtubeapi.py
+#
+# FEATURES:
+# ✅ Deterministic synthetic world (seeded): channel stats, upload lists, video stats
+# ✅ Items generated on demand - memory stays flat for very large worlds
+# ✅ Configurable latency (with jitter), transient error rate and per-key daily quota
+# ✅ Real API shapes: 50-ID limits, pageTokens, ETags with 304 revalidation,
+#    403 quotaExceeded and 503 backendError error bodies
+# ✅ `part` selection, `fields` masks and gzip responses, like googleapis.com
+# ✅ GET /stats - requests, errors, quota units per key and bytes sent (JSON)
+#
+# ============================================================
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# -------------------- CONFIG --------------------
+DEFAULT_CHANNELS = 1000           # Channels in the synthetic world
+DEFAULT_MAX_VIDEOS = 200          # Uploads per channel are drawn from 0..this
+DEFAULT_LATENCY = 0.05            # Mean seconds per response (each response is 0.5x-1.5x this)
+DEFAULT_ERROR_RATE = 0.0          # Share of requests answered with 503 backendError
+DEFAULT_QUOTA_PER_KEY = None      # Units per API key before 403 quotaExceeded (None = unlimited)
+HANDLE_SHARE = 0.1                # Share of input rows written as @handles instead of UC... IDs
+MAX_IDS_PER_REQUEST = 50          # Same limit as the real channels.list / videos.list
+MAX_PAGE_SIZE = 50                # Same limit as the real playlistItems.list
+API_PATH_PREFIX = "/youtube/v3/"
+# ------------------------------------------------
+
+# Filler for descriptions and tags, so items weigh about what real ones do
+WORDS = ("merch", "unboxing", "review", "vlog", "tutorial", "highlights", "podcast", "challenge", "setup",
+         "behind", "the", "scenes", "new", "drop", "giveaway", "collab", "live", "stream", "best", "of")
+
+DURATIONS = ["PT35S", "PT58S", "PT2M40S", "PT4M5S", "PT7M12S", "PT11M30S", "PT18M2S", "PT42M", "PT1H5M10S", "P0D"]
+
+class FakeYouTubeWorld:
+    """
+    Deterministic synthetic channels and videos.
+
+    Nothing is stored: every channel and video is derived from the seed and
+    its index, so a world of millions of channels costs no memory. Uploads
+    are spaced by a per-channel interval, newest first, ending at `now`.
+    """
+
+    def __init__(self, channels=DEFAULT_CHANNELS, max_videos=DEFAULT_MAX_VIDEOS, seed=1, now=None):
+        self.channels = channels
+        self.max_videos = max_videos
+        self.seed = seed
+        self.now = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+
+    def _rng(self, *parts):
+        return random.Random(f"{self.seed}:" + ":".join(map(str, parts)))
+
+    # IDs: channel UC + 22 digits, uploads playlist UU + the same 22, video 11 characters
+    @staticmethod
+    def channel_id(index):
+        return f"UC{index:022d}"
+
+    @staticmethod
+    def handle(index):
+        return f"benchchannel{index}"
+
+    @staticmethod
+    def video_id(channel_index, video_index):
+        return f"v{channel_index:06d}{video_index:04d}"
+
+    def channel_index(self, channel_id):
+        """Index for a UC.../UU... ID or handle (case-insensitive), or None when it is not in the world"""
+        digits = channel_id.lstrip("@")
+        if digits.lower().startswith("benchchannel"):
+            digits = digits.lower()
+        for prefix in ("UC", "UU", "benchchannel"):
+            if digits.startswith(prefix):
+                digits = digits[len(prefix):]
+                break
+        else:
+            return None
+        if not digits.isdigit() or int(digits) >= self.channels:
+            return None
+        return int(digits)
+
+    def video_index(self, video_id):
+        """(channel index, video index) for a video ID, or None"""
+        if len(video_id) != 11 or not video_id[1:].isdigit():
+            return None
+        channel_index, video_index = int(video_id[1:7]), int(video_id[7:])
+        if channel_index >= self.channels or video_index >= self.video_count(channel_index):
+            return None
+        return channel_index, video_index
+
+    def video_count(self, index):
+        return self._rng("count", index).randint(0, self.max_videos)
+
+    def subscribers(self, index):
+        return int(10 ** self._rng("subs", index).uniform(3.5, 7))
+
+    def upload_interval_days(self, index):
+        return self._rng("interval", index).choice([0.5, 1, 2, 3, 5, 7, 14, 30])
+
+    @staticmethod
+    def thumbnails(url_id):
+        return {size: {"url": f"https://i.ytimg.com/vi/{url_id}/{size}.jpg", "width": width, "height": height}
+                for size, width, height in (("default", 120, 90), ("medium", 320, 180), ("high", 480, 360),
+                                            ("standard", 640, 480), ("maxres", 1280, 720))}
+
+    @staticmethod
+    def text(rng, words):
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    def published_at(self, channel_index, video_index):
+        interval = self.upload_interval_days(channel_index)
+        jitter = self._rng("jitter", channel_index, video_index).uniform(0, interval / 2)
+        published = self.now - timedelta(days=video_index * interval + jitter)
+        return published.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def channel_item(self, index):
+        count = self.video_count(index)
+        subscribers = self.subscribers(index)
+        return {
+            "kind": "youtube#channel",
+            "id": self.channel_id(index),
+            "snippet": {
+                "title": f"Bench Channel {index}",
+                "description": self.text(self._rng("about", index), 60),
+                "customUrl": f"@{self.handle(index)}",
+                "publishedAt": "2016-01-01T00:00:00Z",
+                "thumbnails": self.thumbnails(self.channel_id(index)),
+                "localized": {"title": f"Bench Channel {index}", "description": ""},
+                "country": "US",
+            },
+            "statistics": {
+                "viewCount": str(subscribers * self._rng("views", index).randint(20, 400)),
+                "subscriberCount": str(subscribers),
+                "hiddenSubscriberCount": False,
+                "videoCount": str(count),
+            },
+            "contentDetails": {"relatedPlaylists": {"likes": "", "uploads": "UU" + self.channel_id(index)[2:]}},
+        }
+
+    def video_item(self, channel_index, video_index):
+        rng = self._rng("video", channel_index, video_index)
+        views = int(self.subscribers(channel_index) * rng.uniform(0.01, 0.6))
+        return {
+            "kind": "youtube#video",
+            "id": self.video_id(channel_index, video_index),
+            "snippet": {
+                "publishedAt": self.published_at(channel_index, video_index),
+                "channelId": self.channel_id(channel_index),
+                "title": f"Bench video {video_index} of channel {channel_index}",
+                "description": self.text(rng, rng.randint(20, 150)),
+                "thumbnails": self.thumbnails(self.video_id(channel_index, video_index)),
+                "channelTitle": f"Bench Channel {channel_index}",
+                "tags": [rng.choice(WORDS) for _ in range(rng.randint(0, 12))],
+                "categoryId": "22",
+                "liveBroadcastContent": "none",
+                "localized": {"title": f"Bench video {video_index} of channel {channel_index}", "description": ""},
+            },
+            "statistics": {
+                "viewCount": str(views),
+                "likeCount": str(int(views * rng.uniform(0.005, 0.08))),
+                "favoriteCount": "0",
+                "commentCount": str(int(views * rng.uniform(0.0005, 0.01))),
+            },
+            "contentDetails": {"duration": rng.choice(DURATIONS), "dimension": "2d", "definition": "hd",
+                               "caption": "false", "licensedContent": True, "contentRating": {}, "projection": "rectangular"},
+        }
+
+    def playlist_item(self, channel_index, video_index):
+        return {
+            "kind": "youtube#playlistItem",
+            "id": hashlib.sha1(f"{channel_index}:{video_index}".encode("utf-8")).hexdigest()[:32],
+            "contentDetails": {
+                "videoId": self.video_id(channel_index, video_index),
+                "videoPublishedAt": self.published_at(channel_index, video_index),
+            },
+        }
+
+    def write_input_csv(self, path, handle_share=HANDLE_SHARE):
+        """Write a scraper input CSV listing every channel (some as @handles)"""
+        rng = self._rng("csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["channel_id", "channel_name", "subscribers", "search_term", "query_name"])
+            for index in range(self.channels):
+                channel_id = f"@{self.handle(index)}" if rng.random() < handle_share else self.channel_id(index)
+                writer.writerow([channel_id, f"Bench Channel {index}", self.subscribers(index), "benchmark", "bench"])
+        return path
+
+def parse_fields(mask):
+    """
+    Parse a `fields` mask such as "etag,items(id,snippet/title)" into a
+    nested dict of selected names; an empty dict selects the whole value.
+    """
+    position = 0
+
+    def invalid():
+        return ApiError(400, "invalidParameter", f"Invalid field selection {mask}")
+
+    def parse_list():  # item ("," item)*
+        nonlocal position
+        selection = {}
+        while True:
+            merge_fields(selection, parse_item())
+            if position < len(mask) and mask[position] == ",":
+                position += 1
+            else:
+                return selection
+
+    def parse_item():  # name ["/" item | "(" list ")"]
+        nonlocal position
+        start = position
+        while position < len(mask) and mask[position] not in ",/()":
+            position += 1
+        name = mask[start:position].strip()
+        if not name:
+            raise invalid()
+        sub = {}
+        if position < len(mask) and mask[position] == "/":
+            position += 1
+            sub = parse_item()
+        elif position < len(mask) and mask[position] == "(":
+            position += 1
+            sub = parse_list()
+            if position >= len(mask) or mask[position] != ")":
+                raise invalid()
+            position += 1
+        return {name: sub}
+
+    selection = parse_list()
+    if position != len(mask):
+        raise invalid()
+    return selection
+
+def merge_fields(target, source):
+    """Merge one parse_fields() selection into another (selecting a whole value wins)"""
+    for name, sub in source.items():
+        if name not in target:
+            target[name] = sub
+        elif target[name] and sub:
+            merge_fields(target[name], sub)
+        else:
+            target[name] = {}
+
+def apply_fields(value, selection):
+    """Keep only the parts of a response selected by a parse_fields() result"""
+    if not selection:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, selection) for item in value]
+    if isinstance(value, dict):
+        return {name: apply_fields(value[name], sub) for name, sub in selection.items() if name in value}
+    return value
+
+class ApiError(Exception):
+    """An error response in the YouTube API's JSON error format"""
+
+    def __init__(self, status, reason, message, domain="youtube.api"):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": {"code": status, "message": message,
+                               "errors": [{"message": message, "domain": domain, "reason": reason}]}}
+
+class FakeYouTubeServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering list calls from a FakeYouTubeWorld.
+
+    Every list call costs 1 quota unit on the `key` it was made with, like
+    the real API; once a key has spent quota_per_key units it gets 403
+    quotaExceeded. A share error_rate of requests fails with 503. Items
+    carry only the requested `part`s, a `fields` mask trims the response,
+    and responses are gzipped for clients that accept it (unless gzip=False).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, world, latency=DEFAULT_LATENCY, error_rate=DEFAULT_ERROR_RATE,
+                 quota_per_key=DEFAULT_QUOTA_PER_KEY, seed=1, gzip=True):
+        super().__init__(address, FakeYouTubeHandler)
+        self.world = world
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_per_key = quota_per_key
+        self.gzip = gzip
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": {}, "errors": {}, "quota_by_key": {}, "not_modified": 0, "bytes_sent": {}}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _count(self, group, name, amount=1):
+        with self.lock:
+            self.stats[group][name] = self.stats[group].get(name, 0) + amount
+
+    def draw(self):
+        with self.lock:
+            return self.rng.random()
+
+    def charge(self, key):
+        """Spend 1 unit of a key's quota, raising quotaExceeded once it is used up"""
+        if not key:
+            raise ApiError(403, "forbidden", "The request is missing a valid API key.", "global")
+        with self.lock:
+            spent = self.stats["quota_by_key"].get(key, 0)
+            if self.quota_per_key is not None and spent >= self.quota_per_key:
+                raise ApiError(403, "quotaExceeded", "The request cannot be completed because you have "
+                               "exceeded your quota.", "youtube.quota")
+            self.stats["quota_by_key"][key] = spent + 1
+
+    def list_channels(self, params):
+        world = self.world
+        if "forHandle" in params:
+            indexes = [world.channel_index(params["forHandle"])]
+        elif "id" in params:
+            ids = params["id"].split(",")
+            if len(ids) > MAX_IDS_PER_REQUEST:
+                raise ApiError(400, "invalidFilters", f"Too many IDs (max {MAX_IDS_PER_REQUEST}).")
+            indexes = [world.channel_index(channel_id) for channel_id in ids
+                       if channel_id.startswith("UC")]
+        else:
+            raise ApiError(400, "missingRequiredParameter", "No filter selected.")
+        return {"kind": "youtube#channelListResponse",
+                "items": [world.channel_item(index) for index in indexes if index is not None]}
+
+    def list_playlist_items(self, params):
+        world = self.world
+        channel_index = world.channel_index(params.get("playlistId", ""))
+        if channel_index is None or not params.get("playlistId", "").startswith("UU"):
+            raise ApiError(404, "playlistNotFound", "The playlist identified with the request's "
+                           "playlistId parameter cannot be found.")
+        page_size = min(int(params.get("maxResults", 5)), MAX_PAGE_SIZE)
+        start = int(params.get("pageToken") or 0)
+        count = world.video_count(channel_index)
+        response = {
+            "kind": "youtube#playlistItemListResponse",
+            "items": [world.playlist_item(channel_index, index) for index in range(start, min(start + page_size, count))],
+            "pageInfo": {"totalResults": count, "resultsPerPage": page_size},
+        }
+        if start + page_size < count:
+            response["nextPageToken"] = str(start + page_size)
+        return response
+
+    def list_videos(self, params):
+        ids = [video_id for video_id in params.get("id", "").split(",") if video_id]
+        if len(ids) > MAX_IDS_PER_REQUEST:
+            raise ApiError(400, "invalidFilters", f"Too many IDs (max {MAX_IDS_PER_REQUEST}).")
+        indexes = [self.world.video_index(video_id) for video_id in ids]
+        return {"kind": "youtube#videoListResponse",
+                "items": [self.world.video_item(*index) for index in indexes if index is not None]}
+
+ENDPOINTS = {
+    "channels": FakeYouTubeServer.list_channels,
+    "playlistItems": FakeYouTubeServer.list_playlist_items,
+    "videos": FakeYouTubeServer.list_videos,
+}
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like googleapis.com
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the benchmark output
+
+    def send_json(self, status, body, headers=None, endpoint=None):
+        payload = json.dumps(body).encode("utf-8")
+        headers = dict(headers or {})
+        if self.server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload, 6)
+            headers["Content-Encoding"] = "gzip"
+        if endpoint:
+            self.server._count("bytes_sent", endpoint, len(payload))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            with server.lock:
+                stats = json.loads(json.dumps(server.stats))
+            stats["quota_used"] = sum(stats["quota_by_key"].values())
+            self.send_json(200, stats)
+            return
+
+        endpoint = url.path[len(API_PATH_PREFIX):] if url.path.startswith(API_PATH_PREFIX) else None
+        handler = ENDPOINTS.get(endpoint)
+        if handler is None:
+            self.send_json(404, ApiError(404, "notFound", f"Unknown endpoint {url.path}").body)
+            return
+
+        server._count("requests", endpoint)
+        if server.latency:
+            time.sleep(server.latency * (0.5 + server.draw()))
+
+        try:
+            if server.error_rate and server.draw() < server.error_rate:
+                raise ApiError(503, "backendError", "Backend Error", "global")
+            server.charge(params.get("key"))
+            if not params.get("part"):
+                raise ApiError(400, "missingRequiredParameter", "No filter selected. Expected one of: part")
+            parts = {"kind", "etag", "id"} | set(params["part"].split(","))
+            body = handler(server, params)
+            body["items"] = [{name: value for name, value in item.items() if name in parts} for item in body["items"]]
+            fields = parse_fields(params["fields"]) if params.get("fields") else None
+        except ApiError as e:
+            server._count("errors", f"{endpoint}:{e.status}")
+            self.send_json(e.status, e.body, endpoint=endpoint)
+            return
+
+        body["etag"] = hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+        if self.headers.get("If-None-Match") == body["etag"]:
+            with server.lock:
+                server.stats["not_modified"] += 1
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_json(200, apply_fields(body, fields) if fields else body, endpoint=endpoint)
+
+def start_server(world, host="127.0.0.1", port=0, **options):
+    """Start a FakeYouTubeServer on a background thread; returns the server (stop with shutdown())"""
+    server = FakeYouTubeServer((host, port), world, **options)
+    threading.Thread(target=server.serve_forever, name="fake-youtube-api", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake YouTube Data API server for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085, help="port to listen on (0 = any free port)")
+    parser.add_argument("--channels", type=int, default=DEFAULT_CHANNELS,
+                        help=f"channels in the synthetic world (default: {DEFAULT_CHANNELS})")
+    parser.add_argument("--max-videos", type=int, default=DEFAULT_MAX_VIDEOS,
+                        help=f"max uploads per channel (default: {DEFAULT_MAX_VIDEOS})")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help=f"mean response latency in seconds (default: {DEFAULT_LATENCY})")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE,
+                        help="share of requests answered with 503 backendError (default: 0)")
+    parser.add_argument("--quota-per-key", type=int, default=DEFAULT_QUOTA_PER_KEY,
+                        help="units per API key before 403 quotaExceeded (default: unlimited)")
+    parser.add_argument("--no-gzip", action="store_true", help="never gzip responses")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--write-csv", metavar="PATH", help="also write a scraper input CSV for the world")
+    args = parser.parse_args()
+
+    world = FakeYouTubeWorld(args.channels, args.max_videos, args.seed)
+    if args.write_csv:
+        world.write_input_csv(args.write_csv)
+        print(f"📄 Input CSV written to: {args.write_csv}")
+
+    server = FakeYouTubeServer((args.host, args.port), world, latency=args.latency, error_rate=args.error_rate,
+                               quota_per_key=args.quota_per_key, seed=args.seed, gzip=not args.no_gzip)
+    print(f"🧪 Fake YouTube API listening on {server.url} ({args.channels:,} channels)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.exit(0)